@@ -0,0 +1,117 @@
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app import rollups, serialization
+from app.config import settings
+from app.database import get_rollups, init_db, read_log_batch, reset_rollups, save_rollups
+
+
+def get_analytics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: str = "hour",
+    group_by: Optional[List[str]] = None,
+    filters: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregate log counts and temperatures per time bucket, answered from the
+    hourly rollups only. Defaults to the last 24 hours grouped by source.
+
+    Args:
+        since: Start of the range (inclusive), rounded down to the bucket
+        until: End of the range (exclusive), defaults to now
+        bucket: "hour" or "day"
+        group_by: Dimensions kept apart in the series, see rollups.ROLLUP_DIMENSIONS
+        filters: {dimension: value} every counted log must match
+    """
+    until = until or datetime.now()
+    since = rollups.bucket_start(since or until - timedelta(hours=24), bucket)
+    group_by = ["source"] if group_by is None else group_by
+
+    series = {}
+    for row in get_rollups(since, until, filters):
+        key = (rollups.bucket_start(row["bucket"], bucket),) + tuple(row[dimension] for dimension in group_by)
+        point = series.get(key)
+        if point is None:
+            point = series[key] = {"count": 0, "temp_count": 0, "temp_sum": 0.0, "temp_min": None, "temp_max": None}
+        point["count"] += row["count"]
+        point["temp_count"] += row["temp_count"]
+        point["temp_sum"] += row["temp_sum"]
+        for name, pick in (("temp_min", min), ("temp_max", max)):
+            if row[name] is not None:
+                point[name] = row[name] if point[name] is None else pick(point[name], row[name])
+
+    return {
+        "bucket": bucket,
+        "since": since,
+        "until": until,
+        "group_by": group_by,
+        "series": [
+            {
+                "bucket": key[0],
+                **dict(zip(group_by, key[1:])),
+                "count": point["count"],
+                "temp_min": point["temp_min"],
+                "temp_max": point["temp_max"],
+                "temp_avg": round(point["temp_sum"] / point["temp_count"], 2) if point["temp_count"] else None,
+            }
+            for key, point in sorted(series.items())
+        ],
+    }
+
+
+def parse_log_data(data: str) -> Any:
+    """Stored log payload, None when it is not valid JSON"""
+    try:
+        return serialization.loads(data)
+    except json.JSONDecodeError:
+        return None
+
+
+def rebuild_rollups(batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Recompute the rollups from the logs still in the table. Logs written while
+    the rebuild runs are rolled up by the writer as usual and are not replayed.
+
+    Logs are read in keyset batches by id and each batch's rollups are saved
+    before the next is read, so memory stays bounded and no read cursor is open
+    during the writes (which a rollback journal would refuse as locked).
+    """
+    batch_size = batch_size or settings.LOG_EXPORT_BATCH_SIZE
+    started = time.perf_counter()
+    max_id = reset_rollups()
+
+    scanned = 0
+    after_id = 0
+    while True:
+        rows = read_log_batch(after_id, batch_size, fields=["timestamp", "source", "data"], before_id=max_id + 1)
+        if not rows:
+            break
+        save_rollups(rollups.accumulate((row.timestamp, row.source, parse_log_data(row.data)) for row in rows))
+        scanned += len(rows)
+        after_id = rows[-1].id
+        if len(rows) < batch_size:
+            break
+
+    return {
+        "logs_scanned": scanned,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log analytics maintenance")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: backfill the rollups from the logs table")
+    parser.add_argument("--batch-size", type=int, default=None, help="Logs read per batch")
+    args = parser.parse_args()
+
+    init_db()
+    result = rebuild_rollups(args.batch_size)
+    print(f"Rebuilt log rollups from {result['logs_scanned']} logs in {result['duration_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
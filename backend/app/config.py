@@ -25,16 +25,107 @@ class Settings(BaseSettings):
 
     DATABASE_URL: str = DATABASE_URL
 
+    # SQLite performance profile applied to every connection: WAL lets API readers
+    # run while the scheduler writes, NORMAL sync is safe in WAL and skips most fsyncs
+    SQLITE_TUNING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # milliseconds a connection waits for a lock
+    SQLITE_CACHE_SIZE: int = -64000  # negative values are KiB, so 64 MB of page cache
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB memory-mapped I/O
+    SQLITE_TEMP_STORE: str = "MEMORY"
+
+    # Connection pool
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds
+    # Worker threads running blocking database calls for async routes, keep it within the pool size
+    DB_THREADPOOL_SIZE: int = 5
+
+    # Buffered log writer: flush after this many queued rows or seconds, whichever comes first
+    LOG_BATCH_SIZE: int = 100
+    LOG_FLUSH_INTERVAL: float = 1.0
+    LOG_QUEUE_MAX: int = 10000
+
+    # Log retention: days to keep per source (sources not listed are kept forever)
+    LOG_RETENTION_DAYS: dict = {"error": 30, "weather": 7, "sports": 7}
+    LOG_RETENTION_BATCH_SIZE: int = 500  # rows deleted per transaction
+    LOG_RETENTION_VACUUM_PAGES: int = 256  # free pages returned to the OS per transaction
+    LOG_RETENTION_BATCH_PAUSE: float = 0.01  # seconds between batches, lets waiting writers in
+    LOG_RETENTION_CADENCE: int = 60  # minutes
+
+    # Streaming log reads (export, analytics rebuild): rows fetched per cursor batch
+    LOG_EXPORT_BATCH_SIZE: int = 1000
+
     # API keys and NOAA contact info
     WEATHER_API_KEY: list = os.getenv("WEATHER_API_KEY", ["Automation Suite", "contact@example.com"])
     SPORTS_API_KEY: str = os.getenv("SPORTS_API_KEY", "demo_key")
 
+    # Event stream (/api/events, /api/ws): replay history, per-client buffer, keepalive interval
+    EVENT_HISTORY_SIZE: int = 1000
+    EVENT_BUFFER_SIZE: int = 100
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+
+    # Upstream API base URLs, point them at the local simulator (python -m simulator) to test offline
+    NOAA_BASE_URL: str = "https://api.weather.gov"
+    SPORTSDB_BASE_URL: str = "https://www.thesportsdb.com/api/v1/json"
+
+    # Pooled upstream HTTP client
+    UPSTREAM_TIMEOUT: float = 10.0  # seconds
+    UPSTREAM_MAX_CONNECTIONS: int = 20
+    UPSTREAM_MAX_KEEPALIVE: int = 10
+
+    # Upstream resilience: retries with jittered exponential backoff (honoring 429 Retry-After up to
+    # UPSTREAM_RETRY_AFTER_MAX), per-request timeouts of UPSTREAM_TIMEOUT_MULTIPLIER x the observed p99
+    # latency (at least UPSTREAM_MIN_TIMEOUT, at most UPSTREAM_TIMEOUT), and a circuit breaker per upstream
+    # that opens after CIRCUIT_FAILURE_THRESHOLD consecutive failures for CIRCUIT_RESET_TIMEOUT seconds,
+    # doubling up to CIRCUIT_MAX_RESET_TIMEOUT while half-open probes keep failing
+    UPSTREAM_RETRIES: int = 1
+    UPSTREAM_RETRY_BACKOFF: float = 0.2  # seconds
+    UPSTREAM_RETRY_AFTER_MAX: float = 5.0  # seconds
+    UPSTREAM_MIN_TIMEOUT: float = 2.0  # seconds
+    UPSTREAM_TIMEOUT_MULTIPLIER: float = 3.0
+    CIRCUIT_FAILURE_THRESHOLD: int = 3
+    CIRCUIT_RESET_TIMEOUT: float = 30.0  # seconds
+    CIRCUIT_MAX_RESET_TIMEOUT: float = 300.0  # seconds
+
+    # Upstream HTTP response cache (honors Cache-Control/ETag)
+    HTTP_CACHE_MAX_ENTRIES: int = 256
+    SPORTS_CACHE_TTL: int = 300  # seconds, used when the response has no freshness headers
+
+    # Last known good upstream data: manual runs use weather younger than WEATHER_FRESH_SECONDS and
+    # sports younger than SPORTS_FRESH_SECONDS as is, and older data up to DATA_MAX_STALE_SECONDS
+    # right away while it is refreshed in the background; scheduled runs always fetch
+    WEATHER_FRESH_SECONDS: int = 600
+    SPORTS_FRESH_SECONDS: int = 900
+    DATA_MAX_STALE_SECONDS: int = 3600
+
+    # NOAA points -> forecast URL cache, pre-warmed for every configured city at startup
+    GRIDPOINT_CACHE_TTL_DAYS: int = 30
+    GRIDPOINT_PREWARM: bool = True
+
     # CORS allowed origins (comma-separated in .env, e.g. "http://ec2-ip:3000,https://myapp.com")
     CORS_ORIGINS: list = ["*"]
 
     # Automation settings
     AUTOMATION_CADENCE: int = 30  # minutes
     DEFAULT_CITY: str = "Seattle"
+    # "single" evaluates DEFAULT_CITY, "fanout" evaluates every city in CITY_COORDINATES each tick
+    AUTOMATION_MODE: str = "single"
+    FANOUT_CONCURRENCY: int = 10  # max weather requests in flight during a fan-out run
+    # Run coordinator: concurrent runs for the same city share one execution, distinct runs
+    # execute RUN_CONCURRENCY at a time and at most RUN_QUEUE_MAX may wait or run at once
+    RUN_CONCURRENCY: int = 1
+    RUN_QUEUE_MAX: int = 10
+    RUN_HISTORY_DAYS: int = 7  # days finished runs and their stage timings are kept
+    # Multiple workers: every SCHEDULER_SYNC_SECONDS each worker applies runtime settings (cadence)
+    # stored by the others and tries to take or renew the scheduler lease; only the holder runs the
+    # scheduled jobs, and another worker takes over once the lease goes SCHEDULER_LEASE_TTL seconds
+    # without renewal
+    SCHEDULER_SYNC_SECONDS: int = 10
+    SCHEDULER_LEASE_TTL: int = 30
+    # Seconds /api/state serves cached states before checking whether another worker changed them
+    STATE_REVISION_CHECK_SECONDS: float = 1.0
 
     # City coordinates mapping (latitude, longitude)
     CITY_COORDINATES: dict = {
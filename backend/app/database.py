@@ -1,22 +1,107 @@
+import asyncio
+import contextvars
+import functools
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import case, create_engine, delete, event, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 
 from app.config import settings
+from app.events import EventBus, RemoteChanges
+from app import revisions, rollups, serialization
+from app.log_writer import LogWriter
+from app.metrics import DB_LATENCY
+from app.state_cache import StateCache
 from app.models.base import Base
+from app.models.gridpoint import GridpointModel
+from app.models.lease import LeaseModel
 from app.models.log import LogModel
+from app.models.revision import RevisionModel
+from app.models.rollup import LogRollupModel
+from app.models.run import AutomationRunModel
+from app.models.runtime_setting import RuntimeSettingModel
 from app.models.state import StateModel
 
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Pragmas of the SQLite performance profile, in the order they are applied"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Connect hook applying the SQLite performance profile to every new connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_url: str):
+    """Create the SQLAlchemy engine, tuned for concurrent readers and writers on SQLite"""
+    if not database_url.startswith("sqlite"):
+        return create_engine(
+            database_url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        # Every pooled connection to :memory: would be a separate database, keep the default pool
+        return create_engine(database_url, connect_args={"check_same_thread": False})
+
+    db_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if settings.SQLITE_TUNING:
+        event.listen(db_engine, "connect", apply_sqlite_pragmas)
+    return db_engine
+
+
+def log_sqlite_pragmas() -> Dict[str, Any]:
+    """Print the pragmas active on a pooled connection, so a misapplied profile shows up at startup"""
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    with engine.connect() as connection:
+        active = {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in list(sqlite_pragmas()) + ["auto_vacuum"]
+        }
+    print("SQLite pragmas: " + ", ".join(f"{name}={value}" for name, value in active.items()))
+
+    expected_mode = settings.SQLITE_JOURNAL_MODE.lower()
+    if settings.SQLITE_TUNING and str(active["journal_mode"]).lower() != expected_mode:
+        print(f"Warning: SQLite journal_mode is {active['journal_mode']}, expected {expected_mode}")
+    return active
+
+
 # Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine(settings.DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -33,17 +118,99 @@ def get_db_context():
 
 
 def with_db_session(func):
-    """Decorator for database sessions"""
+    """Decorator for database sessions, timing each call as a database operation"""
+    operation = func.__name__
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        with get_db_context() as db:
+        with DB_LATENCY.time(operation=operation), get_db_context() as db:
             return func(db, *args, **kwargs)
     return wrapper
 
 
+# Seconds the one-time conversion to incremental auto_vacuum may hold the init lease
+INIT_LEASE_TTL = 600
+# Seconds between attempts to take the init lease while another worker holds it
+INIT_LEASE_POLL = 0.5
+
+# Bounded pool for blocking database work started from async code
+db_executor = ThreadPoolExecutor(max_workers=settings.DB_THREADPOOL_SIZE, thread_name_prefix="db")
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run a blocking database function on the database threadpool and await it,
+    so async route handlers never block the event loop on SQLite
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def enable_incremental_vacuum():
+    """
+    Switch SQLite to auto_vacuum=INCREMENTAL so freed pages can be returned to the OS.
+    With several workers starting at once only the one taking the init lease converts
+    the file. The others wait for the lease instead of going on with init_db, whose
+    writes would fail with "database is locked" while the full VACUUM runs, and then
+    find the file converted.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return
+
+    holder = f"init:{os.getpid()}"
+    wait_for_init_lease(holder)
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+                # Converted by the worker that held the lease before
+                return
+            connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            # The new mode only applies to an existing file after a full VACUUM (one time cost)
+            connection.exec_driver_sql("VACUUM")
+    finally:
+        release_lease("database_init", holder)
+
+
+def wait_for_init_lease(holder: str):
+    """Take the init lease, waiting while another worker holds it (it expires if that worker dies)"""
+    waiting = False
+    while True:
+        try:
+            if acquire_lease("database_init", holder, INIT_LEASE_TTL) is not None:
+                return
+        except OperationalError:
+            # The holder's VACUUM kept the database locked past busy_timeout
+            pass
+        if not waiting:
+            print("Another worker is converting the database to incremental auto_vacuum, waiting for it")
+            waiting = True
+        time.sleep(INIT_LEASE_POLL)
+
+
 def init_db():
     """Initialize database tables and default data"""
-    Base.metadata.create_all(bind=engine)
+    for attempt in range(len(Base.metadata.tables)):
+        try:
+            Base.metadata.create_all(bind=engine)
+            break
+        except OperationalError:
+            # Another worker created a table between the existence check and CREATE TABLE, check again;
+            # each retry finds at least that table in place, so there is at most one per table
+            if attempt == len(Base.metadata.tables) - 1:
+                raise
+    # Needs the leases table, so it runs after create_all
+    enable_incremental_vacuum()
+
+    # create_all skips existing tables, so indexes added later are created explicitly; IF NOT EXISTS
+    # instead of checkfirst, whose check and create race when several workers start together
+    with engine.begin() as connection:
+        for index in LogModel.__table__.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
 
     with get_db_context() as db:
         existing_states = db.query(StateModel).count()
@@ -54,93 +221,732 @@ def init_db():
                 StateModel(target="Instagram", status="active", last_updated=datetime.now()),
             ]
             db.add_all(default_states)
-            db.commit()
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker inserted the default states first
+                db.rollback()
 
 
-@with_db_session
-def add_log(db, source: str, data: Dict[str, Any], action_taken: str = "None") -> int:
-    """Add a log entry to the database"""
-    log = LogModel(
-        source=source,
-        data=json.dumps(data),
-        action_taken=action_taken,
-        timestamp=datetime.now()
+# Change notifications for streaming clients (state transitions, new logs, finished runs)
+event_bus = EventBus(history_size=settings.EVENT_HISTORY_SIZE, buffer_size=settings.EVENT_BUFFER_SIZE)
+
+# Changes this worker made and published itself, so the sync job only publishes other workers' changes
+remote_changes = RemoteChanges()
+
+# Held around the log writes and deletions that move the in-memory logs version (see get_logs_version)
+logs_version_lock = threading.Lock()
+
+
+def upsert_rollups(db, totals: Dict[Tuple, Dict[str, Any]]):
+    """Add accumulated totals to the rollup rows of their bucket, creating missing rows"""
+    if not totals:
+        return
+
+    values = [
+        {"bucket": key[0], **dict(zip(rollups.ROLLUP_DIMENSIONS, key[1:])), **total}
+        for key, total in totals.items()
+    ]
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(LogRollupModel).values(values)
+    current, new = LogRollupModel, statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=["bucket", *rollups.ROLLUP_DIMENSIONS],
+        set_={
+            "count": current.count + new.count,
+            "temp_count": current.temp_count + new.temp_count,
+            "temp_sum": current.temp_sum + new.temp_sum,
+            "temp_min": case((current.temp_min.is_(None) | (new.temp_min < current.temp_min), new.temp_min), else_=current.temp_min),
+            "temp_max": case((current.temp_max.is_(None) | (new.temp_max > current.temp_max), new.temp_max), else_=current.temp_max),
+        },
     )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    return log.id
+    db.execute(statement)
 
 
 @with_db_session
-def get_logs(db, limit: int = 50, source: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get logs from database with optional filtering"""
-    query = db.query(LogModel).order_by(LogModel.id.desc())
+def insert_logs(db, rows: List[Dict[str, Any]]):
+    """
+    Write a batch of log rows and their rollup increments in a single transaction.
+    Only raises when nothing was written, so the log writer can safely retry the batch
+    """
+    payloads = [serialization.loads(row["data"]) for row in rows]
+    with logs_version_lock:
+        ids = db.execute(insert(LogModel).returning(LogModel.id), rows).scalars().all()
+        upsert_rollups(db, rollups.accumulate(
+            (row["timestamp"], row["source"], data) for row, data in zip(rows, payloads)
+        ))
+        with remote_changes.committing("log_id", *ids):
+            db.commit()
+        revisions.advance("log_id", max(ids))
+
+    # The rows are committed: an error from here on must not reach the log writer, which would write them again
+    try:
+        event_bus.publish("logs", {"logs": [
+            {
+                "id": log_id,
+                "timestamp": row["timestamp"].isoformat(),
+                "source": row["source"],
+                "data": data,
+                "action_taken": row["action_taken"],
+            }
+            for log_id, row, data in zip(ids, rows, payloads)
+        ]})
+    except Exception as error:
+        print(f"Error publishing written logs: {error}")
+
+
+# Buffered log sink, the flusher thread is started and stopped by the app lifespan
+log_writer = LogWriter(
+    insert_logs,
+    batch_size=settings.LOG_BATCH_SIZE,
+    flush_interval=settings.LOG_FLUSH_INTERVAL,
+    max_queue=settings.LOG_QUEUE_MAX,
+)
+
+
+def add_log(source: str, data: Dict[str, Any], action_taken: str = "None"):
+    """Queue a log entry for the buffered log writer"""
+    log_writer.enqueue(source, serialization.dumps_text(data), action_taken)
+
 
+def add_logs(entries: List[Tuple[str, Dict[str, Any], str]]):
+    """Queue several (source, data, action_taken) log entries so they are written together"""
+    log_writer.enqueue_many([
+        (source, serialization.dumps_text(data), action_taken) for source, data, action_taken in entries
+    ])
+
+
+def log_to_dict(log) -> Dict[str, Any]:
+    try:
+        data = serialization.loads(log.data)
+    except json.JSONDecodeError:
+        data = log.data
+
+    return {
+        "id": log.id,
+        "timestamp": log.timestamp.isoformat(),
+        "source": log.source,
+        "data": data,
+        "action_taken": log.action_taken
+    }
+
+
+# Log fields in response order, for projections such as ?fields=id,source
+LOG_FIELDS = ("id", "timestamp", "source", "data", "action_taken")
+
+
+def log_columns(fields: Optional[List[str]] = None):
+    """Columns to select for the requested fields, all of them by default"""
+    return [getattr(LogModel, field) for field in LOG_FIELDS if fields is None or field in fields]
+
+
+def encode_log_row(row, fields: Optional[List[str]] = None) -> bytes:
+    """
+    Encode a selected log row as a JSON object without decoding its payload:
+    the stored ``data`` text is already JSON and is embedded as is
+    """
+    parts = []
+    for field in LOG_FIELDS:
+        if fields is not None and field not in fields:
+            continue
+        value = getattr(row, field)
+        if field == "data":
+            encoded = value.encode()
+        elif field == "timestamp":
+            encoded = serialization.dumps(value.isoformat())
+        else:
+            encoded = serialization.dumps(value)
+        parts.append(b'"' + field.encode() + b'":' + encoded)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def filter_logs(
+    query,
+    source: Optional[str] = None,
+    before_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+):
+    """Apply the shared log filters to a select() statement"""
     if source:
-        query = query.filter(LogModel.source == source)
+        query = query.where(LogModel.source == source)
+    if action_taken:
+        query = query.where(LogModel.action_taken == action_taken)
+    if since:
+        query = query.where(LogModel.timestamp >= since)
+    if until:
+        query = query.where(LogModel.timestamp < until)
+    if before_id is not None:
+        query = query.where(LogModel.id < before_id)
+    return query
 
-    logs = query.limit(limit).all()
-    # Convert SQLAlchemy models to dictionaries
-    result = []
-    for log in logs:
-        try:
-            data = json.loads(log.data)
-        except json.JSONDecodeError:
-            data = log.data
-
-        log_dict = {
-            "id": log.id,
-            "timestamp": log.timestamp.isoformat(),
-            "source": log.source,
-            "data": data,
-            "action_taken": log.action_taken
-        }
-        result.append(log_dict)
 
-    return result
+def fetch_log_page(db, query, limit: int, after_id: Optional[int] = None):
+    """Rows of one keyset page, newest first"""
+    if after_id is not None:
+        # Walk forward from the cursor, then return the page newest first
+        query = query.where(LogModel.id > after_id).order_by(LogModel.id.asc()).limit(limit)
+        return list(reversed(db.execute(query).all()))
+    return db.execute(query.order_by(LogModel.id.desc()).limit(limit)).all()
 
 
 @with_db_session
-def get_states(db) -> List[Dict[str, Any]]:
-    """Get current states of all targets"""
+def get_logs(
+    db,
+    limit: int = 50,
+    source: Optional[str] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get logs from database, newest first, with optional filtering.
+
+    Pages are keyset based: pass the smallest id of a page as before_id to get
+    the next (older) page, or the largest id seen as after_id to get newer rows.
+    Only committed rows are read: logs still queued in the log writer show up
+    after its next flush, every LOG_FLUSH_INTERVAL seconds.
+    """
+    query = filter_logs(select(*log_columns()), source, before_id, since, until, action_taken)
+    return [log_to_dict(row) for row in fetch_log_page(db, query, limit, after_id)]
+
+
+@with_db_session
+def get_logs_json(
+    db,
+    limit: int = 50,
+    source: Optional[str] = None,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> bytes:
+    """
+    Same page as get_logs, encoded straight to a JSON array. Payloads are never
+    decoded, and only the requested fields are selected from the table.
+    """
+    query = filter_logs(select(*log_columns(fields)), source, before_id, since, until, action_taken)
+    rows = fetch_log_page(db, query, limit, after_id)
+    return b"[" + b",".join(encode_log_row(row, fields) for row in rows) + b"]"
+
+
+def iter_logs(
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+    batch_size: int = 1000,
+    fields: Optional[List[str]] = None,
+    before_id: Optional[int] = None,
+) -> Iterator[Any]:
+    """
+    Stream log rows oldest first, with the requested fields as attributes.
+
+    Rows are fetched from a streaming cursor batch_size at a time and ``data``
+    stays the stored JSON text, so memory does not grow with the table size.
+    Queued logs are written first, so an export holds everything logged before it.
+    """
+    log_writer.flush()
+
+    query = filter_logs(select(*log_columns(fields)), source, before_id, since, until, action_taken)
+    query = query.order_by(LogModel.id.asc()).execution_options(yield_per=batch_size)
+
+    with get_db_context() as db:
+        yield from db.execute(query)
+
+
+@with_db_session
+def read_log_batch(
+    db,
+    after_id: int,
+    batch_size: int,
+    fields: Optional[List[str]] = None,
+    before_id: Optional[int] = None,
+) -> List[Any]:
+    """
+    The next batch_size log rows above after_id, oldest first. The batch is
+    fetched in full, so no read cursor stays open while the caller writes.
+    """
+    query = filter_logs(select(LogModel.id, *log_columns(fields)), before_id=before_id)
+    query = query.where(LogModel.id > after_id).order_by(LogModel.id.asc()).limit(batch_size)
+    return db.execute(query).all()
+
+
+@with_db_session
+def get_latest_logs(db, sources: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get the newest log of each source, one (source, id) index lookup per source"""
+    latest = {}
+    for source in sources:
+        log = db.query(LogModel).filter(LogModel.source == source).order_by(LogModel.id.desc()).first()
+        if log:
+            latest[source] = log_to_dict(log)
+    return latest
+
+
+def state_to_dict(state: StateModel) -> Dict[str, Any]:
+    return {
+        "id": state.id,
+        "target": state.target,
+        "status": state.status,
+        "last_updated": state.last_updated.isoformat()
+    }
+
+
+@with_db_session
+def load_states(db) -> Tuple[int, List[Dict[str, Any]]]:
+    """Read the states of all targets from the database, with the state revision they were read at"""
+    revision = read_revision(db, "state")
     states = db.query(StateModel).order_by(StateModel.target).all()
 
     # Convert SQLAlchemy models to dictionaries
-    result = []
-    for state in states:
-        state_dict = {
-            "id": state.id,
-            "target": state.target,
-            "status": state.status,
-            "last_updated": state.last_updated.isoformat()
-        }
-        result.append(state_dict)
+    return revision, [state_to_dict(state) for state in states]
+
+
+# Write-through cache of the states table, kept coherent by update_state/apply_states
+state_cache = StateCache(load_states)
+
 
-    return result
+def get_states() -> List[Dict[str, Any]]:
+    """Get current states of all targets (served from the state cache)"""
+    return state_cache.get()
+
+
+def refresh_state_cache(revision: Optional[int] = None) -> bool:
+    """
+    Invalidate the state cache when the stored state revision (read unless given)
+    differs from the cached one, i.e. another worker changed a state since it was
+    loaded. Returns whether it was invalidated
+    """
+    if revision is None:
+        revision = get_revisions().get("state", 0)
+    if state_cache.version in (None, revision):
+        return False
+    state_cache.invalidate()
+    return True
+
+
+# When get_versioned_state_body last compared the cached state revision with the stored one
+_state_checked_at = float("-inf")
+
+
+def get_versioned_state_body() -> Tuple[int, bytes]:
+    """
+    Serialized states and their revision, served from memory. The stored revision
+    is checked at most every STATE_REVISION_CHECK_SECONDS, so states changed by
+    another worker are reloaded within that time
+    """
+    global _state_checked_at
+    now = time.monotonic()
+    if now - _state_checked_at >= settings.STATE_REVISION_CHECK_SECONDS:
+        _state_checked_at = now
+        refresh_state_cache()
+    return state_cache.versioned_body()
 
 
 @with_db_session
 def update_state(db, target: str, status: str) -> bool:
     """Update the state of a target"""
-    state = db.query(StateModel).filter(StateModel.target == target).first()
-    if not state:
-        return False
+    with state_cache.lock:
+        state = db.query(StateModel).filter(StateModel.target == target).first()
+        if not state:
+            return False
 
-    state.status = status
-    state.last_updated = datetime.now()
-    db.commit()
+        state.status = status
+        state.last_updated = datetime.now()
+        row = state_to_dict(state)
+        revision = increment_revision(db, "state")
+        with remote_changes.committing("state", revision):
+            db.commit()
+        state_cache.update([row], revision)
+    event_bus.publish("state", {"states": [row], "version": revision})
     return True
 
 
+@with_db_session
+def apply_states(db, states: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    Bring targets to the desired statuses, writing only the rows that change.
+
+    When the state cache is at the stored revision and already holds the
+    desired statuses nothing is written. Otherwise the rows are compared and
+    updated inside one write transaction, so a change made by another worker
+    since the cache was loaded is never missed or overwritten unseen.
+    Unknown targets are ignored. Returns {target: {"from": old, "to": new}}.
+    """
+    def changes(current: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+        return {
+            target: {"from": current[target], "to": status}
+            for target, status in states.items()
+            if target in current and current[target] != status
+        }
+
+    with state_cache.lock:
+        cached_version, cached = state_cache.versioned()
+        up_to_date = cached_version == read_revision(db, "state")
+        db.rollback()  # end the read, the write transaction below starts from the latest commit
+        if up_to_date and not changes({row["target"]: row["status"] for row in cached}):
+            return {}
+
+        # Incrementing the revision first takes the write lock, so the rows read next cannot change before the commit
+        revision = increment_revision(db, "state")
+        rows = db.query(StateModel).filter(StateModel.target.in_(states)).all()
+        transitions = changes({state.target: state.status for state in rows})
+        if not transitions:
+            db.rollback()
+            state_cache.invalidate()  # another worker already wrote these statuses
+            return {}
+
+        now = datetime.now()
+        for state in rows:
+            if state.target in transitions:
+                state.status = states[state.target]
+                state.last_updated = now
+        updated = [state_to_dict(state) for state in rows if state.target in transitions]
+        with remote_changes.committing("state", revision):
+            db.commit()
+        state_cache.update(updated, revision)
+    event_bus.publish("state", {"states": updated, "version": revision})
+    return transitions
+
+
 @with_db_session
 def delete_all_logs(db):
     """Clear all logs from the database"""
+    log_writer.flush()
     try:
-        db.query(LogModel).delete()
-        db.commit()
+        with logs_version_lock:
+            db.query(LogModel).delete()
+            db.query(LogRollupModel).delete()
+            revision = increment_revision(db, "logs")
+            with remote_changes.committing("logs", revision):
+                db.commit()
+            adopt_logs_version(revision, 0)
+        event_bus.publish("logs_cleared", {})
         return True
     except SQLAlchemyError as error:
         db.rollback()
         print(f"Error clearing logs: {error}")
         return False
+
+
+@with_db_session
+def get_rollups(
+    db,
+    since: datetime,
+    until: datetime,
+    filters: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Hourly rollup rows with a bucket in [since, until), optionally matching dimension values"""
+    query = select(LogRollupModel).where(LogRollupModel.bucket >= since, LogRollupModel.bucket < until)
+    for dimension, value in (filters or {}).items():
+        query = query.where(getattr(LogRollupModel, dimension) == value)
+
+    return [
+        {
+            "bucket": rollup.bucket,
+            **{dimension: getattr(rollup, dimension) for dimension in rollups.ROLLUP_DIMENSIONS},
+            "count": rollup.count,
+            "temp_count": rollup.temp_count,
+            "temp_sum": rollup.temp_sum,
+            "temp_min": rollup.temp_min,
+            "temp_max": rollup.temp_max,
+        }
+        for rollup in db.execute(query.order_by(LogRollupModel.bucket)).scalars()
+    ]
+
+
+@with_db_session
+def reset_rollups(db) -> int:
+    """
+    Delete every rollup row and return the newest log id at that moment. Logs
+    above it are rolled up by insert_logs, so a rebuild only replays up to it.
+    """
+    log_writer.flush()
+    db.query(LogRollupModel).delete()
+    max_id = db.execute(select(func.max(LogModel.id))).scalar() or 0
+    db.commit()
+    return max_id
+
+
+@with_db_session
+def save_rollups(db, totals: Dict[Tuple, Dict[str, Any]]):
+    upsert_rollups(db, totals)
+    db.commit()
+
+
+@with_db_session
+def save_automation_run(db, mode: str, city: str, source: str, duration_ms: float, trace: Dict[str, Any]):
+    """Record a finished automation run with its span tree"""
+    db.add(AutomationRunModel(
+        started_at=datetime.now() - timedelta(milliseconds=duration_ms),
+        mode=mode,
+        city=city,
+        source=source,
+        duration_ms=duration_ms,
+        trace=serialization.dumps_text(trace),
+    ))
+    db.commit()
+
+
+@with_db_session
+def get_slowest_runs(db, since: datetime, limit: int = 10) -> List[Dict[str, Any]]:
+    """Slowest runs started after since, slowest first"""
+    runs = db.execute(
+        select(AutomationRunModel)
+        .where(AutomationRunModel.started_at >= since)
+        .order_by(AutomationRunModel.duration_ms.desc())
+        .limit(limit)
+    ).scalars()
+    return [
+        {
+            "id": run.id,
+            "started_at": run.started_at,
+            "mode": run.mode,
+            "city": run.city,
+            "source": run.source,
+            "duration_ms": run.duration_ms,
+            "trace": serialization.loads(run.trace),
+        }
+        for run in runs
+    ]
+
+
+@with_db_session
+def delete_runs_before(db, cutoff: datetime) -> int:
+    """Delete recorded runs started before cutoff"""
+    result = db.execute(delete(AutomationRunModel).where(AutomationRunModel.started_at < cutoff))
+    db.commit()
+    return result.rowcount
+
+
+@with_db_session
+def delete_log_batch(db, source: str, older_than: datetime, batch_size: int) -> int:
+    """Delete up to batch_size logs of a source older than a cutoff, in its own short transaction"""
+    batch = (
+        select(LogModel.id)
+        .where(LogModel.source == source, LogModel.timestamp < older_than)
+        .limit(batch_size)
+    )
+    result = db.execute(delete(LogModel).where(LogModel.id.in_(batch.scalar_subquery())))
+    db.commit()
+    return result.rowcount
+
+
+def get_database_size() -> int:
+    """Size of the database file in bytes (page_count * page_size)"""
+    if engine.dialect.name != "sqlite":
+        return 0
+
+    with engine.connect() as connection:
+        page_count = connection.exec_driver_sql("PRAGMA page_count").scalar()
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+    return page_count * page_size
+
+
+def get_freelist_count() -> int:
+    """Unused pages in the database file that incremental_vacuum can return to the OS"""
+    if engine.dialect.name != "sqlite":
+        return 0
+
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+
+def incremental_vacuum(pages: Optional[int] = None):
+    """
+    Return free pages to the OS, all of them unless a page count is given.
+    Each call is one write transaction, prefer bounded page counts on a live database.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    statement = f"PRAGMA incremental_vacuum({int(pages)});" if pages else "PRAGMA incremental_vacuum;"
+    connection = engine.raw_connection()
+    try:
+        # executescript steps the pragma to completion, execute() would only free a single page
+        connection.driver_connection.executescript(statement)
+    finally:
+        connection.close()
+
+
+@with_db_session
+def get_gridpoint(db, location: str, max_age: timedelta) -> Optional[str]:
+    """Get the cached forecast URL for a "lat,lon" location if it is younger than max_age"""
+    gridpoint = db.query(GridpointModel).filter(GridpointModel.location == location).first()
+    if not gridpoint or gridpoint.resolved_at < datetime.now() - max_age:
+        return None
+    return gridpoint.forecast_url
+
+
+@with_db_session
+def save_gridpoint(db, location: str, forecast_url: str):
+    """Store or refresh the forecast URL resolved for a "lat,lon" location"""
+    gridpoint = db.query(GridpointModel).filter(GridpointModel.location == location).first()
+    if not gridpoint:
+        gridpoint = GridpointModel(location=location)
+        db.add(gridpoint)
+
+    gridpoint.forecast_url = forecast_url
+    gridpoint.resolved_at = datetime.now()
+    db.commit()
+
+
+@with_db_session
+def delete_gridpoint(db, location: str):
+    """Invalidate the cached forecast URL for a "lat,lon" location"""
+    db.query(GridpointModel).filter(GridpointModel.location == location).delete()
+    db.commit()
+
+
+@with_db_session
+def acquire_lease(db, name: str, holder: str, ttl_seconds: float) -> Optional[datetime]:
+    """
+    Take or renew the named lease for holder, returning its new expiry or None
+    when another holder's lease is still valid. The conditional UPDATE (or the
+    primary key on INSERT) keeps this atomic across processes sharing the database.
+    """
+    now = datetime.now()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    renewed = db.execute(
+        update(LeaseModel)
+        .where(LeaseModel.name == name)
+        .where(or_(LeaseModel.holder == holder, LeaseModel.expires_at < now))
+        .values(
+            holder=holder,
+            expires_at=expires_at,
+            acquired_at=case((LeaseModel.holder == holder, LeaseModel.acquired_at), else_=now),
+        )
+    ).rowcount
+    if renewed:
+        db.commit()
+        return expires_at
+
+    try:
+        db.add(LeaseModel(name=name, holder=holder, acquired_at=now, expires_at=expires_at))
+        db.commit()
+    except IntegrityError:
+        # The lease exists and is held by someone else
+        db.rollback()
+        return None
+    return expires_at
+
+
+@with_db_session
+def release_lease(db, name: str, holder: str):
+    """Give up the named lease if holder has it, so another worker can take over right away"""
+    db.execute(delete(LeaseModel).where(LeaseModel.name == name, LeaseModel.holder == holder))
+    db.commit()
+
+
+@with_db_session
+def get_lease(db, name: str) -> Optional[Dict[str, Any]]:
+    lease = db.get(LeaseModel, name)
+    if lease is None:
+        return None
+    return {
+        "holder": lease.holder,
+        "acquired_at": lease.acquired_at.isoformat(),
+        "expires_at": lease.expires_at.isoformat(),
+    }
+
+
+@with_db_session
+def get_runtime_settings(db) -> Dict[str, Tuple[Any, int]]:
+    """Stored runtime settings as {key: (value, version)}"""
+    rows = db.execute(select(RuntimeSettingModel.key, RuntimeSettingModel.value, RuntimeSettingModel.version))
+    return {key: (serialization.loads(value), version) for key, value, version in rows}
+
+
+@with_db_session
+def save_runtime_setting(db, key: str, value: Any) -> int:
+    """Store a runtime setting, returns its new version"""
+    encoded = serialization.dumps_text(value)
+    updated = db.execute(
+        update(RuntimeSettingModel)
+        .where(RuntimeSettingModel.key == key)
+        .values(value=encoded, version=RuntimeSettingModel.version + 1, updated_at=datetime.now())
+    ).rowcount
+    if not updated:
+        db.add(RuntimeSettingModel(key=key, value=encoded, version=1, updated_at=datetime.now()))
+    db.commit()
+    return db.get(RuntimeSettingModel, key).version
+
+
+def increment_revision(db, name: str) -> int:
+    """
+    Record a change to name as part of the caller's transaction, creating the
+    counter on first use. Returns the new revision
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(RevisionModel).values(name=name, revision=1, updated_at=datetime.now())
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"revision": RevisionModel.revision + 1, "updated_at": statement.excluded.updated_at},
+    )
+    return db.execute(statement.returning(RevisionModel.revision)).scalar_one()
+
+
+def read_revision(db, name: str) -> int:
+    """Current revision of name within the caller's transaction"""
+    return db.execute(select(RevisionModel.revision).where(RevisionModel.name == name)).scalar() or 0
+
+
+@with_db_session
+def bump_logs_revision(db) -> int:
+    """Record that logs were deleted in its own transaction, returns the new logs revision"""
+    with logs_version_lock:
+        revision = increment_revision(db, "logs")
+        newest_id = db.execute(select(func.max(LogModel.id))).scalar() or 0
+        with remote_changes.committing("logs", revision):
+            db.commit()
+        adopt_logs_version(revision, newest_id)
+    return revision
+
+
+@with_db_session
+def get_revisions(db) -> Dict[str, int]:
+    """Stored revision counters as {name: revision}, a missing counter has never changed"""
+    return dict(db.execute(select(RevisionModel.name, RevisionModel.revision)).all())
+
+
+@with_db_session
+def get_latest_log_id(db) -> int:
+    """Id of the newest log written by any worker, 0 when there are none"""
+    return db.execute(select(func.max(LogModel.id))).scalar() or 0
+
+
+def adopt_logs_version(logs_revision: int, newest_id: int):
+    """
+    Take over the logs version read from the database. A new logs revision means
+    logs were deleted and ids may have been reused, so the newest id is taken as
+    is; otherwise it only moves forward
+    """
+    if revisions.current("logs") != logs_revision:
+        revisions.adopt("logs", logs_revision)
+        revisions.adopt("log_id", newest_id)
+    else:
+        revisions.advance("log_id", newest_id)
+
+
+@with_db_session
+def sync_logs_version(db):
+    """Adopt logs written or deleted by other workers into the in-memory logs version (run by the sync job)"""
+    with logs_version_lock:
+        logs_revision = read_revision(db, "logs")
+        newest_id = db.execute(select(func.max(LogModel.id))).scalar() or 0
+        adopt_logs_version(logs_revision, newest_id)
+
+
+def get_logs_version() -> str:
+    """
+    Version of the logs table kept in memory, so checking it never touches the
+    database: the newest id this worker wrote or the sync job saw changes when
+    logs are added, the "logs" revision when any are deleted. Logs still queued
+    in the log writer are not part of it, nor of the logs it describes
+    """
+    return f"{revisions.current('log_id')}-{revisions.current('logs')}"
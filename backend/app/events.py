@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class Event:
+    """A change notification with a sequential id"""
+
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id: int, event_type: str, data: Dict[str, Any]):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "type": self.type, "data": self.data}
+
+    def to_sse(self) -> str:
+        """Format the event as a Server-Sent Events message"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """
+    A subscriber's bounded buffer, bound to the event loop that consumes it.
+
+    When the consumer falls behind and the buffer fills up the subscription is
+    marked ``overflowed``; the consumer should then disconnect and resume from
+    its last event id, which replays the missed events from the bus history.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.overflowed = False
+
+    def push(self, event: Event):
+        """Hand an event over to the consumer's loop, callable from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The consumer's loop is already closed
+            pass
+
+    def _put(self, event: Event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None when nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """
+    In-process publish/subscribe channel for state, log and run notifications.
+
+    Publishers may run on any thread (request handlers, the scheduler, the log
+    writer). The most recent events are kept in a bounded history so a client
+    reconnecting with its last event id receives what it missed.
+    """
+
+    def __init__(self, history_size: int = 1000, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        """Publish an event to every subscriber"""
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Subscribe from the running event loop. With last_event_id, missed events
+        are replayed first; a "reset" event is sent instead when they have already
+        left the history, or the id was never issued by this bus, telling the
+        client to reload its data.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            replay = self._missed_events(last_event_id)
+            self._subscribers.add(subscription)
+
+        for event in replay:
+            subscription._put(event)
+        return subscription
+
+    def _missed_events(self, last_event_id: Optional[int]) -> List[Event]:
+        if last_event_id is None or last_event_id == self._last_id:
+            return []
+        if last_event_id > self._last_id:
+            # Ids from another process (a restart, or another worker), nothing can be replayed
+            return [Event(self._last_id, "reset", {"reason": "Event ids restarted"})]
+
+        oldest_id = self._history[0].id if self._history else self._last_id + 1
+        # Replaying more than fits in the buffer would only overflow it again
+        if last_event_id < oldest_id - 1 or self._last_id - last_event_id > self.buffer_size:
+            return [Event(self._last_id, "reset", {"reason": "Missed events are no longer available"})]
+        return [event for event in self._history if event.id > last_event_id]
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "last_event_id": self._last_id,
+            "history": len(self._history),
+        }
+
+
+class RemoteChanges:
+    """
+    How far the sync job has looked at counters shared through the database
+    (state and logs revisions, the newest log id), so it can publish on this
+    worker's bus what other workers changed. Values this worker produced are
+    recorded by wrapping their commit in ``committing``, since they are published
+    when made. Nothing is recorded before the first sync, so no sync job means no growth.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = {}
+        self._own: Dict[str, Set[int]] = {}
+
+    @contextmanager
+    def committing(self, name: str, *values: int):
+        """
+        Wrap the commit writing values of name: they are recorded as this worker's
+        before the sync job can look again, so it never sees them committed but not
+        yet recorded and republishes them. Nothing is recorded when the commit fails.
+        """
+        with self._lock:
+            yield
+            if name in self._seen:
+                self._own.setdefault(name, set()).update(values)
+
+    def advance(self, name: str, current: int) -> Tuple[Optional[int], Set[int]]:
+        """
+        Move the position of name to current, returns the previous position (None
+        on the first call) and the values up to current this worker produced itself
+        """
+        with self._lock:
+            previous = self._seen.get(name)
+            own = self._own.pop(name, set())
+            self._seen[name] = current
+            self._own[name] = {value for value in own if value > current}
+            return previous, {value for value in own if value <= current}
+
+    def changed_elsewhere(self, name: str, current: int) -> bool:
+        """Whether another worker moved the counter name since the last call"""
+        previous, own = self.advance(name, current)
+        if previous is None or previous == current:
+            return False
+        return current < previous or any(value not in own for value in range(previous + 1, current + 1))
+
+    def reset(self):
+        with self._lock:
+            self._seen.clear()
+            self._own.clear()
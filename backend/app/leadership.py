@@ -0,0 +1,57 @@
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import acquire_lease, get_lease, release_lease
+
+# Identifies this worker process as a lease holder
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    A named database lease held by at most one worker process at a time.
+
+    The holder renews it periodically; if it stops (crash, hang, shutdown)
+    another worker acquires it once ``ttl`` seconds have passed since the last
+    renewal. Leadership is only trusted locally until the expiry of the last
+    successful renewal, so a worker that stalled past it stops acting as leader
+    even before it learns that someone else took over.
+    """
+
+    def __init__(self, name: str, ttl: float, holder: str = WORKER_ID):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder
+        self.expires_at: Optional[datetime] = None
+
+    @property
+    def is_held(self) -> bool:
+        return self.expires_at is not None and datetime.now() < self.expires_at
+
+    def renew(self) -> bool:
+        """Take or renew the lease, returns whether this worker holds it"""
+        try:
+            self.expires_at = acquire_lease(self.name, self.holder, self.ttl)
+        except SQLAlchemyError as e:
+            # Without the database leadership cannot be confirmed, step down
+            print(f"Could not renew the {self.name} lease: {e}")
+            self.expires_at = None
+        return self.is_held
+
+    def release(self):
+        """Give the lease up so another worker can take over without waiting for it to expire"""
+        if self.expires_at is None:
+            return
+        self.expires_at = None
+        try:
+            release_lease(self.name, self.holder)
+        except SQLAlchemyError as e:
+            print(f"Could not release the {self.name} lease: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"worker": self.holder, "is_leader": self.is_held, "lease": get_lease(self.name)}
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from app.metrics import LOG_WRITER_DROPPED
+
+
+class LogWriter:
+    """
+    Write-behind buffer for log rows.
+
+    Rows are queued in memory and written by ``flush_func`` in batches, either
+    when ``batch_size`` rows are pending or ``flush_interval`` seconds have
+    passed. Without a running flusher thread every row is written immediately.
+    Rows of a failed flush go back to the queue and the flusher waits before
+    retrying, doubling the wait up to ``max_retry_delay`` while failures last,
+    so ``flush_func`` must only raise when it wrote none of the rows.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[List[Dict[str, Any]]], None],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        max_retry_delay: float = 30.0,
+    ):
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retry_delay = max_retry_delay
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        LOG_WRITER_DROPPED.inc(0)  # export the series before the first drop
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._consecutive_failures = 0
+        self._last_batch_size = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def enqueue(self, source: str, data: str, action_taken: str = "None"):
+        """Queue a single log row, ``data`` is the already serialized payload"""
+        self.enqueue_many([(source, data, action_taken)])
+
+    def enqueue_many(self, entries):
+        """Queue several (source, data, action_taken) rows at once"""
+        timestamp = datetime.now()
+        rows = [
+            {"source": source, "data": data, "action_taken": action_taken, "timestamp": timestamp}
+            for source, data, action_taken in entries
+        ]
+        if not rows:
+            return
+
+        with self._condition:
+            self._queue.extend(rows)
+            self._enqueued += len(rows)
+            depth = len(self._queue)
+            if depth >= self.batch_size:
+                self._condition.notify()
+
+        # Write through when nobody drains the queue, and apply backpressure when it is full
+        if not self.running or depth >= self.max_queue:
+            self.flush()
+
+    def flush(self) -> int:
+        """Synchronously write every pending row, returns the number of rows written"""
+        with self._flush_lock:
+            with self._condition:
+                rows = list(self._queue)
+                self._queue.clear()
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self.flush_func(rows)
+            except Exception as error:
+                # Any error, not only database ones: the rows were already taken off the queue
+                self._requeue(rows)
+                self._failed_flushes += 1
+                self._consecutive_failures += 1
+                print(f"Error flushing logs: {error}")
+                return 0
+
+            self._consecutive_failures = 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._flushes += 1
+            self._written += len(rows)
+            self._last_batch_size = len(rows)
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return len(rows)
+
+    def _requeue(self, rows):
+        """Put rows from a failed flush back in front of the queue, dropping the oldest on overflow"""
+        with self._condition:
+            self._queue.extendleft(reversed(rows))
+            while len(self._queue) > self.max_queue:
+                self._queue.popleft()
+                self._dropped += 1
+                LOG_WRITER_DROPPED.inc()
+
+    def _retry_delay(self) -> float:
+        return min(self.flush_interval * 2 ** (self._consecutive_failures - 1), self.max_retry_delay)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._consecutive_failures:
+                    # Wait out the backoff even when new rows fill the queue, instead of retrying in a busy loop
+                    deadline = time.monotonic() + self._retry_delay()
+                    while not self._stopping and time.monotonic() < deadline:
+                        self._condition.wait(deadline - time.monotonic())
+                elif not self._stopping and len(self._queue) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self.running:
+            return
+        with self._condition:
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still pending"""
+        thread = self._thread
+        if thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters describing queue depth and flush latency"""
+        return {
+            "running": self.running,
+            "queue_depth": len(self._queue),
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "dropped": self._dropped,
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+            "consecutive_failures": self._consecutive_failures,
+            "last_batch_size": self._last_batch_size,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+            "max_flush_ms": round(self._max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self._flushes, 3) if self._flushes else 0.0,
+        }
@@ -4,19 +4,32 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routes.api import router as api_router
-from app.database import init_db
-from app.scheduler import init_scheduler, scheduler
+from app.routes.events import router as events_router
+from app.routes.metrics import router as metrics_router
+from app.database import init_db, log_sqlite_pragmas, log_writer
+from app.scheduler import init_scheduler, shutdown_scheduler
+from app.services.http_client import upstream
+from app.services.weather_service import warm_gridpoint_cache
 from app.config import settings
+from app.serialization import FastJSONResponse
+from app.metrics import MetricsMiddleware
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
-    # Startup: initialize database and scheduler
+    # Startup: initialize database, log writer, gridpoint cache and scheduler
     init_db()
+    log_sqlite_pragmas()
+    log_writer.start()
+    if settings.GRIDPOINT_PREWARM:
+        # Runs in the background on the upstream loop so startup is not blocked on NOAA
+        upstream.submit(warm_gridpoint_cache())
     init_scheduler()
     yield
-    # Shutdown: stop the background scheduler gracefully
-    scheduler.shutdown()
+    # Shutdown: stop the background scheduler gracefully and release its lease, then write any buffered logs
+    shutdown_scheduler()
+    upstream.close()
+    log_writer.stop()
 
 
 # Initialize FastAPI app
@@ -25,6 +38,7 @@ app = FastAPI(
     description="API for a miniaturized automation suite for managing social media actions",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 
@@ -37,8 +51,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include API router
+# Request latency per route, outermost so it covers CORS handling too
+app.add_middleware(MetricsMiddleware)
+
+# Include API routers
 app.include_router(api_router, prefix="/api")
+app.include_router(events_router, prefix="/api")
+# Prometheus scrapes /metrics at the root
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,290 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds, from a fast SQLite commit up to a slow upstream timeout
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already collected samples: the smallest value covering ``fraction`` of them"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    # Rounded first so float noise such as 0.07 * 100 = 7.000000000000001 does not push the rank up
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[min(max(rank - 1, 0), len(ordered) - 1)]
+
+
+class Metric:
+    """A named metric with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is read from ``function`` at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Callable[[], float] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per bucket counts (the last one is +Inf), then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics collection rendered in the Prometheus text format.
+
+    Recording is a dict update under a per-metric lock, so metrics can sit on
+    hot paths; all formatting work happens when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Callable[[], float] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Upstream APIs, labelled by the name callers pass (noaa_points, noaa_forecast, sportsdb)
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds", "Latency of upstream HTTP requests", ["upstream"]
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "Upstream HTTP responses by status code", ["upstream", "status"]
+)
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Failed upstream requests by error kind", ["upstream", "kind"]
+)
+CIRCUIT_STATE = registry.gauge(
+    "upstream_circuit_state", "Circuit breaker state per upstream: 0 closed, 1 half-open, 2 open", ["upstream"]
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "upstream_circuit_transitions_total", "Circuit breaker state changes per upstream", ["upstream", "state"]
+)
+CIRCUIT_REJECTED = registry.counter(
+    "upstream_circuit_rejected_total", "Upstream calls short-circuited by an open breaker", ["upstream"]
+)
+UPSTREAM_RETRIES = registry.counter(
+    "upstream_retries_total", "Upstream requests retried after a failure", ["upstream"]
+)
+STALE_FALLBACKS = registry.counter(
+    "upstream_stale_fallbacks_total", "Times the last good response was served because the upstream failed", ["upstream"]
+)
+DATA_STORE_READS = registry.counter(
+    "data_store_reads_total", "Last known good data reads by kind and outcome (fresh, stale, miss, revalidate, expired)", ["kind", "outcome"]
+)
+MOCK_FALLBACKS = registry.counter(
+    "mock_fallbacks_total", "Times a service answered with mock data after an upstream failure", ["service"]
+)
+
+# Database
+DB_LATENCY = registry.histogram(
+    "db_operation_duration_seconds", "Latency of database operations, including commit", ["operation"]
+)
+LOG_WRITER_DROPPED = registry.counter(
+    "log_writer_dropped_total", "Log rows dropped after failed flushes"
+)
+
+# Automation runs and scheduled jobs
+AUTOMATION_RUN_DURATION = registry.histogram(
+    "automation_run_duration_seconds", "Duration of automation runs from fetch to recorded result", ["mode"]
+)
+JOB_DURATION = registry.histogram(
+    "scheduler_job_duration_seconds", "Duration of scheduled jobs", ["job"]
+)
+JOB_RUNS = registry.counter(
+    "scheduler_job_runs_total", "Scheduled job executions by outcome", ["job", "outcome"]
+)
+JOB_MISSED = registry.counter(
+    "scheduler_job_missed_total",
+    "Scheduled job runs missed, past their misfire grace time or skipped while the previous run was still going",
+    ["job", "reason"],
+)
+
+# HTTP API, labelled by route template so ids do not create new series
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Latency of API requests", ["method", "route", "status"]
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing request latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.models.base import Base
+
+
+class GridpointModel(Base):
+    """SQLAlchemy model caching NOAA points lookups (coordinates -> forecast URL)"""
+    __tablename__ = "gridpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    location = Column(String(64), unique=True, nullable=False)  # "lat,lon" as used in the points URL
+    forecast_url = Column(String(255), nullable=False)
+    resolved_at = Column(DateTime, default=datetime.now)
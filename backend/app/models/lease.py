@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+
+from app.models.base import Base
+
+
+class LeaseModel(Base):
+    """SQLAlchemy model for named leases held by one worker process at a time (e.g. scheduler leadership)"""
+    __tablename__ = "leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)  # worker id, see app.leadership.WORKER_ID
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
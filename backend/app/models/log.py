@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Dict, Any
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from pydantic import BaseModel, ConfigDict
 
 from app.models.base import Base
@@ -15,6 +15,12 @@ class LogModel(Base):
     data = Column(Text, nullable=False)
     action_taken = Column(String(255), default="None")
 
+    # Keyset pagination: newest-first per source, and time range filters
+    __table_args__ = (
+        Index("ix_logs_source_id", "source", "id"),
+        Index("ix_logs_timestamp", "timestamp"),
+    )
+
 # Pydantic models for API
 class LogBase(BaseModel):
     """Base model for log entries"""
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.models.base import Base
+
+
+class RevisionModel(Base):
+    """SQLAlchemy model for change counters of data without a version of its own, shared by every worker process"""
+    __tablename__ = "revisions"
+
+    name = Column(String(32), primary_key=True)  # "logs" when logs are deleted, "state" when a target state changes
+    revision = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+
+from app.models.base import Base
+
+
+class LogRollupModel(Base):
+    """SQLAlchemy model for hourly log aggregates, one row per bucket and dimension combination"""
+    __tablename__ = "log_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime, nullable=False)  # start of the hour
+    source = Column(String(50), nullable=False)
+    # Dimensions read from the payload, "" when the log has none
+    target = Column(String(50), nullable=False, default="")
+    status = Column(String(20), nullable=False, default="")
+    city = Column(String(64), nullable=False, default="")
+    upstream = Column(String(50), nullable=False, default="")
+
+    count = Column(Integer, nullable=False, default=0)
+    temp_count = Column(Integer, nullable=False, default=0)
+    temp_sum = Column(Float, nullable=False, default=0.0)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+
+    # Range queries filter on the leading bucket column
+    __table_args__ = (
+        UniqueConstraint("bucket", "source", "target", "status", "city", "upstream", name="uq_log_rollups_key"),
+    )
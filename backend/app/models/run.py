@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+
+from app.models.base import Base
+
+
+class AutomationRunModel(Base):
+    """SQLAlchemy model for finished automation runs and their stage timings"""
+    __tablename__ = "automation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    started_at = Column(DateTime, default=datetime.now, index=True)
+    mode = Column(String(20), nullable=False)  # "single" or "fanout"
+    city = Column(String(64), nullable=False)
+    source = Column(String(50), nullable=False)
+    duration_ms = Column(Float, nullable=False, index=True)
+    trace = Column(Text, nullable=False)  # JSON span tree
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime
+
+from app.models.base import Base
+
+
+class RuntimeSettingModel(Base):
+    """SQLAlchemy model for settings changed at runtime, shared by every worker process"""
+    __tablename__ = "runtime_settings"
+
+    key = Column(String(64), primary_key=True)  # name of the attribute on app.config.settings
+    value = Column(Text, nullable=False)  # JSON
+    version = Column(Integer, nullable=False, default=1)  # incremented on every change
+    updated_at = Column(DateTime, default=datetime.now)
@@ -6,6 +6,7 @@ from sqlalchemy import Column, Integer, String, DateTime
 from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.base import Base
+from app.models.log import Log
 
 
 class SocialTarget(str, Enum):
@@ -52,6 +53,7 @@ class StateUpdate(BaseModel):
 
 class AutomationRequest(BaseModel):
     city: Optional[str] = Field(default=None, strict=True)
+    trace: bool = False  # include the run's stage timings in the response
 
 
 class AutomationResponse(BaseModel):
@@ -59,8 +61,37 @@ class AutomationResponse(BaseModel):
     weather: Dict[str, Any]
     sports: Dict[str, Any]
     actions: List[str]
+    transitions: Dict[str, Dict[str, str]] = {}
     states: List[Dict[str, Any]]
     city_warning: Optional[str] = None
+    # Seconds since the weather and sports data were fetched, None for mock data
+    data_age: Optional[Dict[str, Optional[float]]] = None
+    trace: Optional[Dict[str, Any]] = None
+
+
+class FanoutRequest(BaseModel):
+    cities: Optional[List[str]] = None
+    max_concurrency: Optional[int] = Field(default=None, ge=1, le=100)
+    trace: bool = False
+
+
+class CityResult(BaseModel):
+    city: str
+    weather: Dict[str, Any]
+    actions: List[str]
+    applied: bool
+    data_age: Optional[float] = None
+
+
+class FanoutResponse(BaseModel):
+    timestamp: str
+    primary_city: str
+    sports: Dict[str, Any]
+    cities: List[CityResult]
+    transitions: Dict[str, Dict[str, str]] = {}
+    states: List[Dict[str, Any]]
+    data_age: Optional[Dict[str, Optional[float]]] = None  # sports only, weather ages are per city
+    trace: Optional[Dict[str, Any]] = None
 
 
 class SettingsResponse(BaseModel):
@@ -71,9 +102,83 @@ class SettingsResponse(BaseModel):
     targets: List[str]
 
 
+class DashboardResponse(BaseModel):
+    cursor: str
+    full: bool
+    states: Optional[List[State]] = None
+    settings: Optional[SettingsResponse] = None
+    latest: Dict[str, Log] = {}
+    logs: List[Log] = []
+
+
 class CadenceResponse(BaseModel):
     message: str
 
 
 class MessageResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+
+class RetentionResponse(BaseModel):
+    deleted: Dict[str, int]
+    rows_deleted: int
+    bytes_reclaimed: int
+    duration_ms: float
+
+
+class AnalyticsPoint(BaseModel):
+    bucket: datetime
+    source: Optional[str] = None
+    target: Optional[str] = None
+    status: Optional[str] = None
+    city: Optional[str] = None
+    upstream: Optional[str] = None
+    count: int
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    temp_avg: Optional[float] = None
+
+
+class AnalyticsResponse(BaseModel):
+    bucket: str
+    since: datetime
+    until: datetime
+    group_by: List[str]
+    series: List[AnalyticsPoint]
+
+
+class RollupRebuildResponse(BaseModel):
+    logs_scanned: int
+    duration_ms: float
+
+
+class RunTrace(BaseModel):
+    id: int
+    started_at: datetime
+    mode: str
+    city: str
+    source: str
+    duration_ms: float
+    trace: Dict[str, Any]
+
+
+class CircuitBreakerState(BaseModel):
+    name: str
+    state: str  # closed, open or half_open
+    consecutive_failures: int
+    retry_in: float  # seconds until a half-open probe is allowed
+    timeout: float  # current adaptive request timeout in seconds
+    latency_p50_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+    successes: int
+    failures: int
+    rejected: int
+
+
+class StatsResponse(BaseModel):
+    log_writer: Dict[str, Any]
+    http_cache: Dict[str, Any]
+    events: Dict[str, Any]
+    runs: Dict[str, Any]
+    data_store: Dict[str, Any]
+    scheduler: Dict[str, Any]
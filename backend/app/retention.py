@@ -0,0 +1,77 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.database import (
+    bump_logs_revision,
+    delete_log_batch,
+    delete_runs_before,
+    get_database_size,
+    get_freelist_count,
+    incremental_vacuum,
+)
+
+
+def prune_logs(retention_days: Optional[Dict[str, int]] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Delete logs older than their source's TTL and shrink the database file.
+
+    Rows are deleted in small batches and free pages are returned in bounded
+    chunks, each committed on its own with a short pause in between, so writers
+    only ever wait for one short transaction. Sources without a TTL are kept.
+
+    Args:
+        retention_days: {source: days to keep}, defaults to settings.LOG_RETENTION_DAYS
+        batch_size: Rows deleted per transaction, defaults to settings.LOG_RETENTION_BATCH_SIZE
+    """
+    retention_days = settings.LOG_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    started = time.perf_counter()
+    size_before = get_database_size()
+
+    deleted = {}
+    for source, days in retention_days.items():
+        cutoff = datetime.now() - timedelta(days=days)
+        deleted[source] = 0
+        while True:
+            count = delete_log_batch(source, cutoff, batch_size)
+            deleted[source] += count
+            if count < batch_size:
+                break
+            time.sleep(settings.LOG_RETENTION_BATCH_PAUSE)
+
+    if any(deleted.values()):
+        bump_logs_revision()
+    vacuum_free_pages()
+    size_after = get_database_size()
+
+    return {
+        "deleted": deleted,
+        "rows_deleted": sum(deleted.values()),
+        "bytes_reclaimed": max(size_before - size_after, 0),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def vacuum_free_pages(pages_per_chunk: Optional[int] = None) -> int:
+    """Return free pages to the OS in chunks of pages_per_chunk, returns the number of chunks"""
+    pages_per_chunk = pages_per_chunk or settings.LOG_RETENTION_VACUUM_PAGES
+    chunks = 0
+    free_pages = get_freelist_count()
+    while free_pages > 0:
+        incremental_vacuum(pages_per_chunk)
+        chunks += 1
+        remaining = get_freelist_count()
+        if remaining >= free_pages:
+            break  # nothing was freed, do not spin
+        free_pages = remaining
+        if free_pages:
+            time.sleep(settings.LOG_RETENTION_BATCH_PAUSE)
+    return chunks
+
+
+def prune_runs(days: Optional[int] = None) -> int:
+    """Delete recorded automation runs older than RUN_HISTORY_DAYS, returns the number deleted"""
+    days = settings.RUN_HISTORY_DAYS if days is None else days
+    return delete_runs_before(datetime.now() - timedelta(days=days))
@@ -0,0 +1,34 @@
+import threading
+
+# Process-wide revision counters for data that has no version of its own:
+# "settings" changes with runtime settings (cadence). The settings revision is derived
+# from the versions stored in the database, so it is the same in every worker process
+# (see app.runtime_settings). Counters changed by database writes, such as the logs
+# revision, are stored in the revisions table (see app.database.get_revisions); "logs"
+# and "log_id" hold this worker's copy of the logs version (see app.database.get_logs_version)
+_lock = threading.Lock()
+_revisions = {}
+
+
+def current(name: str) -> int:
+    """Current revision of name"""
+    return _revisions.get(name, 0)
+
+
+def adopt(name: str, revision: int):
+    """Adopt a revision decided elsewhere, e.g. shared through the database"""
+    with _lock:
+        _revisions[name] = revision
+
+
+def advance(name: str, revision: int):
+    """Move name forward to revision, never back"""
+    with _lock:
+        if revision > _revisions.get(name, 0):
+            _revisions[name] = revision
+
+
+def reset():
+    """Forget every revision, for a fresh database"""
+    with _lock:
+        _revisions.clear()
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Dimensions every rollup row is keyed by, besides its hourly bucket
+ROLLUP_DIMENSIONS = ("source", "target", "status", "city", "upstream")
+
+
+def bucket_start(timestamp: datetime, bucket: str = "hour") -> datetime:
+    """Start of the hour or day a timestamp falls into"""
+    start = timestamp.replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if bucket == "day" else start
+
+
+def rollup_dimensions(source: str, data: Any) -> Tuple[str, ...]:
+    """(source, target, status, city, upstream) of a log, "" for what the payload does not carry"""
+    if not isinstance(data, dict):
+        return source, "", "", "", ""
+
+    city = data.get("city") or (data.get("name") if source == "weather" else None)
+    values = (data.get("target"), data.get("status"), city, data.get("upstream"))
+    return (source,) + tuple(value if isinstance(value, str) else "" for value in values)
+
+
+def temperature(source: str, data: Any) -> Optional[float]:
+    """Fahrenheit temperature of a weather log"""
+    if source != "weather" or not isinstance(data, dict):
+        return None
+    temp_f = (data.get("main") or {}).get("temp_f")
+    return float(temp_f) if isinstance(temp_f, (int, float)) else None
+
+
+def accumulate(entries: Iterable[Tuple[datetime, str, Any]], totals: Dict = None) -> Dict[Tuple, Dict[str, Any]]:
+    """
+    Fold (timestamp, source, data) log entries into per hour and dimension totals,
+    {(bucket, *dimensions): {count, temp_count, temp_sum, temp_min, temp_max}}
+    """
+    totals = {} if totals is None else totals
+    for timestamp, source, data in entries:
+        key = (bucket_start(timestamp),) + rollup_dimensions(source, data)
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {"count": 0, "temp_count": 0, "temp_sum": 0.0, "temp_min": None, "temp_max": None}
+        total["count"] += 1
+
+        temp_f = temperature(source, data)
+        if temp_f is not None:
+            total["temp_count"] += 1
+            total["temp_sum"] += temp_f
+            total["temp_min"] = temp_f if total["temp_min"] is None else min(total["temp_min"], temp_f)
+            total["temp_max"] = temp_f if total["temp_max"] is None else max(total["temp_max"], temp_f)
+    return totals
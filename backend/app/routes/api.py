@@ -1,51 +1,170 @@
-from typing import List, Optional
+import hashlib
+import inspect
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Literal, Optional, Union
 
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.models.log import Log
 from app.models.state import (
+    AnalyticsResponse,
     AutomationRequest,
     AutomationResponse,
     CadenceResponse,
+    CircuitBreakerState,
+    DashboardResponse,
+    FanoutRequest,
+    FanoutResponse,
     MessageResponse,
+    RetentionResponse,
+    RollupRebuildResponse,
+    RunTrace,
     SettingsResponse,
     SocialTarget,
     State,
+    StatsResponse,
     StateBase,
     StateUpdate,
 )
-from app.database import add_log, get_logs, get_states, update_state, delete_all_logs
-from app.services.automation_service import perform_automation
-from app.scheduler import modify_job_cadence
+from app.database import (
+    LOG_FIELDS,
+    add_log,
+    delete_all_logs,
+    event_bus,
+    get_logs_json,
+    get_logs_version,
+    get_versioned_state_body,
+    get_slowest_runs,
+    log_writer,
+    run_db,
+    update_state,
+)
+from app.services.automation_service import request_automation, request_fanout_automation
+from app.services.run_coordinator import RunQueueFull, run_coordinator
+from app.services.dashboard_service import get_dashboard, get_settings_snapshot
+from app.services.export_service import EXPORT_FORMATS, export_filename, export_logs
+from app.services.data_store import data_store
+from app.services.http_client import upstream
+from app.scheduler import modify_job_cadence, scheduler_lease
+from app.retention import prune_logs
+from app.analytics import get_analytics, rebuild_rollups
+from app.rollups import ROLLUP_DIMENSIONS
 from app.config import settings
+from app import revisions, serialization
 
 router = APIRouter(tags=["api"])
 
 
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header covers etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+async def conditional_response(
+    request: Request,
+    etag: str,
+    render: Callable[[], Union[bytes, Awaitable[bytes]]],
+    headers: dict = None,
+) -> Response:
+    """
+    Answer 304 Not Modified when the client already holds etag, otherwise
+    call render for the JSON body. Either way no response_model validation runs.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = render()
+    if inspect.isawaitable(body):
+        body = await body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def parse_log_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a ?fields= projection, None means every field (also for a blank one such as ?fields=,)"""
+    requested = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    unknown = [field for field in requested if field not in LOG_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown log fields: {', '.join(unknown)}")
+    return requested or None
+
+
 @router.get("/logs", response_model=List[Log])
 async def read_logs(
+    request: Request,
     limit: int = Query(50, ge=1, le=100),
-    source: Optional[str] = None
+    source: Optional[str] = None,
+    before_id: Optional[int] = Query(None, ge=1, description="Return logs older than this id (next page)"),
+    after_id: Optional[int] = Query(None, ge=0, description="Return logs newer than this id"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,timestamp,source"),
+):
+    """Get logs, newest first, with optional filtering, keyset pagination and field projection"""
+    projection = parse_log_fields(fields)
+    filters = {
+        "limit": limit,
+        "source": source,
+        "before_id": before_id,
+        "after_id": after_id,
+        "since": since,
+        "until": until,
+        "action_taken": action_taken,
+        "fields": projection,
+    }
+    # The logs version is kept in memory, so a matching ETag is answered without touching the database
+    filter_key = hashlib.sha1(repr(sorted(filters.items())).encode()).hexdigest()[:16]
+    etag = f'"logs-{get_logs_version()}-{filter_key}"'
+    return await conditional_response(request, etag, lambda: run_db(get_logs_json, **filters))
+
+
+@router.get("/logs/export")
+async def export_logs_stream(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+    gzip: bool = False,
 ):
-    """Get logs with optional filtering"""
-    return get_logs(limit=limit, source=source)
+    """Stream every matching log, oldest first, as NDJSON or CSV, optionally gzip compressed"""
+    chunks = export_logs(format, source=source, since=since, until=until, action_taken=action_taken, compress=gzip)
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[format][0]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(format, gzip)}"'},
+    )
 
 
 @router.get("/state", response_model=List[State])
-async def read_state():
+async def read_state(request: Request):
     """Get current state of all targets"""
-    return get_states()
+    # Served from the state cache's pre-serialized body, skipping response_model re-validation;
+    # the version is the stored state revision, checked first so every worker agrees on it
+    version, body = await run_db(get_versioned_state_body)
+    return await conditional_response(
+        request,
+        f'"state-{version}"',
+        lambda: body,
+        headers={"X-State-Version": str(version)},
+    )
 
 
 @router.put("/state/{target}", response_model=StateBase)
 async def update_target_state(target: SocialTarget, state_update: StateUpdate):
     """Update state of a specific target"""
-    success = update_state(target.value, state_update.status.value)
+    success = await run_db(update_state, target.value, state_update.status.value)
     if not success:
         raise HTTPException(status_code=404, detail="Target not found")
 
     action_message = f"Manually set {target.value} to {state_update.status.value}"
-    add_log("manual", {"target": target.value, "status": state_update.status.value}, action_message)
+    await run_db(add_log, "manual", {"target": target.value, "status": state_update.status.value}, action_message)
 
     return {"target": target, "status": state_update.status}
 
@@ -54,39 +173,124 @@ async def update_target_state(target: SocialTarget, state_update: StateUpdate):
 async def run_automation(automation_request: AutomationRequest = None):
     """Manually trigger automation job with optional city"""
     city = automation_request.city if automation_request else None
+    include_trace = automation_request.trace if automation_request else False
     city_warning = None
 
     if city and city not in settings.CITY_COORDINATES:
         city_warning = f"Unknown city '{city}', using {settings.DEFAULT_CITY}"
 
-    result = perform_automation(city, source="manual")
-    result["city_warning"] = city_warning
-    return result
+    try:
+        result = await request_automation(city, source="manual")
+    except RunQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # The result may be shared with other callers of the same run
+    return {**result, "city_warning": city_warning, "trace": result.get("trace") if include_trace else None}
+
+
+@router.post("/run/all", response_model=FanoutResponse)
+async def run_fanout_automation(fanout_request: FanoutRequest = None):
+    """Manually trigger automation for many cities (all configured cities by default)"""
+    cities = fanout_request.cities if fanout_request else None
+    max_concurrency = fanout_request.max_concurrency if fanout_request else None
+    include_trace = fanout_request.trace if fanout_request else False
+    try:
+        result = await request_fanout_automation(cities, source="manual", max_concurrency=max_concurrency)
+    except RunQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**result, "trace": result.get("trace") if include_trace else None}
+
+
+@router.get("/runs/slowest", response_model=List[RunTrace])
+async def read_slowest_runs(
+    limit: int = Query(10, ge=1, le=100),
+    hours: int = Query(24, ge=1, le=24 * 30, description="How far back to look"),
+):
+    """Slowest recent automation runs with their per-stage timings"""
+    return await run_db(get_slowest_runs, datetime.now() - timedelta(hours=hours), limit)
 
 
 @router.put("/cadence", response_model=CadenceResponse)
 async def update_cadence(minutes: int = Query(..., ge=5, le=1440)):
     """Update automation job cadence"""
-    return modify_job_cadence(minutes)
+    # Stores the setting in the database, so it runs on the database threadpool
+    return await run_db(modify_job_cadence, minutes)
 
 
 @router.get("/settings", response_model=SettingsResponse)
-async def get_settings():
+async def get_settings(request: Request):
     """Get current application settings"""
-    return {
-        "app_name": settings.APP_NAME,
-        "cadence": settings.AUTOMATION_CADENCE,
-        "city": settings.DEFAULT_CITY,
-        "available_cities": settings.AVAILABLE_CITIES,
-        "targets": settings.SOCIAL_TARGETS
-    }
+    etag = f'"settings-{revisions.current("settings")}"'
+    return await conditional_response(request, etag, lambda: serialization.dumps(get_settings_snapshot()))
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def read_dashboard(
+    cursor: Optional[str] = Query(None, description="Cursor of a previous response, to only get what changed"),
+    limit: int = Query(50, ge=1, le=100),
+):
+    """Get states, settings, the newest weather/sports records and recent logs in one request"""
+    return await run_db(get_dashboard, cursor, limit=limit)
 
 
 @router.delete("/logs", response_model=MessageResponse)
 async def clear_logs():
     """Clear all logs from the database"""
-    success = delete_all_logs()
+    success = await run_db(delete_all_logs)
     if success:
         return {"message": "All logs cleared successfully"}
     else:
         raise HTTPException(status_code=500, detail="Failed to clear logs")
+
+
+@router.post("/admin/retention", response_model=RetentionResponse)
+async def run_retention():
+    """Prune logs past their per-source retention and report what was reclaimed"""
+    return await run_db(prune_logs)
+
+
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def read_analytics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bucket: Literal["hour", "day"] = "hour",
+    group_by: str = Query("source", description="Comma-separated dimensions: source,target,status,city,upstream"),
+    source: Optional[str] = None,
+    target: Optional[str] = None,
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    upstream: Optional[str] = None,
+):
+    """Log counts and temperature stats per hour or day, answered from the rollups (last 24 hours by default)"""
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    unknown = [dimension for dimension in dimensions if dimension not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown dimensions: {', '.join(unknown)}")
+
+    values = {"source": source, "target": target, "status": status, "city": city, "upstream": upstream}
+    filters = {dimension: value for dimension, value in values.items() if value is not None}
+    return await run_db(get_analytics, since, until, bucket, dimensions, filters)
+
+
+@router.post("/admin/analytics/rebuild", response_model=RollupRebuildResponse)
+async def rebuild_analytics():
+    """Recompute the analytics rollups from the logs table"""
+    return await run_db(rebuild_rollups)
+
+
+@router.get("/upstreams", response_model=List[CircuitBreakerState])
+async def read_upstreams():
+    """Get the circuit breaker state, adaptive timeout and latency of each upstream API"""
+    return upstream.breakers.stats()
+
+
+@router.get("/stats", response_model=StatsResponse)
+async def read_stats():
+    """Get internal counters such as log writer queue depth, HTTP cache hit rates, event subscribers, runs, stored data ages and scheduler leadership"""
+    return {
+        "log_writer": log_writer.stats(),
+        "http_cache": upstream.cache.stats(),
+        "events": event_bus.stats(),
+        "runs": run_coordinator.stats(),
+        "data_store": data_store.stats(),
+        "scheduler": await run_db(scheduler_lease.stats),
+    }
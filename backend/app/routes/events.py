@@ -0,0 +1,72 @@
+from typing import Optional
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.database import event_bus
+
+router = APIRouter(tags=["events"])
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value and value.isdigit():
+        return int(value)
+    return None
+
+
+@router.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[int] = None):
+    """
+    Stream state transitions, new logs and finished runs as Server-Sent Events.
+    Reconnecting clients resume through the Last-Event-ID header (or last_event_id).
+    """
+    resume_from = parse_last_event_id(request.headers.get("last-event-id"))
+    subscription = event_bus.subscribe(resume_from if resume_from is not None else last_event_id)
+
+    async def event_stream():
+        try:
+            # Ask EventSource to reconnect quickly after the stream ends
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.get(settings.EVENT_HEARTBEAT_SECONDS)
+                if event is not None:
+                    yield event.to_sse()
+                elif await request.is_disconnected():
+                    break
+                else:
+                    yield ": keepalive\n\n"
+
+                # A lagging client is disconnected once its buffer is drained, it resumes from history
+                if subscription.overflowed and subscription.queue.empty():
+                    break
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, last_event_id: Optional[int] = None):
+    """WebSocket equivalent of /events, each message is {"id", "type", "data"}"""
+    await websocket.accept()
+    subscription = event_bus.subscribe(last_event_id)
+    try:
+        while True:
+            event = await subscription.get(settings.EVENT_HEARTBEAT_SECONDS)
+            if event is None:
+                await websocket.send_json({"type": "keepalive"})
+                continue
+
+            await websocket.send_json(event.to_dict())
+            if subscription.overflowed and subscription.queue.empty():
+                await websocket.close(code=1013)  # Try again later: reconnect with last_event_id
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_bus.unsubscribe(subscription)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import event_bus, log_writer
+from app.metrics import registry
+from app.services.http_client import upstream
+from app.services.run_coordinator import run_coordinator
+
+router = APIRouter(tags=["metrics"])
+
+# Gauges read at scrape time from the components that already track them
+registry.gauge("log_writer_queue_depth", "Log rows waiting to be written", function=lambda: log_writer.stats()["queue_depth"])
+registry.gauge("event_subscribers", "Connected event stream clients", function=lambda: event_bus.stats()["subscribers"])
+registry.gauge("automation_runs_in_flight", "Automation runs waiting or executing", function=lambda: len(run_coordinator.stats()["in_flight"]))
+registry.gauge("http_cache_entries", "Upstream responses held in the HTTP cache", function=lambda: upstream.cache.stats()["entries"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
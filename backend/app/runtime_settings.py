@@ -0,0 +1,41 @@
+from typing import Any, Dict, List
+
+from app import revisions
+from app.config import settings
+from app.database import get_runtime_settings, save_runtime_setting
+
+# Settings that can change while the app runs; stored in the database so every worker applies them
+RUNTIME_SETTINGS = ("AUTOMATION_CADENCE",)
+
+# Version of each runtime setting applied in this process
+_applied: Dict[str, int] = {}
+
+
+def _apply(key: str, value: Any, version: int):
+    setattr(settings, key, value)
+    _applied[key] = version
+    # Versions only go up, so their sum is a settings revision every worker agrees on
+    revisions.adopt("settings", sum(_applied.values()))
+
+
+def save(key: str, value: Any):
+    """Store a runtime setting for every worker and apply it to this one right away"""
+    if key not in RUNTIME_SETTINGS:
+        raise ValueError(f"{key} is not a runtime setting")
+    _apply(key, value, save_runtime_setting(key, value))
+
+
+def sync() -> List[str]:
+    """Apply runtime settings changed by other workers, returns the keys that changed"""
+    changed = []
+    for key, (value, version) in get_runtime_settings().items():
+        if key in RUNTIME_SETTINGS and _applied.get(key) != version:
+            _apply(key, value, version)
+            changed.append(key)
+    return changed
+
+
+def reset():
+    """Forget the applied versions, for a fresh database"""
+    _applied.clear()
+    revisions.adopt("settings", 0)
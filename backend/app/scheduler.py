@@ -1,47 +1,180 @@
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.base import JobLookupError
 from datetime import datetime
-from app.services.automation_service import perform_automation
+from sqlalchemy.exc import SQLAlchemyError
+from app.services.automation_service import request_automation, request_fanout_automation
+from app.services.http_client import upstream
+from app.services.dashboard_service import publish_remote_changes
+from app.services.run_coordinator import RunQueueFull
+from app.retention import prune_logs, prune_runs
 from app.config import settings
+from app.metrics import JOB_DURATION, JOB_MISSED, JOB_RUNS
+from app.leadership import Lease
+from app import runtime_settings
 
 # Create scheduler
 scheduler = BackgroundScheduler()
 
+# Every worker runs the sync job, only the holder of this lease runs the automation and retention jobs
+scheduler_lease = Lease("scheduler", ttl=settings.SCHEDULER_LEASE_TTL)
+LEADER_JOBS = ("automation_job", "retention_job")
+
+
 def automation_job():
     """Job to run the automation service"""
-    print(f"Running scheduled automation job at {datetime.now().isoformat()}")
-    perform_automation()
+    if not scheduler_lease.is_held:
+        # The lease expired before the sync job could hand the jobs over
+        print("Skipping scheduled automation job, this worker no longer holds the scheduler lease")
+        JOB_RUNS.inc(job="automation_job", outcome="skipped")
+        return
+
+    # Overlapping ticks are skipped by max_instances=1. Runs for other cities and manual runs do
+    # not block this one, since a tick must refresh the stored data a manual run may reuse;
+    # manual runs for the same city join this one instead
+    print(f"Running scheduled {settings.AUTOMATION_MODE} automation job at {datetime.now().isoformat()}")
+    try:
+        with JOB_DURATION.time(job="automation_job"):
+            if settings.AUTOMATION_MODE == "fanout":
+                upstream.run(request_fanout_automation())
+            else:
+                upstream.run(request_automation())
+    except RunQueueFull as e:
+        print(f"Skipping scheduled automation job: {e}")
+        JOB_RUNS.inc(job="automation_job", outcome="skipped")
+    except Exception:
+        JOB_RUNS.inc(job="automation_job", outcome="error")
+        raise
+    else:
+        JOB_RUNS.inc(job="automation_job", outcome="success")
+
+
+def retention_job():
+    """Job to prune logs past their retention period"""
+    if not scheduler_lease.is_held:
+        JOB_RUNS.inc(job="retention_job", outcome="skipped")
+        return
+
+    try:
+        with JOB_DURATION.time(job="retention_job"):
+            result = prune_logs()
+            prune_runs()
+    except Exception:
+        JOB_RUNS.inc(job="retention_job", outcome="error")
+        raise
+    JOB_RUNS.inc(job="retention_job", outcome="success")
+    print(f"Retention job deleted {result['rows_deleted']} logs, reclaimed {result['bytes_reclaimed']} bytes")
+
+
+def record_missed_job(event):
+    """
+    Scheduler listener counting skipped runs: past their misfire grace time, or
+    due while the job's previous run was still going (max_instances reached)
+    """
+    if event.code == EVENT_JOB_MAX_INSTANCES:
+        print(f"Scheduled job {event.job_id} skipped, its previous run is still going")
+        JOB_MISSED.inc(job=event.job_id, reason="max_instances")
+    else:
+        print(f"Scheduled job {event.job_id} missed its run at {event.scheduled_run_time}")
+        JOB_MISSED.inc(job=event.job_id, reason="misfire")
+
+
+def schedule_automation_job(minutes: int):
+    """Add the automation job, or replace it with one at the new cadence"""
+    scheduler.add_job(
+        automation_job,
+        IntervalTrigger(minutes=minutes),
+        id="automation_job",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+
+def start_leader_jobs():
+    """Schedule the jobs only the scheduler lease holder runs"""
+    schedule_automation_job(settings.AUTOMATION_CADENCE)
+    scheduler.add_job(
+        retention_job,
+        IntervalTrigger(minutes=settings.LOG_RETENTION_CADENCE),
+        id="retention_job",
+        replace_existing=True
+    )
+    print(f"This worker holds the scheduler lease, running automation every {settings.AUTOMATION_CADENCE} minutes")
+
+
+def stop_leader_jobs():
+    """Remove the jobs only the scheduler lease holder runs"""
+    for job_id in LEADER_JOBS:
+        try:
+            scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
+    print("This worker lost the scheduler lease, scheduled jobs stopped")
+
+
+def sync_job():
+    """
+    Job run by every worker: apply runtime settings made by other workers and
+    publish their state and log changes to this worker's event stream, then take
+    or renew the scheduler lease, starting or stopping the leader jobs when
+    leadership changes
+    """
+    try:
+        changed = runtime_settings.sync()
+        publish_remote_changes()
+    except SQLAlchemyError as e:
+        print(f"Could not sync with the other workers: {e}")
+        changed = []
+
+    was_leader = scheduler.get_job("automation_job") is not None
+    is_leader = scheduler_lease.renew()
+    if is_leader and not was_leader:
+        start_leader_jobs()
+    elif was_leader and not is_leader:
+        stop_leader_jobs()
+    elif is_leader and "AUTOMATION_CADENCE" in changed:
+        schedule_automation_job(settings.AUTOMATION_CADENCE)
+
 
 def init_scheduler():
     """Initialize and start the scheduler"""
     try:
-        # Add automation job with cadence from settings
         scheduler.add_job(
-            automation_job,
-            IntervalTrigger(minutes=settings.AUTOMATION_CADENCE),
-            id="automation_job",
-            replace_existing=True
+            sync_job,
+            IntervalTrigger(seconds=settings.SCHEDULER_SYNC_SECONDS),
+            id="sync_job",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
         )
+        scheduler.add_listener(record_missed_job, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+        # Load stored settings and try for the lease before the first tick, so a lone worker leads right away
+        sync_job()
 
         # Start the scheduler
         scheduler.start()
-        print(f"Scheduler started. Running every {settings.AUTOMATION_CADENCE} minutes")
+        role = "leader" if scheduler_lease.is_held else "follower"
+        print(f"Scheduler started as {role}. Automation runs every {settings.AUTOMATION_CADENCE} minutes")
     except Exception as e:
         print(f"Error initializing scheduler: {e}")
 
-def modify_job_cadence(minutes: int) -> dict:
-    """Modify the cadence of the automation job"""
-    try:
-        scheduler.remove_job("automation_job")
-    except JobLookupError:
-        pass
 
-    settings.AUTOMATION_CADENCE = minutes
-    scheduler.add_job(
-        automation_job,
-        IntervalTrigger(minutes=minutes),
-        id="automation_job",
-        replace_existing=True
-    )
+def shutdown_scheduler():
+    """Stop the scheduler and hand the lease over to another worker"""
+    scheduler.shutdown()
+    scheduler_lease.release()
+
+
+def modify_job_cadence(minutes: int) -> dict:
+    """
+    Modify the cadence of the automation job. The cadence is stored for every
+    worker; the lease holder reschedules right away if it served the request,
+    otherwise on its next sync
+    """
+    runtime_settings.save("AUTOMATION_CADENCE", minutes)
+    if scheduler.get_job("automation_job") is not None:
+        schedule_automation_job(minutes)
     return {"message": f"Job cadence updated to {minutes} minutes"}
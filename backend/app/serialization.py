@@ -0,0 +1,35 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is the fallback
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+else:
+    FastJSONResponse = JSONResponse
+
+
+def dumps(value: Any) -> bytes:
+    """Encode value as compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def dumps_text(value: Any) -> str:
+    """Encode value as compact JSON text, as stored in the logs ``data`` column"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def loads(value):
+    """Decode JSON text or bytes"""
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
@@ -1,60 +1,177 @@
+import asyncio
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
-from app.services.weather_service import fetch_weather_data
-from app.services.sports_service import fetch_sports_data
+from app.services.data_store import StoredData, data_store
+from app.services.http_client import upstream
+from app.services.run_coordinator import run_coordinator
+from app.services.weather_service import fetch_weather_data_async, get_validated_city
+from app.services.sports_service import fetch_sports_data_async
 from app.config import settings
-from app.database import add_log, update_state, get_states
+from app.database import add_logs, apply_states, event_bus, get_states, run_db, save_automation_run
+from app.metrics import AUTOMATION_RUN_DURATION
+from app.tracing import span, trace
+
+
+def revalidates(source: str) -> bool:
+    """Scheduled runs keep the data store fresh, so they always fetch; other runs may reuse stored data"""
+    return source == "automation"
+
+
+async def load_weather(city: str, revalidate: bool) -> StoredData:
+    """A city's weather from the last known good data store"""
+    return await data_store.get(
+        f"weather:{city}", lambda: fetch_weather_data_async(city), settings.WEATHER_FRESH_SECONDS, revalidate
+    )
+
+
+async def load_sports(revalidate: bool) -> StoredData:
+    """The sports feed from the last known good data store"""
+    return await data_store.get("sports", lambda: fetch_sports_data_async(), settings.SPORTS_FRESH_SECONDS, revalidate)
+
+
+async def fetch_upstream_data(
+    city=None, revalidate=True
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, bool]]:
+    """
+    Weather and sports data, fetched concurrently unless fresh enough stored data
+    can be used. Also returns the age in seconds of each (None for mock data) and
+    whether each is new to this run, i.e. not yet logged by an earlier run.
+    """
+    weather, sports = await asyncio.gather(load_weather(city, revalidate), load_sports(revalidate))
+    return (
+        weather.data,
+        sports.data,
+        {"weather": weather.age, "sports": sports.age},
+        {"weather": weather.claim(), "sports": sports.claim()},
+    )
 
 
 def perform_automation(city=None, source="automation"):
     """
     Perform the main automation routine:
-    1. Fetch weather and sports data
-    2. Log the data
-    3. Perform actions based on the data
+    1. Fetch weather and sports data (concurrently); runs that are not scheduled
+       use stored data that is fresh enough and refresh stale data in the background
+    2. Perform actions based on the data, writing only the states that change
+    3. Log the data and the actions that caused a transition
     4. Return the results
-    
+
     Args:
         city: City name for weather data (optional)
         source: Source of the automation trigger ("manual" or "automation")
     """
     effective_city = city or settings.DEFAULT_CITY
-    weather_data = fetch_weather_data(effective_city)
-    sports_data = fetch_sports_data()
+    with traced_run("single", effective_city, source) as root:
+        with span("fetch"):
+            weather_data, sports_data, data_age, new_data = upstream.run(
+                fetch_upstream_data(effective_city, revalidates(source))
+            )
+        result = record_automation(effective_city, weather_data, sports_data, source, data_age, new_data)
+    return finish_run(result, root, "single", effective_city, source)
+
+
+async def perform_automation_async(city=None, source="automation"):
+    """
+    Same as perform_automation for async callers: upstream requests are awaited on
+    the upstream loop and the database writes run on the database threadpool
+    """
+    effective_city = city or settings.DEFAULT_CITY
+    with traced_run("single", effective_city, source) as root:
+        with span("fetch"):
+            weather_data, sports_data, data_age, new_data = await upstream.arun(
+                fetch_upstream_data(effective_city, revalidates(source))
+            )
+        result = await run_db(
+            record_automation, effective_city, weather_data, sports_data, source, data_age, new_data
+        )
+    return await run_db(finish_run, result, root, "single", effective_city, source)
+
 
-    # Log raw data
-    add_log("weather", weather_data)
-    add_log("sports", sports_data)
+@contextmanager
+def traced_run(mode: str, city: str, source: str):
+    """Time an automation run and trace its stages, yields the root span"""
+    with AUTOMATION_RUN_DURATION.time(mode=mode), trace("automation", mode=mode, city=city, source=source) as root:
+        yield root
 
+
+def finish_run(result: Dict[str, Any], root, mode: str, city: str, source: str) -> Dict[str, Any]:
+    """Persist the finished run with its span tree and attach the tree to the result"""
+    result["trace"] = root.to_dict()
+    save_automation_run(mode, city, source, root.duration_ms, result["trace"])
+    return result
+
+
+async def request_automation(city=None, source="automation"):
+    """
+    Run automation for a city through the run coordinator: a request for a city
+    already being evaluated shares that run instead of starting another. Other
+    requests join a scheduled run, which fetches fresh data, but a scheduled
+    request never joins a manual run, which may reuse stored data and would be
+    recorded as manual; it runs alongside it instead.
+    """
+    effective_city = get_validated_city(city)
+    key = f"{source}:city:{effective_city}"
+    scheduled_key = f"automation:city:{effective_city}"
+    return await run_coordinator.run(
+        key,
+        lambda: perform_automation_async(effective_city, source),
+        also_join=() if key == scheduled_key else (scheduled_key,),
+    )
+
+
+def record_automation(
+    city: str,
+    weather_data: Dict[str, Any],
+    sports_data: Dict[str, Any],
+    source: str,
+    data_age: Dict[str, Any] = None,
+    new_data: Dict[str, bool] = None,
+):
+    """
+    Apply the rules to fetched data, write states and logs, and publish the run.
+    Raw data already logged by an earlier run (``new_data`` False) is not logged again.
+    """
     # Perform actions based on data
-    actions = perform_actions(weather_data, sports_data)
+    decisions, transitions = perform_actions(weather_data, sports_data)
 
-    # Log actions
-    for action in actions:
-        add_log(source, {"message": action}, action)
+    # Log raw data fetched for this run and the actions that actually changed a target
+    log_entries = [
+        (kind, data, "None")
+        for kind, data in (("weather", weather_data), ("sports", sports_data))
+        if new_data is None or new_data[kind]
+    ]
+    log_entries += transition_log_entries(decisions, transitions, source)
+    with span("write_logs", rows=len(log_entries)):
+        add_logs(log_entries)
 
-    return {
+    with span("get_states"):
+        states = get_states()
+
+    result = {
         "timestamp": datetime.now().isoformat(),
         "weather": weather_data,
         "sports": sports_data,
-        "actions": actions,
-        "states": get_states()
+        "actions": [message for _, _, message in decisions],
+        "transitions": transitions,
+        "states": states,
+        "data_age": data_age,
     }
+    event_bus.publish("run", {"city": city, "source": source, **result})
+    return result
+
 
-def perform_actions(weather_data: Dict[str, Any], sports_data: Dict[str, Any]) -> List[str]:
-    """Perform actions based on input data"""
-    actions_taken = []
+def evaluate_rules(weather_data: Dict[str, Any], sports_data: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """Evaluate the automation rules, returns (target, status, message) decisions"""
+    decisions = []
 
     # Action based on weather temperature - using Fahrenheit
     if "main" in weather_data and "temp_f" in weather_data["main"]:
         temp_f = weather_data["main"]["temp_f"]
         if temp_f > 86:  # 30°C is approximately 86°F
-            update_state("Twitter", "paused")
-            actions_taken.append(f"Paused Twitter ads due to high temperature ({temp_f}°F)")
+            decisions.append(("Twitter", "paused", f"Paused Twitter ads due to high temperature ({temp_f}°F)"))
         else:
-            update_state("Twitter", "active")
-            actions_taken.append(f"Activated Twitter ads due to moderate temperature ({temp_f}°F)")
+            decisions.append(("Twitter", "active", f"Activated Twitter ads due to moderate temperature ({temp_f}°F)"))
 
     # Action based on sports scores
     if "events" in sports_data and sports_data["events"]:
@@ -64,19 +181,186 @@ def perform_actions(weather_data: Dict[str, Any], sports_data: Dict[str, Any]) -
         away_score = int(event.get("intAwayScore") or 0)
 
         if home_score > away_score:
-            update_state("Facebook", "active")
-            actions_taken.append(f"Activated Facebook ads - home team won ({home_score}-{away_score})")
+            decisions.append(("Facebook", "active", f"Activated Facebook ads - home team won ({home_score}-{away_score})"))
         else:
-            update_state("Facebook", "paused")
-            actions_taken.append(f"Paused Facebook ads - away team won or tied ({away_score}-{home_score})")
+            decisions.append(("Facebook", "paused", f"Paused Facebook ads - away team won or tied ({away_score}-{home_score})"))
 
     # Time-based action (Instagram)
     current_hour = datetime.now().hour
     if 8 <= current_hour <= 20:  # Between 8 AM and 8 PM
-        update_state("Instagram", "active")
-        actions_taken.append("Activated Instagram ads during prime hours")
+        decisions.append(("Instagram", "active", "Activated Instagram ads during prime hours"))
     else:
-        update_state("Instagram", "paused")
-        actions_taken.append("Paused Instagram ads during off hours")
+        decisions.append(("Instagram", "paused", "Paused Instagram ads during off hours"))
+
+    return decisions
+
+
+def perform_actions(weather_data: Dict[str, Any], sports_data: Dict[str, Any]):
+    """
+    Perform actions based on input data.
+    Returns the rule decisions and the state transitions that really happened
+    """
+    decisions = evaluate_rules(weather_data, sports_data)
+    with span("apply_states"):
+        transitions = apply_states({target: status for target, status, _ in decisions})
+    return decisions, transitions
+
 
-    return actions_taken
+def transition_log_entries(decisions, transitions, source, **extra) -> List[Tuple[str, Dict[str, Any], str]]:
+    """Build action log entries for the decisions that caused a state transition"""
+    return [
+        (source, {"message": message, "target": target, "status": status, **extra}, message)
+        for target, status, message in decisions
+        if target in transitions
+    ]
+
+
+async def fetch_cities_data(
+    cities: List[str], max_concurrency: int, revalidate: bool = True
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Fetch weather for every city with at most max_concurrency requests in flight.
+    The sports feed is the same for every city, so it is fetched only once.
+    Stored data is used as in fetch_upstream_data; ages and whether the data is
+    new to this run are returned per city.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_city(city):
+        async with semaphore:
+            return await load_weather(city, revalidate)
+
+    sports, *weather_results = await asyncio.gather(
+        load_sports(revalidate),
+        *(fetch_city(city) for city in cities),
+    )
+    data_age = {"sports": sports.age, "weather": {city: weather.age for city, weather in zip(cities, weather_results)}}
+    new_data = {"sports": sports.claim(), "weather": {city: weather.claim() for city, weather in zip(cities, weather_results)}}
+    return {city: weather.data for city, weather in zip(cities, weather_results)}, sports.data, data_age, new_data
+
+
+def resolve_fanout_cities(cities=None) -> Tuple[List[str], str]:
+    """
+    Known cities to evaluate (every configured city by default), each once in the
+    order given, and the primary city among them
+    """
+    # A city listed twice would share one stored entry, whose claim() only the first copy wins
+    cities = list(dict.fromkeys(city for city in (cities or settings.AVAILABLE_CITIES) if city in settings.CITY_COORDINATES))
+    if not cities:
+        cities = [settings.DEFAULT_CITY]
+    primary_city = settings.DEFAULT_CITY if settings.DEFAULT_CITY in cities else cities[0]
+    return cities, primary_city
+
+
+def perform_fanout_automation(cities=None, source="automation", max_concurrency=None):
+    """
+    Evaluate the automation rules for many cities in one run:
+    1. Fetch weather for every city in parallel (bounded) and sports once
+    2. Evaluate the rules per city
+    3. Apply the primary city's decisions to the targets, since target states are global
+    4. Write the state transitions in one transaction and every log entry as one batch
+
+    Args:
+        cities: City names to evaluate, defaults to every configured city; unknown names are skipped
+        source: Source of the automation trigger ("manual" or "automation")
+        max_concurrency: Maximum weather requests in flight, defaults to settings.FANOUT_CONCURRENCY
+    """
+    cities, primary_city = resolve_fanout_cities(cities)
+    with traced_run("fanout", primary_city, source) as root:
+        with span("fetch", cities=len(cities)):
+            weather_by_city, sports_data, data_age, new_data = upstream.run(
+                fetch_cities_data(cities, max_concurrency or settings.FANOUT_CONCURRENCY, revalidates(source))
+            )
+        result = record_fanout_automation(
+            cities, primary_city, weather_by_city, sports_data, source, data_age, new_data
+        )
+    return finish_run(result, root, "fanout", primary_city, source)
+
+
+async def perform_fanout_automation_async(cities=None, source="automation", max_concurrency=None):
+    """Same as perform_fanout_automation for async callers, without blocking their event loop"""
+    cities, primary_city = resolve_fanout_cities(cities)
+    with traced_run("fanout", primary_city, source) as root:
+        with span("fetch", cities=len(cities)):
+            weather_by_city, sports_data, data_age, new_data = await upstream.arun(
+                fetch_cities_data(cities, max_concurrency or settings.FANOUT_CONCURRENCY, revalidates(source))
+            )
+        result = await run_db(
+            record_fanout_automation, cities, primary_city, weather_by_city, sports_data, source, data_age, new_data
+        )
+    return await run_db(finish_run, result, root, "fanout", primary_city, source)
+
+
+async def request_fanout_automation(cities=None, source="automation", max_concurrency=None):
+    """Run a fan-out through the run coordinator, joining an identical fan-out in flight as request_automation does"""
+    cities, _ = resolve_fanout_cities(cities)
+    key = f"{source}:fanout:{','.join(cities)}"
+    scheduled_key = f"automation:fanout:{','.join(cities)}"
+    return await run_coordinator.run(
+        key,
+        lambda: perform_fanout_automation_async(cities, source, max_concurrency),
+        also_join=() if key == scheduled_key else (scheduled_key,),
+    )
+
+
+def record_fanout_automation(
+    cities: List[str],
+    primary_city: str,
+    weather_by_city: Dict[str, Dict[str, Any]],
+    sports_data: Dict[str, Any],
+    source: str,
+    data_age: Dict[str, Any] = None,
+    new_data: Dict[str, Any] = None,
+):
+    """
+    Evaluate the rules per city, apply the primary city's decisions and log everything
+    except raw data already logged by an earlier run
+    """
+    log_entries = [("sports", sports_data, "None")] if new_data is None or new_data["sports"] else []
+    city_results = []
+    primary_decisions = []
+    for city in cities:
+        weather_data = weather_by_city[city]
+        decisions = evaluate_rules(weather_data, sports_data)
+        if city == primary_city:
+            primary_decisions = decisions
+
+        if new_data is None or new_data["weather"][city]:
+            log_entries.append(("weather", weather_data, "None"))
+        city_results.append({
+            "city": city,
+            "weather": weather_data,
+            "actions": [message for _, _, message in decisions],
+            "applied": city == primary_city,
+            "data_age": (data_age or {}).get("weather", {}).get(city),
+        })
+
+    with span("apply_states"):
+        transitions = apply_states({target: status for target, status, _ in primary_decisions})
+    log_entries += transition_log_entries(primary_decisions, transitions, source, city=primary_city)
+    with span("write_logs", rows=len(log_entries)):
+        add_logs(log_entries)
+
+    with span("get_states"):
+        states = get_states()
+
+    result = {
+        "timestamp": datetime.now().isoformat(),
+        "primary_city": primary_city,
+        "sports": sports_data,
+        "cities": city_results,
+        "transitions": transitions,
+        "states": states,
+        "data_age": {"sports": data_age["sports"]} if data_age else None,
+    }
+    event_bus.publish("run", {
+        "city": primary_city,
+        "source": source,
+        "timestamp": result["timestamp"],
+        "weather": weather_by_city[primary_city],
+        "sports": sports_data,
+        "actions": [message for _, _, message in primary_decisions],
+        "transitions": transitions,
+        "cities": cities,
+    })
+    return result
@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE, CIRCUIT_TRANSITIONS, percentile
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Request names share the breaker of the upstream they call
+BREAKER_GROUPS = {"noaa_points": "noaa", "noaa_forecast": "noaa", "sportsdb": "sportsdb"}
+
+# Successful latencies kept per upstream, and how many are needed before timeouts adapt
+LATENCY_WINDOW = 100
+MIN_LATENCY_SAMPLES = 10
+
+
+class CircuitOpen(httpx.TransportError):
+    """Raised instead of sending a request while the upstream's breaker is open"""
+
+
+def breaker_group(name: str) -> str:
+    return BREAKER_GROUPS.get(name, name)
+
+
+def is_upstream_failure(status_code: int) -> bool:
+    """Responses that say the upstream is unhealthy, as opposed to a bad request"""
+    return status_code == 429 or status_code >= 500
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After in seconds; HTTP-date values are not sent by the upstreams we call"""
+    value = response.headers.get("Retry-After", "")
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker for one upstream, with a timeout that adapts to its latency.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    requests fail immediately with ``CircuitOpen``. Once the reset timeout has
+    passed a single probe is let through (half-open): success closes the
+    breaker, failure reopens it for twice as long, jittered and capped at
+    ``max_reset_timeout``. A 429 keeps it open for at least its Retry-After.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        min_timeout: float = 2.0,
+        max_timeout: float = 10.0,
+        timeout_multiplier: float = 3.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0  # consecutive times the breaker opened without a successful probe
+        self.retry_at = 0.0
+        self.probe_in_flight = False
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {"successes": 0, "failures": 0, "rejected": 0}
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], upstream=name)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            print(f"Circuit breaker for {self.name} is now {state}")
+            CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+            CIRCUIT_STATE.set(STATE_VALUES[state], upstream=self.name)
+        self.state = state
+
+    def _timeout(self, latencies: List[float]) -> float:
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return self.max_timeout
+        p99 = percentile(latencies, 0.99)
+        return round(min(max(p99 * self.timeout_multiplier, self.min_timeout), self.max_timeout), 3)
+
+    @property
+    def timeout(self) -> float:
+        """Per-request timeout: a multiple of the observed p99 latency, within [min_timeout, max_timeout]"""
+        with self._lock:
+            latencies = list(self.latencies)
+        return self._timeout(latencies)
+
+    @property
+    def allows_retry(self) -> bool:
+        """Retries only make sense while the upstream is still considered healthy"""
+        return self.state == CLOSED
+
+    def before_request(self):
+        """Reserve a request slot, raising ``CircuitOpen`` when the upstream must not be called"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return
+            self.counts["rejected"] += 1
+            CIRCUIT_REJECTED.inc(upstream=self.name)
+        raise CircuitOpen(f"Circuit breaker for {self.name} is {self.state}, retrying in {self.retry_in:.1f}s")
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.counts["successes"] += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                self.trips = 0
+                self._transition(CLOSED)
+
+    def record_failure(self, retry_after: float = None):
+        with self._lock:
+            self.counts["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == OPEN:
+                # A request sent before the breaker opened: already counted as a trip, only a
+                # Retry-After longer than the remaining wait moves the deadline
+                if retry_after:
+                    self.retry_at = max(self.retry_at, time.monotonic() + retry_after)
+                return
+            probe_failed = self.state == HALF_OPEN
+            self.probe_in_flight = False
+            if probe_failed or self.consecutive_failures >= self.failure_threshold:
+                self._open(retry_after)
+
+    def release(self):
+        """Give back a reserved slot without an outcome, e.g. when the request was cancelled"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def _open(self, retry_after: float = None):
+        self.trips += 1
+        open_for = min(self.reset_timeout * 2 ** (self.trips - 1), self.max_reset_timeout)
+        # Jitter keeps workers that tripped together from probing together
+        open_for *= random.uniform(0.8, 1.2)
+        self.retry_at = time.monotonic() + max(open_for, retry_after or 0)
+        self._transition(OPEN)
+
+    @property
+    def retry_in(self) -> float:
+        return max(self.retry_at - time.monotonic(), 0.0) if self.state == OPEN else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.trips = 0
+            self.probe_in_flight = False
+            self.latencies.clear()
+            self._transition(CLOSED)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = list(self.latencies)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": round(self.retry_in, 3),
+            "timeout": self._timeout(latencies),
+            "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+            "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+            **self.counts,
+        }
+
+
+class CircuitBreakers:
+    """One breaker per upstream group, the known upstreams up front and others on first use"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {
+            group: CircuitBreaker(group, **options) for group in sorted(set(BREAKER_GROUPS.values()))
+        }
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        group = breaker_group(name)
+        with self._lock:
+            breaker = self._breakers.get(group)
+            if breaker is None:
+                breaker = self._breakers[group] = CircuitBreaker(group, **self.options)
+            return breaker
+
+    def reset(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            breakers = sorted(self._breakers.values(), key=lambda breaker: breaker.name)
+        return [breaker.stats() for breaker in breakers]
@@ -0,0 +1,141 @@
+from typing import Any, Dict, Optional, Tuple
+
+from app import revisions
+from app.config import settings
+from app.database import (
+    event_bus,
+    get_latest_log_id,
+    get_latest_logs,
+    get_logs,
+    get_revisions,
+    refresh_state_cache,
+    remote_changes,
+    state_cache,
+    sync_logs_version,
+)
+
+# Sources whose newest record the dashboard displays
+LATEST_SOURCES = ["weather", "sports"]
+
+
+def get_settings_snapshot() -> Dict[str, Any]:
+    """Current application settings as returned by /api/settings"""
+    return {
+        "app_name": settings.APP_NAME,
+        "cadence": settings.AUTOMATION_CADENCE,
+        "city": settings.DEFAULT_CITY,
+        "available_cities": settings.AVAILABLE_CITIES,
+        "targets": settings.SOCIAL_TARGETS
+    }
+
+
+def encode_cursor(log_id: int, state_version: int, settings_revision: int, logs_revision: int) -> str:
+    return f"{log_id}.{state_version}.{settings_revision}.{logs_revision}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+    """Split a cursor into its parts, None when it is missing or malformed"""
+    parts = (cursor or "").split(".")
+    if len(parts) != 4 or not all(part.isdigit() for part in parts):
+        return None
+    log_id, state_version, settings_revision, logs_revision = (int(part) for part in parts)
+    return log_id, state_version, settings_revision, logs_revision
+
+
+def get_dashboard(cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """
+    Everything the dashboard shows in one payload: states, settings, the newest
+    record per source and the recent logs.
+
+    Given the cursor of a previous response only what changed since then is
+    returned: states/settings are None when unchanged, and latest/logs only hold
+    newer rows. A full snapshot is returned when the cursor is missing, invalid,
+    logs were deleted in the meantime or more than ``limit`` logs were added,
+    since a delta could not hold them all.
+    """
+    # State and logs versions are stored in the database, so a cursor is valid on every worker
+    stored_revisions = get_revisions()
+    refresh_state_cache(stored_revisions.get("state", 0))
+    state_version, current_states = state_cache.versioned()
+    settings_revision = revisions.current("settings")
+    logs_revision = stored_revisions.get("logs", 0)
+
+    previous = decode_cursor(cursor)
+    full = previous is None or previous[3] != logs_revision
+    if not full:
+        # One row past the limit tells whether the delta would be cut short
+        logs = get_logs(limit=limit + 1, after_id=previous[0])
+        full = len(logs) > limit
+
+    if full:
+        after_id = None
+        states = current_states
+        settings_snapshot = get_settings_snapshot()
+        logs = get_logs(limit=limit)
+    else:
+        after_id, previous_state_version, previous_settings_revision, _ = previous
+        states = current_states if previous_state_version != state_version else None
+        settings_snapshot = get_settings_snapshot() if previous_settings_revision != settings_revision else None
+
+    latest = {
+        source: log
+        for source, log in get_latest_logs(LATEST_SOURCES).items()
+        if after_id is None or log["id"] > after_id
+    }
+    newest_id = logs[0]["id"] if logs else (after_id or 0)
+
+    return {
+        "cursor": encode_cursor(newest_id, state_version, settings_revision, logs_revision),
+        "full": full,
+        "states": states,
+        "settings": settings_snapshot,
+        "latest": latest,
+        "logs": logs,
+    }
+
+
+def publish_remote_changes(limit: int = 50):
+    """
+    Publish on this worker's event stream what other workers changed since the
+    last call (run by the sync job): changed states, their logs (``limit`` rows
+    per event, paging until caught up) and, when those include weather or sports
+    data, the run they came from. Deleted logs make clients reload. The first
+    call only records where things stand.
+    Also brings this worker's logs version (the /api/logs ETag) up to date.
+    """
+    sync_logs_version()
+    stored_revisions = get_revisions()
+
+    state_revision = stored_revisions.get("state", 0)
+    if remote_changes.changed_elsewhere("state", state_revision):
+        refresh_state_cache(state_revision)
+        version, states = state_cache.versioned()
+        event_bus.publish("state", {"states": states, "version": version})
+
+    if remote_changes.changed_elsewhere("logs", stored_revisions.get("logs", 0)):
+        event_bus.publish("reset", {"reason": "Logs were deleted by another worker"})
+
+    newest_id = get_latest_log_id()
+    previous_id, own_ids = remote_changes.advance("log_id", newest_id)
+    if previous_id is None or newest_id <= previous_id:
+        return
+    logs = []
+    after_id = previous_id
+    while after_id < newest_id:
+        page = get_logs(limit=limit, after_id=after_id)
+        if not page:
+            break
+        after_id = page[0]["id"]
+        # Rows past newest_id are published by the next call
+        page = [log for log in page if log["id"] <= newest_id and log["id"] not in own_ids]
+        if page:
+            event_bus.publish("logs", {"logs": page})
+            logs += page
+    if any(log["source"] in LATEST_SOURCES for log in logs):
+        latest = get_latest_logs(LATEST_SOURCES)
+        if all(source in latest for source in LATEST_SOURCES):
+            event_bus.publish("run", {
+                "timestamp": latest["weather"]["timestamp"],
+                "weather": latest["weather"]["data"],
+                "sports": latest["sports"]["data"],
+            })
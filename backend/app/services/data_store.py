@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.metrics import DATA_STORE_READS
+from app.tracing import annotate, current_span
+
+# Set by the services when they answer with mock data, so it is never kept as last known good
+served_mock: contextvars.ContextVar[bool] = contextvars.ContextVar("served_mock", default=False)
+
+
+def mark_mock_fallback():
+    """Flag the data being returned by the current fetch as mock data"""
+    served_mock.set(True)
+
+
+class StoredData:
+    """Payload of one key and when it was fetched; mock data passed through unstored has no age"""
+
+    __slots__ = ("data", "fetched_at", "updated", "stored", "recorded")
+
+    def __init__(self, data: Any, stored: bool = True):
+        self.data = data
+        self.fetched_at = datetime.now()
+        self.updated = time.monotonic()
+        self.stored = stored
+        self.recorded = False
+
+    @property
+    def age(self) -> Optional[float]:
+        return round(time.monotonic() - self.updated, 3) if self.stored else None
+
+    def claim(self) -> bool:
+        """
+        True for the first run using this payload only, so each fetch is logged once
+        however many runs are served from it. Called on the upstream loop, no lock needed.
+        """
+        first, self.recorded = not self.recorded, True
+        return first
+
+
+class UpstreamDataStore:
+    """
+    Last known good upstream data per key (a city's weather, the sports feed).
+
+    Reads within the freshness window are served as is. Older entries, up to
+    ``max_stale`` seconds, are served immediately while a background task
+    refreshes them (stale-while-revalidate). Missing or too old entries, and
+    reads asking to revalidate, wait for a fetch; concurrent refreshes of a key
+    share one fetch. A fetch that fails or is answered with mock data leaves the
+    stored entry in place and the stored entry is served instead, as long as it
+    is no older than ``max_stale``; past that it is dropped and the mock data
+    is served (or the error raised), so an outage never keeps old data in use.
+
+    Only used from coroutines running on the upstream client loop.
+    """
+
+    def __init__(self, max_stale: float = 3600):
+        self.max_stale = max_stale
+        self._entries: Dict[str, StoredData] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        fresh_for: float,
+        revalidate: bool = False,
+    ) -> StoredData:
+        """Data for key, fetching it with ``fetch`` when the stored entry cannot be used"""
+        kind = key.partition(":")[0]
+        entry = self._entries.get(key)
+        if entry is not None and not revalidate:
+            if entry.age < fresh_for:
+                DATA_STORE_READS.inc(kind=kind, outcome="fresh")
+                annotate(data_age=entry.age)
+                return entry
+            if entry.age <= self.max_stale:
+                DATA_STORE_READS.inc(kind=kind, outcome="stale")
+                annotate(data_age=entry.age, refreshing=True)
+                self._refresh(key, fetch, background=True)
+                return entry
+
+        DATA_STORE_READS.inc(kind=kind, outcome="revalidate" if revalidate else "miss")
+        return await asyncio.shield(self._refresh(key, fetch))
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]], background: bool = False) -> asyncio.Task:
+        """The in-flight refresh of key, started if there is none"""
+        task = self._refreshing.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.create_task(self._fetch(key, fetch, background))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], background: bool):
+        # Runs in its own task, so the mock flag set by the services is local to this fetch
+        served_mock.set(False)
+        if background:
+            # The run that triggered a background refresh does not wait for it, keep it out of its trace
+            current_span.set(None)
+        try:
+            data = await fetch()
+        except Exception as error:
+            if self._usable_entry(key) is None:
+                raise
+            print(f"Refreshing {key} failed, keeping the last known good data: {error}")
+            return self._entries[key]
+
+        if served_mock.get():
+            # Keep serving the last known good data, or hand the mock to the caller without storing it
+            return self._usable_entry(key) or StoredData(data, stored=False)
+
+        entry = self._entries[key] = StoredData(data)
+        return entry
+
+    def _usable_entry(self, key: str) -> Optional[StoredData]:
+        """The stored entry of key unless it is older than max_stale, which is dropped"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.age > self.max_stale:
+            print(f"Last known good data for {key} is older than {self.max_stale}s, no longer serving it")
+            DATA_STORE_READS.inc(kind=key.partition(":")[0], outcome="expired")
+            del self._entries[key]
+            return None
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self._refreshing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": {key: {"age": entry.age, "fetched_at": entry.fetched_at.isoformat()} for key, entry in list(self._entries.items())},
+            "refreshing": sorted(self._refreshing),
+        }
+
+
+data_store = UpstreamDataStore(max_stale=settings.DATA_MAX_STALE_SECONDS)
@@ -0,0 +1,82 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.config import settings
+from app.database import encode_log_row, iter_logs
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+CSV_COLUMNS = ["id", "timestamp", "source", "action_taken", "data"]
+
+
+def ndjson_chunks(rows, batch_size: int) -> Iterator[bytes]:
+    """One JSON object per line, batch_size lines per chunk, payloads embedded without decoding"""
+    lines = []
+    for row in rows:
+        lines.append(encode_log_row(row))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def csv_chunks(rows, batch_size: int) -> Iterator[bytes]:
+    """A header row then batch_size rows per chunk, ``data`` is kept as its JSON text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    pending = 0
+    for row in rows:
+        writer.writerow([row.id, row.timestamp.isoformat(), row.source, row.action_taken, row.data])
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks into a single gzip member"""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_logs(
+    export_format: str = "ndjson",
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action_taken: Optional[str] = None,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Stream logs oldest first as NDJSON or CSV, optionally gzip compressed.
+    Only one cursor batch and one output chunk are held in memory at a time.
+    """
+    batch_size = settings.LOG_EXPORT_BATCH_SIZE
+    rows = iter_logs(source=source, since=since, until=until, action_taken=action_taken, batch_size=batch_size)
+    render = csv_chunks if export_format == "csv" else ndjson_chunks
+
+    chunks = render(rows, batch_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(export_format: str, compress: bool = False) -> str:
+    """Attachment name such as logs-20250310-120000.ndjson.gz"""
+    extension = EXPORT_FORMATS[export_format][1]
+    name = f"logs-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return f"{name}.gz" if compress else name
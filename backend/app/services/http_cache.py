@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a {directive: value} dict"""
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers, default_ttl: float = 0) -> Optional[float]:
+    """
+    Seconds a response may be reused without revalidation, following
+    Cache-Control max-age, then Expires, then ``default_ttl``.
+    Returns None when the response must not be stored at all.
+    """
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+
+    max_age = directives.get("max-age")
+    if max_age is not None and max_age.isdigit():
+        age = headers.get("Age", "0")
+        return max(int(max_age) - (int(age) if age.isdigit() else 0), 0)
+
+    expires = _parse_http_date(headers.get("Expires"))
+    if expires is not None:
+        date = _parse_http_date(headers.get("Date")) or time.time()
+        return max(expires - date, 0)
+
+    return default_ttl
+
+
+class CacheEntry:
+    """A cached response body along with its validators"""
+
+    __slots__ = ("data", "etag", "last_modified", "expires_at")
+
+    def __init__(self, data: Any, etag: Optional[str], last_modified: Optional[str], expires_at: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that turn the next request into a revalidation"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPResponseCache:
+    """
+    Bounded LRU cache of parsed upstream response bodies.
+
+    Cached bodies are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._not_modified = 0
+        self._evictions = 0
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for key, counting a hit when it is still fresh"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.is_fresh:
+                self._hits += 1
+            else:
+                self._revalidations += 1
+            return entry
+
+    def store(self, key: str, data: Any, headers, default_ttl: float = 0):
+        """Cache a 200 response body if its headers allow it"""
+        lifetime = freshness_lifetime(headers, default_ttl)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        # Nothing to gain from an entry that is never fresh and cannot be revalidated
+        if lifetime is None or (lifetime == 0 and not etag and not last_modified):
+            self.discard(key)
+            return
+
+        with self._lock:
+            self._entries[key] = CacheEntry(data, etag, last_modified, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def refresh(self, key: str, entry: CacheEntry, headers, default_ttl: float = 0):
+        """Extend an entry's freshness after a 304 Not Modified"""
+        lifetime = freshness_lifetime(headers, default_ttl) or 0
+        with self._lock:
+            self._not_modified += 1
+            entry.expires_at = time.monotonic() + lifetime
+            entry.etag = headers.get("ETag", entry.etag)
+            entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and revalidation counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,246 @@
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+
+import httpx
+
+from app.config import settings
+from app.metrics import STALE_FALLBACKS, UPSTREAM_ERRORS, UPSTREAM_LATENCY, UPSTREAM_REQUESTS, UPSTREAM_RETRIES
+from app.services.circuit_breaker import CircuitBreakers, is_upstream_failure, retry_after_seconds
+from app.services.http_cache import HTTPResponseCache
+from app.tracing import annotate, span
+
+
+class UpstreamClient:
+    """
+    Shared, pooled HTTP client for the upstream APIs.
+
+    Owns a background event loop thread and a long-lived ``httpx.AsyncClient``
+    so TCP/TLS connections are reused across runs. Coroutines that talk to
+    upstreams always execute on that loop: synchronous callers use ``run``,
+    async callers living on another loop use ``arun``. JSON responses fetched
+    with ``get_json`` go through an HTTP cache honoring freshness and validators.
+    Every request passes through the circuit breaker of its upstream.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        cache: HTTPResponseCache = None,
+        breakers: CircuitBreakers = None,
+        retries: int = 1,
+        retry_backoff: float = 0.2,
+        retry_after_max: float = 5.0,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.cache = cache or HTTPResponseCache()
+        self.breakers = breakers or CircuitBreakers(max_timeout=timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_after_max = retry_after_max
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="upstream-loop", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the client loop without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """Run a coroutine on the client loop and block until it finishes"""
+        if self._in_loop_thread():
+            coro.close()
+            raise RuntimeError("UpstreamClient.run() cannot be called from the upstream loop, await the coroutine")
+        return self.submit(coro).result()
+
+    async def arun(self, coro):
+        """Await a coroutine on the client loop from any event loop"""
+        if self._in_loop_thread():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled client, only usable from coroutines running on the client loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
+        return self._client
+
+    async def _send(self, url: str, name: str, **kwargs) -> httpx.Response:
+        """A single GET through the pooled client, recording metrics under name"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url, **kwargs)
+        except httpx.HTTPError as error:
+            UPSTREAM_ERRORS.inc(upstream=name, kind=type(error).__name__)
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream=name)
+
+        UPSTREAM_REQUESTS.inc(upstream=name, status=response.status_code)
+        if response.status_code >= 400:
+            UPSTREAM_ERRORS.inc(upstream=name, kind=f"http_{response.status_code}")
+        return response
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: a random delay up to the exponential backoff of this attempt"""
+        return random.uniform(0, self.retry_backoff * 2 ** attempt)
+
+    async def get(self, url: str, name: str = None, **kwargs) -> httpx.Response:
+        """
+        Issue a GET request through the pooled client and the upstream's circuit
+        breaker, recording metrics under name (the host by default).
+
+        Transport errors, 5xx and 429 responses count as failures and are retried
+        with jittered backoff while the breaker stays closed, waiting out a 429's
+        Retry-After when it is short enough. While the breaker is open nothing is
+        sent and ``CircuitOpen`` is raised immediately.
+        """
+        name = name or httpx.URL(url).host
+        breaker = self.breakers.get(name)
+        timeout = kwargs.pop("timeout", None)
+        attempt = 0
+        while True:
+            breaker.before_request()
+            started = time.perf_counter()
+            try:
+                response = await self._send(url, name, timeout=timeout or breaker.timeout, **kwargs)
+            except httpx.TransportError:
+                breaker.record_failure()
+                if attempt >= self.retries or not breaker.allows_retry:
+                    raise
+                delay = self._backoff(attempt)
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                if not is_upstream_failure(response.status_code):
+                    breaker.record_success(time.perf_counter() - started)
+                    return response
+
+                retry_after = retry_after_seconds(response) if response.status_code == 429 else None
+                breaker.record_failure(retry_after)
+                if attempt >= self.retries or not breaker.allows_retry or (retry_after or 0) > self.retry_after_max:
+                    return response
+                delay = max(self._backoff(attempt), retry_after or 0)
+
+            attempt += 1
+            UPSTREAM_RETRIES.inc(upstream=name)
+            annotate(retries=attempt)
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url: str, headers: dict = None, default_ttl: float = 0, name: str = None):
+        """
+        GET a JSON document through the response cache.
+
+        Fresh entries are returned without a request, stale ones are revalidated
+        with If-None-Match/If-Modified-Since and reused on 304. ``default_ttl``
+        applies when the upstream sends no freshness information. When the
+        upstream fails or its breaker is open, the last good body is served.
+        A body that is not valid JSON raises ``httpx.DecodingError``, so callers
+        handling ``httpx.HTTPError`` fall back as for any other failed request.
+        """
+        with span(name or httpx.URL(url).host):
+            entry = self.cache.lookup(url)
+            if entry is not None and entry.is_fresh:
+                annotate(cache="hit")
+                return entry.data
+
+            request_headers = dict(headers or {})
+            if entry is not None:
+                request_headers.update(entry.conditional_headers())
+
+            try:
+                response = await self.get(url, name=name, headers=request_headers)
+            except httpx.TransportError:
+                if entry is None:
+                    raise
+                return self._last_good(url, name, entry)
+
+            annotate(status=response.status_code)
+            if is_upstream_failure(response.status_code) and entry is not None:
+                return self._last_good(url, name, entry)
+            if response.status_code == 304 and entry is not None:
+                annotate(cache="revalidated")
+                self.cache.refresh(url, entry, response.headers, default_ttl)
+                return entry.data
+
+            annotate(cache="miss")
+            response.raise_for_status()
+            try:
+                data = response.json()
+            except ValueError as error:
+                if entry is not None:
+                    return self._last_good(url, name, entry)
+                raise httpx.DecodingError(f"Invalid JSON from {url}: {error}", request=response.request) from error
+            self.cache.store(url, data, response.headers, default_ttl)
+            return data
+
+    def _last_good(self, url: str, name: str, entry):
+        """Stale cached body served in place of a failed request"""
+        annotate(cache="stale", fallback="last_good")
+        STALE_FALLBACKS.inc(upstream=name or httpx.URL(url).host)
+        return entry.data
+
+    async def _aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def close(self):
+        """Close pooled connections and stop the loop thread"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+upstream = UpstreamClient(
+    timeout=settings.UPSTREAM_TIMEOUT,
+    max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE,
+    cache=HTTPResponseCache(max_entries=settings.HTTP_CACHE_MAX_ENTRIES),
+    breakers=CircuitBreakers(
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+        max_reset_timeout=settings.CIRCUIT_MAX_RESET_TIMEOUT,
+        min_timeout=settings.UPSTREAM_MIN_TIMEOUT,
+        max_timeout=settings.UPSTREAM_TIMEOUT,
+        timeout_multiplier=settings.UPSTREAM_TIMEOUT_MULTIPLIER,
+    ),
+    retries=settings.UPSTREAM_RETRIES,
+    retry_backoff=settings.UPSTREAM_RETRY_BACKOFF,
+    retry_after_max=settings.UPSTREAM_RETRY_AFTER_MAX,
+)
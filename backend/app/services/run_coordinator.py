@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+from app.config import settings
+from app.services.http_client import upstream
+
+
+class RunQueueFull(Exception):
+    """Raised when too many distinct runs are already waiting or in flight"""
+
+
+class RunCoordinator:
+    """
+    Single-flight coordinator for automation runs.
+
+    Callers asking for a run whose key (e.g. the city) is already in flight
+    await that same execution instead of starting another one. Distinct keys
+    execute at most ``max_concurrency`` at a time, and at most ``max_pending``
+    runs may be waiting or in flight before new ones are refused. All
+    bookkeeping lives on the upstream client loop, so manual runs from the API
+    and scheduled runs from the scheduler thread share one view of what is running.
+    """
+
+    def __init__(self, max_concurrency: int = 1, max_pending: int = 10):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._semaphore = None
+        self._loop = None
+
+        self._started = 0
+        self._coalesced = 0
+        self._rejected = 0
+
+    @property
+    def busy(self) -> bool:
+        """Whether any run is waiting or in flight"""
+        return bool(self._inflight)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]], also_join: Sequence[str] = ()) -> Any:
+        """
+        Run factory() for key, or join the run already in flight for key or,
+        failing that, for one of the ``also_join`` keys (runs whose result the
+        caller can use as its own). The result is shared between every caller
+        that joined and must be treated as read-only.
+        """
+        return await upstream.arun(self._join(key, factory, also_join))
+
+    async def _join(self, key: str, factory: Callable[[], Awaitable[Any]], also_join: Sequence[str] = ()) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The upstream loop was restarted, nothing from the previous one can still be running
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+
+        task = next((self._inflight[k] for k in (key, *also_join) if k in self._inflight), None)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            if len(self._inflight) >= self.max_pending:
+                self._rejected += 1
+                raise RunQueueFull(f"{len(self._inflight)} automation runs are already queued")
+
+            self._started += 1
+            task = loop.create_task(self._execute(factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+        # A caller going away must not cancel the run for everybody else
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _execute(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore:
+            return await factory()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": sorted(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "started": self._started,
+            "coalesced": self._coalesced,
+            "rejected": self._rejected,
+        }
+
+
+run_coordinator = RunCoordinator(
+    max_concurrency=settings.RUN_CONCURRENCY,
+    max_pending=settings.RUN_QUEUE_MAX,
+)
@@ -1,11 +1,15 @@
 from datetime import datetime
 import random
 
-import requests
-from requests import RequestException
+import httpx
 
 from app.config import settings
-from app.database import add_log
+from app.database import add_log, run_db
+from app.metrics import MOCK_FALLBACKS
+from app.tracing import annotate, span
+from app.services.circuit_breaker import CircuitOpen
+from app.services.data_store import mark_mock_fallback
+from app.services.http_client import upstream
 
 def build_mock_sports_data():
     teams = ["Lakers", "Celtics", "Bulls", "Warriors", "Heat", "Bucks", "Nets", "Suns"]
@@ -28,32 +32,50 @@ def build_mock_sports_data():
         ]
     }
 
-def fetch_sports_data():
+async def fetch_sports_data_async():
     """
-    Fetch sports data from an API
+    Fetch sports data from an API through the shared upstream client
     Returns mock data if API key is not set
     """
     api_key = settings.SPORTS_API_KEY
 
     if api_key == "demo_key":
+        mark_mock_fallback()
         return build_mock_sports_data()
 
-    try:
-        url = f"https://www.thesportsdb.com/api/v1/json/{api_key}/eventslast.php?id=133602"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+    with span("sports"):
+        return await _fetch_sports(api_key)
 
-        data = response.json()
+
+async def _fetch_sports(api_key):
+    try:
+        url = f"{settings.SPORTSDB_BASE_URL}/{api_key}/eventslast.php?id=133602"
+        # TheSportsDB sends no caching headers, results are reused for SPORTS_CACHE_TTL seconds
+        data = await upstream.get_json(url, default_ttl=settings.SPORTS_CACHE_TTL, name="sportsdb")
         if "events" in data and data["events"]:
             return data
 
         if "results" in data and data["results"]:
             return {"events": data["results"]}
 
-        error_data = {"error": "Empty sports data response", "message": "Falling back to mock data"}
-        add_log("error", error_data)
+        error_data = {"error": "Empty sports data response", "message": "Falling back to mock data", "upstream": "sports"}
+        # add_log flushes a full queue synchronously, keep that off the upstream loop
+        await run_db(add_log, "error", error_data)
+        MOCK_FALLBACKS.inc(service="sports")
+        mark_mock_fallback()
+        annotate(fallback="mock")
         return build_mock_sports_data()
-    except RequestException as error:
-        error_data = {"error": str(error), "message": "Failed to fetch sports data"}
-        add_log("error", error_data)
+    except httpx.HTTPError as error:
+        # Short-circuited calls are only counted, the breaker prints its transitions once
+        if not isinstance(error, CircuitOpen):
+            error_data = {"error": str(error), "message": "Failed to fetch sports data", "upstream": "sports"}
+            await run_db(add_log, "error", error_data)
+        MOCK_FALLBACKS.inc(service="sports")
+        mark_mock_fallback()
+        annotate(fallback="mock")
         return build_mock_sports_data()
+
+
+def fetch_sports_data():
+    """Blocking wrapper around fetch_sports_data_async"""
+    return upstream.run(fetch_sports_data_async())
@@ -1,11 +1,19 @@
+import asyncio
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 
-import requests
-from requests import RequestException
+import httpx
 
 from app.config import settings
-from app.database import add_log
+from app.database import add_log, delete_gridpoint, get_gridpoint, run_db, save_gridpoint
+from app.metrics import MOCK_FALLBACKS
+from app.tracing import annotate, span
+from app.services.circuit_breaker import CircuitOpen
+from app.services.data_store import mark_mock_fallback
+from app.services.http_client import upstream
+
+# Status codes meaning a cached forecast URL has moved or no longer exists
+STALE_GRIDPOINT_STATUSES = (301, 404)
 
 
 def convert_to_celsius(fahrenheit):
@@ -18,7 +26,7 @@ def convert_to_fahrenheit(celsius):
     return round((celsius * 9/5) + 32, 1)
 
 
-def build_mock_weather_data():
+def build_mock_weather_data(city=None):
     celsius_temp = round(random.uniform(15.0, 35.0), 1)
     fahrenheit_temp = convert_to_fahrenheit(celsius_temp)
 
@@ -34,7 +42,7 @@ def build_mock_weather_data():
                 "description": "Generated mock weather data"
             }
         ],
-        "name": settings.DEFAULT_CITY,
+        "name": city or settings.DEFAULT_CITY,
         "dt": int(datetime.now().timestamp())
     }
 
@@ -45,58 +53,129 @@ def get_validated_city(city):
     return settings.DEFAULT_CITY
 
 
-def fetch_weather_data(city=None):
+def build_weather_payload(city, period):
+    """Normalize a NOAA forecast period into the weather payload used by the rules"""
+    # NOAA provides temperature in Fahrenheit
+    fahrenheit_temp = period['temperature']
+    celsius_temp = convert_to_celsius(fahrenheit_temp)
+
+    return {
+        "main": {
+            "temp": celsius_temp,  # Keep the main temp as Celsius for compatibility
+            "temp_c": celsius_temp,  # Explicit Celsius
+            "temp_f": fahrenheit_temp,  # Explicit Fahrenheit
+        },
+        "weather": [
+            {
+                "main": period['shortForecast'],
+                "description": period['detailedForecast']
+            }
+        ],
+        "name": city,
+        "dt": int(datetime.now().timestamp())
+    }
+
+
+def build_noaa_headers():
+    app_name, contact_email = settings.WEATHER_API_KEY
+    return {
+        'User-Agent': f'({app_name}, {contact_email})',
+        'Accept': 'application/geo+json'
+    }
+
+
+async def resolve_forecast_url(coordinates, headers, refresh=False):
+    """
+    Resolve the NOAA forecast URL for coordinates, using the persistent
+    gridpoint cache unless refresh is requested. The cache is read and written
+    on the database threadpool so the upstream loop never waits on SQLite.
+    """
+    lat, lon = coordinates
+    location = f"{lat},{lon}"
+    max_age = timedelta(days=settings.GRIDPOINT_CACHE_TTL_DAYS)
+
+    if not refresh:
+        with span("gridpoint_lookup"):
+            forecast_url = await run_db(get_gridpoint, location, max_age)
+        # URLs resolved against another NOAA base URL (e.g. the simulator) are not reused
+        if forecast_url and forecast_url.startswith(settings.NOAA_BASE_URL):
+            return forecast_url
+
+    points_url = f"{settings.NOAA_BASE_URL}/points/{location}"
+    if refresh:
+        # A still fresh points body would hand back the same dead forecast URL
+        upstream.cache.discard(points_url)
+    points_data = await upstream.get_json(points_url, headers=headers, name="noaa_points")
+    forecast_url = points_data['properties']['forecast']
+    with span("gridpoint_save"):
+        await run_db(save_gridpoint, location, forecast_url)
+    return forecast_url
+
+
+async def warm_gridpoint_cache():
+    """Resolve and cache the forecast URL of every configured city"""
+    headers = build_noaa_headers()
+    results = await asyncio.gather(
+        *(resolve_forecast_url(coordinates, headers) for coordinates in settings.CITY_COORDINATES.values()),
+        return_exceptions=True,
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    print(f"Gridpoint cache warmed for {len(results) - len(failures)}/{len(results)} cities")
+    return len(results) - len(failures)
+
+
+async def fetch_weather_data_async(city=None):
     """
     Fetch weather data from NOAA's National Weather Service API
+    through the shared upstream client.
     Returns mock data if API request fails
     """
     effective_city = get_validated_city(city)
-    coordinates = settings.CITY_COORDINATES[effective_city]
-    app_name, contact_email = settings.WEATHER_API_KEY
+    with span("weather", city=effective_city):
+        return await _fetch_weather(effective_city)
 
-    try:
-        headers = {
-            'User-Agent': f'({app_name}, {contact_email})',
-            'Accept': 'application/geo+json'
-        }
 
-        lat, lon = coordinates
+async def _fetch_weather(effective_city):
+    coordinates = settings.CITY_COORDINATES[effective_city]
 
-        # Step 1: Get the grid endpoint for the location
-        points_url = f"https://api.weather.gov/points/{lat},{lon}"
-        points_response = requests.get(points_url, headers=headers, timeout=10)
-        points_response.raise_for_status()
+    try:
+        headers = build_noaa_headers()
+
+        # Step 1: Get the grid endpoint for the location (cached)
+        forecast_url = await resolve_forecast_url(coordinates, headers)
+
+        # Step 2: Get the actual forecast (HTTP cached)
+        try:
+            forecast_data = await upstream.get_json(forecast_url, headers=headers, name="noaa_forecast")
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code not in STALE_GRIDPOINT_STATUSES:
+                raise
+            # The gridpoint moved, drop the cached URL and resolve it again
+            lat, lon = coordinates
+            await run_db(delete_gridpoint, f"{lat},{lon}")
+            forecast_url = await resolve_forecast_url(coordinates, headers, refresh=True)
+            forecast_data = await upstream.get_json(forecast_url, headers=headers, name="noaa_forecast")
 
-        points_data = points_response.json()
-        forecast_url = points_data['properties']['forecast']
+        current_period = forecast_data['properties']['periods'][0]
 
-        # Step 2: Get the actual forecast
-        forecast_response = requests.get(forecast_url, headers=headers, timeout=10)
-        forecast_response.raise_for_status()
+        return build_weather_payload(effective_city, current_period)
+    except httpx.HTTPError as error:
+        # Short-circuited calls are only counted, the breaker prints its transitions once
+        if not isinstance(error, CircuitOpen):
+            error_data = {
+                "error": str(error),
+                "message": "Failed to fetch NOAA weather data",
+                "upstream": "weather",
+                "city": effective_city,
+            }
+            # add_log flushes a full queue synchronously, keep that off the upstream loop
+            await run_db(add_log, "error", error_data)
+        MOCK_FALLBACKS.inc(service="weather")
+        mark_mock_fallback()
+        annotate(fallback="mock")
+        return build_mock_weather_data(effective_city)
 
-        forecast_data = forecast_response.json()
-        current_period = forecast_data['properties']['periods'][0]
 
-        # NOAA provides temperature in Fahrenheit
-        fahrenheit_temp = current_period['temperature']
-        celsius_temp = convert_to_celsius(fahrenheit_temp)
-
-        return {
-            "main": {
-                "temp": celsius_temp,  # Keep the main temp as Celsius for compatibility
-                "temp_c": celsius_temp,  # Explicit Celsius
-                "temp_f": fahrenheit_temp,  # Explicit Fahrenheit
-            },
-            "weather": [
-                {
-                    "main": current_period['shortForecast'],
-                    "description": current_period['detailedForecast']
-                }
-            ],
-            "name": effective_city,
-            "dt": int(datetime.now().timestamp())
-        }
-    except RequestException as error:
-        error_data = {"error": str(error), "message": "Failed to fetch NOAA weather data"}
-        add_log("error", error_data)
-        return build_mock_weather_data()
+def fetch_weather_data(city=None):
+    """Blocking wrapper around fetch_weather_data_async"""
+    return upstream.run(fetch_weather_data_async(city))
@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app import serialization
+
+
+class StateCache:
+    """
+    In-process, write-through cache of the target states.
+
+    Rows are loaded once through ``loader``, which returns them with the
+    version they were read at, and then kept coherent by the writers, which
+    hold ``lock`` around their commit and call ``update`` with the version
+    they committed. The version comes from the database, so it is the same in
+    every process; the serialized JSON body is precomputed on every change.
+    """
+
+    def __init__(self, loader: Callable[[], Tuple[int, List[Dict[str, Any]]]]):
+        self.loader = loader
+        self.lock = threading.RLock()
+        # (states by target, serialized body, version), swapped as a whole so readers never need the lock
+        self._snapshot = None
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version of the cached states, None until they are loaded"""
+        snapshot = self._snapshot
+        return snapshot[2] if snapshot is not None else None
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self.lock:
+                if self._snapshot is None:
+                    version, rows = self.loader()
+                    self._set({row["target"]: row for row in rows}, version)
+                snapshot = self._snapshot
+        return snapshot
+
+    def _set(self, states: Dict[str, Dict[str, Any]], version: int):
+        rows = [states[target] for target in sorted(states)]
+        self._snapshot = (states, serialization.dumps(rows), version)
+
+    def get(self) -> List[Dict[str, Any]]:
+        """Current states ordered by target"""
+        return self.versioned()[1]
+
+    def versioned(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Current version and states, read consistently with each other"""
+        states, _, version = self._current()
+        return version, [dict(states[target]) for target in sorted(states)]
+
+    def body(self) -> bytes:
+        """Current states already serialized as a JSON array"""
+        return self._current()[1]
+
+    def versioned_body(self) -> Tuple[int, bytes]:
+        """Current version and serialized states, read consistently with each other"""
+        _, body, version = self._current()
+        return version, body
+
+    def update(self, rows: List[Dict[str, Any]], version: int):
+        """
+        Apply state rows committed at version to the cache. When the write does not
+        directly follow the cached version another process wrote in between, so the
+        rows are reloaded instead.
+        """
+        with self.lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[2] != version - 1:
+                self._snapshot = None
+                return
+            states = dict(snapshot[0])
+            for row in rows:
+                states[row["target"]] = row
+            self._set(states, version)
+
+    def invalidate(self):
+        """Drop the cached rows so the next read reloads them"""
+        with self.lock:
+            self._snapshot = None
@@ -0,0 +1,83 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Span of the stage currently executing; asyncio tasks and run_db calls inherit it
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed stage of a traced operation, with the stages it contains"""
+
+    __slots__ = ("name", "attributes", "started", "duration_ms", "error", "children")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self.children: List["Span"] = []
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def to_dict(self, origin: float = None) -> Dict[str, Any]:
+        """Span tree with offsets in milliseconds from the root's start"""
+        origin = self.started if origin is None else origin
+        node = {
+            "name": self.name,
+            "offset_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": self.duration_ms,
+        }
+        if self.attributes:
+            node["attributes"] = self.attributes
+        if self.error:
+            node["error"] = self.error
+        node["children"] = [child.to_dict(origin) for child in self.children]
+        return node
+
+
+@contextmanager
+def _activate(span: Span):
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as error:
+        span.error = type(error).__name__
+        raise
+    finally:
+        span.finish()
+        current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Start a new trace, its root span is yielded and can be serialized once the block exits"""
+    with _activate(Span(name, attributes)) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage as a child of the current span. Outside of a trace this is a
+    no-op that only reads a context variable, so stages can be instrumented freely.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    with _activate(child):
+        yield child
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if a trace is active"""
+    active = current_span.get()
+    if active is not None:
+        active.attributes.update(attributes)
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the automation and API hot paths.
+
+Run from the backend directory with ``python -m benchmarks``; see
+``python -m benchmarks --help`` for sizes, output and baseline options.
+"""
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks.harness import compare, format_comparison, format_results, load_report, write_report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the performance benchmarks")
+    parser.add_argument("--profile", choices=["quick", "full"], default="quick", help="Workload sizes (default: quick)")
+    parser.add_argument("--only", action="append", help="Run only this benchmark group, may be repeated")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Baseline results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing (default: 0.2)")
+    parser.add_argument("--database", help="SQLite file to benchmark against (default: a temporary file)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+
+    # The app reads its settings on import, so point it at a scratch database first
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix="benchmarks-"), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+
+    from app.database import init_db
+    from benchmarks.cases import BENCHMARKS, PROFILES
+
+    init_db()
+    profile = PROFILES[args.profile]
+    groups = args.only or list(BENCHMARKS)
+    unknown = [group for group in groups if group not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)} (available: {', '.join(BENCHMARKS)})")
+        return 2
+
+    results = {}
+    for group in groups:
+        print(f"Running {group} benchmarks ({args.profile})...")
+        results.update(BENCHMARKS[group](profile))
+
+    write_report(args.output, results, args.profile)
+    print(format_results(results))
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    baseline = load_report(args.baseline)
+    if baseline.get("profile") != args.profile:
+        print(f"Warning: baseline was recorded with the {baseline.get('profile')} profile")
+    rows = compare(results, baseline["results"], args.tolerance)
+    print(format_comparison(rows))
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.harness import latency_summary, measure, result
+
+# Workload sizes per profile; "quick" is meant for CI and laptops, "full" for release checks
+PROFILES = {
+    "quick": {
+        "add_log_rows": 20_000,
+        "log_table_sizes": [10_000, 100_000],
+        "query_iterations": 200,
+        "api_clients": 20,
+        "api_seconds": 3.0,
+        "automation_iterations": 20,
+        "upstream_delay_ms": 50,
+    },
+    "full": {
+        "add_log_rows": 200_000,
+        "log_table_sizes": [10_000, 1_000_000],
+        "query_iterations": 1000,
+        "api_clients": 50,
+        "api_seconds": 10.0,
+        "automation_iterations": 50,
+        "upstream_delay_ms": 50,
+    },
+}
+
+SEED_BATCH = 50_000
+SOURCES = ["weather", "sports", "manual", "automation"]
+
+
+def size_label(size: int) -> str:
+    return f"{size // 1_000_000}m" if size >= 1_000_000 else f"{size // 1000}k"
+
+
+def count_logs() -> int:
+    from sqlalchemy import func, select
+
+    from app.database import get_db_context
+    from app.models.log import LogModel
+
+    with get_db_context() as db:
+        return db.execute(select(func.count(LogModel.id))).scalar()
+
+
+def seed_logs(total: int):
+    """Grow the logs table to total rows with bulk inserts, bypassing the log writer"""
+    from sqlalchemy import insert
+
+    from app.database import engine
+    from app.models.log import LogModel
+
+    existing = count_logs()
+    payload = '{"main":{"temp":22.0,"temp_c":22.0,"temp_f":71.6},"name":"Seattle"}'
+    while existing < total:
+        batch = min(SEED_BATCH, total - existing)
+        now = datetime.now()
+        rows = [
+            {"timestamp": now, "source": SOURCES[(existing + i) % len(SOURCES)], "data": payload, "action_taken": "None"}
+            for i in range(batch)
+        ]
+        with engine.begin() as connection:
+            connection.execute(insert(LogModel), rows)
+        existing += batch
+
+
+def bench_add_log(profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Rows per second accepted by add_log and written by the buffered log writer"""
+    from app.database import add_log, log_writer
+
+    rows = profile["add_log_rows"]
+    data = {"message": "Activated Twitter ads", "target": "Twitter", "status": "active"}
+
+    log_writer.start()
+    try:
+        started = time.perf_counter()
+        for _ in range(rows):
+            add_log("manual", data, "Activated Twitter ads")
+        enqueued = time.perf_counter() - started
+        log_writer.flush()
+        elapsed = time.perf_counter() - started
+    finally:
+        log_writer.stop()
+
+    return {
+        "add_log_throughput": result(
+            rows / elapsed, "rows/s", True,
+            rows=rows,
+            enqueue_rows_per_s=round(rows / enqueued, 1),
+            flushes=log_writer.stats()["flushes"],
+        ),
+    }
+
+
+def bench_get_logs(profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Latency of /api/logs queries (newest page, per source, deep keyset page) at several table sizes"""
+    from app.database import get_logs_json
+
+    results = {}
+    for size in profile["log_table_sizes"]:
+        seed_logs(size)
+        iterations = profile["query_iterations"]
+        newest = measure(lambda: get_logs_json(limit=50), iterations)
+        by_source = measure(lambda: get_logs_json(limit=50, source="weather"), iterations)
+        deep_page = measure(lambda: get_logs_json(limit=50, before_id=size // 2), iterations)
+        results[f"get_logs_{size_label(size)}_p95"] = result(
+            newest["p95_ms"], "ms", False,
+            rows=size,
+            newest_page=newest,
+            by_source=by_source,
+            deep_page=deep_page,
+        )
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def load(url: str, clients: int, seconds: float) -> Dict[str, Any]:
+    """Hit url from concurrent clients for a fixed duration"""
+    samples: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url)
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests": len(samples), "errors": errors, "rps": len(samples) / elapsed, "latency": latency_summary(samples)}
+
+
+def bench_api(profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Requests per second of /api/state and /api/logs served by uvicorn under concurrent clients"""
+    import uvicorn
+
+    from app.config import settings
+    from app.main import app
+
+    settings.GRIDPOINT_PREWARM = False
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-server", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    results = {}
+    try:
+        for name, path in (("api_state_rps", "/api/state"), ("api_logs_rps", "/api/logs?limit=50")):
+            stats = asyncio.run(load(f"http://127.0.0.1:{port}{path}", profile["api_clients"], profile["api_seconds"]))
+            results[name] = result(
+                stats["rps"], "req/s", True,
+                clients=profile["api_clients"],
+                requests=stats["requests"],
+                errors=stats["errors"],
+                latency=stats["latency"],
+            )
+    finally:
+        server.should_exit = True
+        thread.join()
+    return results
+
+
+def simulated_upstream(delay_ms: float):
+    """Replacement for UpstreamClient.get answering NOAA and SportsDB URLs after a fixed delay"""
+    async def get(url, name=None, **kwargs):
+        await asyncio.sleep(delay_ms / 1000)
+        if "/points/" in url:
+            payload = {"properties": {"forecast": "https://api.weather.gov/gridpoints/SEW/124,67/forecast"}}
+        elif "/forecast" in url:
+            payload = {"properties": {"periods": [
+                {"temperature": 75, "shortForecast": "Sunny", "detailedForecast": "Sunny and warm"}
+            ]}}
+        else:
+            payload = {"events": [{"strEvent": "Lakers vs Celtics", "intHomeScore": "101", "intAwayScore": "99"}]}
+        return httpx.Response(200, json=payload, request=httpx.Request("GET", url))
+    return get
+
+
+def bench_automation(profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    End to end perform_automation latency with every upstream request delayed,
+    and of manual runs answered from the last known good data store
+    """
+    from app.config import settings
+    from app.services.automation_service import perform_automation
+    from app.services.data_store import data_store
+    from app.services.http_client import upstream
+
+    delay_ms = profile["upstream_delay_ms"]
+    settings.SPORTS_API_KEY = "benchmark"
+
+    def run():
+        # Every run fetches from the (simulated) upstreams instead of the response cache or data store
+        upstream.cache.clear()
+        data_store.clear()
+        perform_automation("Seattle", source="benchmark")
+
+    def manual_run():
+        perform_automation("Seattle", source="manual")
+
+    with patch.object(upstream, "get", simulated_upstream(delay_ms)):
+        stats = measure(run, profile["automation_iterations"], warmup=2)
+        manual_stats = measure(manual_run, profile["automation_iterations"], warmup=2)
+
+    return {
+        "automation_p95": result(
+            stats["p95_ms"], "ms", False,
+            upstream_delay_ms=delay_ms,
+            overhead_p50_ms=round(stats["p50_ms"] - delay_ms, 3),
+            latency=stats,
+        ),
+        "automation_stored_p95": result(manual_stats["p95_ms"], "ms", False, latency=manual_stats),
+    }
+
+
+# Benchmarks in execution order; the API one starts and stops the full app, so it runs last
+BENCHMARKS = {
+    "add_log": bench_add_log,
+    "get_logs": bench_get_logs,
+    "automation": bench_automation,
+    "api": bench_api,
+}
@@ -0,0 +1,106 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from app.metrics import percentile
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        "samples": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3) if samples_ms else 0.0,
+        "p50_ms": round(percentile(samples_ms, 0.50), 3),
+        "p95_ms": round(percentile(samples_ms, 0.95), 3),
+        "p99_ms": round(percentile(samples_ms, 0.99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    """Call func repeatedly and summarize its latency"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return latency_summary(samples)
+
+
+def result(value: float, unit: str, higher_is_better: bool, **details) -> Dict[str, Any]:
+    """
+    One benchmark result. ``value`` is the metric compared against the baseline,
+    everything else is reported for context only.
+    """
+    return {"value": round(value, 3), "unit": unit, "higher_is_better": higher_is_better, **details}
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def write_report(path: str, results: Dict[str, Dict[str, Any]], profile: str):
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "profile": profile,
+        "environment": environment(),
+        "results": results,
+    }
+    with open(path, "w") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare results with a baseline's results. A benchmark regresses when its
+    value is worse than the baseline by more than ``tolerance`` (0.2 = 20%).
+    Benchmarks missing from either side are skipped.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous["value"]:
+            continue
+
+        change = (current["value"] - previous["value"]) / previous["value"]
+        worse = -change if current["higher_is_better"] else change
+        rows.append({
+            "name": name,
+            "unit": current["unit"],
+            "baseline": previous["value"],
+            "current": current["value"],
+            "change": round(change, 4),
+            "regressed": worse > tolerance,
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>8}  unit"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        lines.append(
+            f"{row['name']:<32} {row['baseline']:>12} {row['current']:>12} {row['change']:>+8.1%}  {row['unit']}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def format_results(results: Dict[str, Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<32} {'value':>12}  unit"]
+    for name, current in results.items():
+        lines.append(f"{name:<32} {current['value']:>12}  {current['unit']}")
+    return "\n".join(lines)
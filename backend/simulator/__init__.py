@@ -0,0 +1,9 @@
+"""
+Local stand-in for the NOAA and TheSportsDB APIs with latency and fault injection.
+
+Start it with ``python -m simulator`` and point ``NOAA_BASE_URL`` and
+``SPORTSDB_BASE_URL`` at it to exercise the real HTTP code paths offline.
+"""
+from simulator.app import SimulatorConfig, UpstreamBehavior, create_app
+
+__all__ = ["SimulatorConfig", "UpstreamBehavior", "create_app"]
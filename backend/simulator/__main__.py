@@ -0,0 +1,55 @@
+import argparse
+import json
+
+import uvicorn
+
+from simulator.app import SimulatorConfig, UpstreamBehavior, create_app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m simulator", description="Run the NOAA/TheSportsDB simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--config", help="JSON file with per-upstream behavior ({\"noaa\": {...}, \"sportsdb\": {...}})")
+    parser.add_argument("--seed", type=int, help="Seed for latency and fault injection")
+
+    # Applied to both upstreams unless --config is given
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "normal", "lognormal"], default="fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before 429, 0 = unlimited")
+    parser.add_argument("--no-etag", action="store_true", help="Send no ETags, so 304 never happens")
+    parser.add_argument("--max-age", type=int, default=0, help="Cache-Control max-age in seconds")
+    return parser.parse_args()
+
+
+def build_config(args) -> SimulatorConfig:
+    if args.config:
+        with open(args.config) as handle:
+            config = SimulatorConfig(**json.load(handle))
+        if args.seed is not None:
+            config.seed = args.seed
+        return config
+
+    behavior = UpstreamBehavior(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_distribution=args.latency_distribution,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        etag=not args.no_etag,
+        max_age=args.max_age,
+    )
+    return SimulatorConfig(noaa=behavior, sportsdb=behavior.model_copy(), seed=args.seed)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"Simulator serving NOAA at http://{args.host}:{args.port}/noaa "
+          f"and TheSportsDB at http://{args.host}:{args.port}/sportsdb")
+    uvicorn.run(create_app(build_config(args)), host=args.host, port=args.port)
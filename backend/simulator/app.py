@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+
+UPSTREAMS = ("noaa", "sportsdb")
+
+TEAMS = ["Lakers", "Celtics", "Bulls", "Warriors", "Heat", "Bucks", "Nets", "Suns"]
+FORECASTS = ["Sunny", "Partly Cloudy", "Mostly Cloudy", "Chance Rain Showers", "Rain", "Snow"]
+
+
+class UpstreamBehavior(BaseModel):
+    """How one simulated upstream answers"""
+    latency_ms: float = Field(default=0.0, ge=0)
+    latency_jitter_ms: float = Field(default=0.0, ge=0)
+    # fixed: always latency_ms; uniform: latency_ms +/- jitter; normal: jitter is the std deviation;
+    # lognormal: median latency_ms with a long tail, jitter scales the spread
+    latency_distribution: Literal["fixed", "uniform", "normal", "lognormal"] = "fixed"
+    error_rate: float = Field(default=0.0, ge=0, le=1)
+    error_status: int = Field(default=503, ge=400, le=599)
+    throttle_rate: float = Field(default=0.0, ge=0, le=1)  # share of requests answered with 429
+    rate_limit: float = Field(default=0.0, ge=0)  # requests per second before answering 429, 0 = unlimited
+    retry_after: int = Field(default=1, ge=0)
+    etag: bool = True  # send ETags and answer matching If-None-Match with 304
+    max_age: int = Field(default=0, ge=0)  # Cache-Control max-age sent with every response
+    data_period: int = Field(default=300, ge=1)  # seconds each generated payload (and its ETag) stays the same
+
+
+class SimulatorConfig(BaseModel):
+    noaa: UpstreamBehavior = UpstreamBehavior()
+    sportsdb: UpstreamBehavior = UpstreamBehavior()
+    seed: Optional[int] = None
+
+
+class UpstreamState:
+    """Counters and token bucket of one simulated upstream"""
+
+    def __init__(self):
+        self.tokens = None
+        self.refilled_at = time.monotonic()
+        self.counts: Dict[str, int] = {}
+
+    def count(self, outcome: str):
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def take_token(self, rate: float) -> bool:
+        now = time.monotonic()
+        burst = max(rate, 1.0)
+        self.tokens = burst if self.tokens is None else min(burst, self.tokens + (now - self.refilled_at) * rate)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Simulator:
+    """Shared state of the simulator app: behavior per upstream, randomness and counters"""
+
+    def __init__(self, config: SimulatorConfig):
+        self.configure(config)
+
+    def configure(self, config: SimulatorConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.states = {name: UpstreamState() for name in UPSTREAMS}
+
+    def latency(self, behavior: UpstreamBehavior) -> float:
+        """Seconds to wait before answering"""
+        base, jitter = behavior.latency_ms, behavior.latency_jitter_ms
+        if behavior.latency_distribution == "uniform":
+            value = self.random.uniform(base - jitter, base + jitter)
+        elif behavior.latency_distribution == "normal":
+            value = self.random.gauss(base, jitter)
+        elif behavior.latency_distribution == "lognormal" and base > 0:
+            value = self.random.lognormvariate(0, max(jitter / base, 0.01)) * base
+        else:
+            value = base
+        return max(value, 0.0) / 1000
+
+    async def respond(self, request: Request, upstream: str, payload: Callable[[int], Dict[str, Any]]) -> Response:
+        """Answer as the upstream would: delay, inject faults, then serve payload with validators"""
+        behavior: UpstreamBehavior = getattr(self.config, upstream)
+        state = self.states[upstream]
+
+        delay = self.latency(behavior)
+        if delay:
+            await asyncio.sleep(delay)
+
+        throttled = self.random.random() < behavior.throttle_rate
+        if behavior.rate_limit and not state.take_token(behavior.rate_limit):
+            throttled = True
+        if throttled:
+            state.count("429")
+            return Response(status_code=429, headers={"Retry-After": str(behavior.retry_after)})
+
+        if self.random.random() < behavior.error_rate:
+            state.count(str(behavior.error_status))
+            return Response(status_code=behavior.error_status)
+
+        # The payload changes once per data period, which is what the ETag tracks
+        period = int(time.time() // behavior.data_period)
+        body = json.dumps(payload(period)).encode()
+        headers = {"Cache-Control": f"max-age={behavior.max_age}" if behavior.max_age else "no-cache"}
+        if behavior.etag:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            headers["ETag"] = etag
+            if request.headers.get("if-none-match") == etag:
+                state.count("304")
+                return Response(status_code=304, headers=headers)
+
+        state.count("200")
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(state.counts) for name, state in self.states.items()}
+
+
+def seeded(*parts) -> random.Random:
+    """Deterministic randomness for generated payloads, so ETags stay stable within a period"""
+    return random.Random("/".join(str(part) for part in parts))
+
+
+def create_app(config: SimulatorConfig = None) -> FastAPI:
+    """
+    Stand-in for the NOAA and TheSportsDB endpoints used by the automation suite.
+
+    NOAA is served under /noaa and TheSportsDB under /sportsdb, matching the
+    NOAA_BASE_URL and SPORTSDB_BASE_URL settings. Behavior is changed at runtime
+    through /_sim/config, and /_sim/stats counts responses by status.
+    """
+    app = FastAPI(title="Upstream Simulator")
+    simulator = Simulator(config or SimulatorConfig())
+    app.state.simulator = simulator
+
+    @app.get("/noaa/points/{location}")
+    async def points(location: str, request: Request):
+        try:
+            lat, lon = (float(part) for part in location.split(","))
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Invalid point")
+
+        grid_x, grid_y = int(abs(lat) * 10) % 200, int(abs(lon) * 10) % 200
+        forecast_url = f"{str(request.base_url).rstrip('/')}/noaa/gridpoints/SIM/{grid_x},{grid_y}/forecast"
+        return await simulator.respond(request, "noaa", lambda period: {
+            "properties": {"gridId": "SIM", "gridX": grid_x, "gridY": grid_y, "forecast": forecast_url},
+        })
+
+    @app.get("/noaa/gridpoints/{office}/{grid}/forecast")
+    async def forecast(office: str, grid: str, request: Request):
+        def payload(period):
+            rng = seeded(office, grid, period)
+            temperature = rng.randint(35, 100)
+            short_forecast = rng.choice(FORECASTS)
+            return {"properties": {"periods": [{
+                "number": 1,
+                "name": "Today",
+                "temperature": temperature,
+                "temperatureUnit": "F",
+                "shortForecast": short_forecast,
+                "detailedForecast": f"{short_forecast}, with a high near {temperature}.",
+            }]}}
+        return await simulator.respond(request, "noaa", payload)
+
+    @app.get("/sportsdb/{api_key}/eventslast.php")
+    async def events_last(api_key: str, request: Request, id: str = "133602"):
+        def payload(period):
+            rng = seeded(id, period)
+            home, away = rng.sample(TEAMS, 2)
+            return {"results": [{
+                "idEvent": str(period),
+                "strEvent": f"{home} vs {away}",
+                "strHomeTeam": home,
+                "strAwayTeam": away,
+                "intHomeScore": str(rng.randint(80, 130)),
+                "intAwayScore": str(rng.randint(80, 130)),
+                "dateEvent": datetime.now().date().isoformat(),
+            }]}
+        return await simulator.respond(request, "sportsdb", payload)
+
+    @app.get("/_sim/config", response_model=SimulatorConfig)
+    async def read_config():
+        return simulator.config
+
+    @app.put("/_sim/config", response_model=SimulatorConfig)
+    async def replace_config(config: SimulatorConfig):
+        """Replace the behavior of both upstreams and reset the counters"""
+        simulator.configure(config)
+        return simulator.config
+
+    @app.put("/_sim/config/{upstream}", response_model=SimulatorConfig)
+    async def update_upstream(upstream: Literal["noaa", "sportsdb"], behavior: UpstreamBehavior):
+        """Change the behavior of one upstream, keeping its counters"""
+        setattr(simulator.config, upstream, behavior)
+        return simulator.config
+
+    @app.get("/_sim/stats")
+    async def read_stats():
+        return simulator.stats()
+
+    return app
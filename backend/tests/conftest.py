@@ -1,6 +1,7 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
 from app.models.base import Base
@@ -8,8 +9,9 @@ from app.models.state import StateModel
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
+# StaticPool shares the single in-memory connection with background threads (log writer, app)
 test_engine = create_engine(
-    TEST_DATABASE_URL, connect_args={"check_same_thread": False}
+    TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
 )
 TestSessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=test_engine
@@ -40,15 +42,38 @@ def test_db():
 
     yield
 
+    db_module.log_writer.flush()
     Base.metadata.drop_all(bind=test_engine)
 
     db_module.engine = original_engine
     db_module.SessionLocal = original_session_local
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    from app.database import remote_changes, state_cache
+    from app import revisions, runtime_settings
+    from app.services.data_store import data_store
+    from app.services.http_client import upstream
+
+    yield
+
+    upstream.cache.clear()
+    upstream.breakers.reset()
+    data_store.clear()
+    runtime_settings.reset()
+    revisions.reset()
+    state_cache.invalidate()
+    remote_changes.reset()
+
+
 @pytest.fixture
-def test_client():
+def test_client(monkeypatch):
+    from app.config import settings
     from app.main import app
 
+    # Keep startup from reaching out to NOAA
+    monkeypatch.setattr(settings, "GRIDPOINT_PREWARM", False)
+
     with TestClient(app) as client:
         yield client
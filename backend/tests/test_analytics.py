@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.analytics import get_analytics, rebuild_rollups
+from app.database import add_logs
+from app.models.base import Base
+
+
+def weather(city, temp_f):
+    return ("weather", {"main": {"temp_f": temp_f}, "name": city}, "None")
+
+
+def test_rollups_aggregate_counts_and_temperatures_per_city():
+    add_logs([
+        weather("Seattle", 60),
+        weather("Seattle", 70),
+        weather("Miami", 90),
+        ("automation", {"target": "Twitter", "status": "paused", "message": "Paused"}, "Paused"),
+    ])
+
+    by_city = get_analytics(group_by=["city"], filters={"source": "weather"})
+    paused = get_analytics(bucket="day", group_by=["target"], filters={"status": "paused"})
+
+    points = {point["city"]: point for point in by_city["series"]}
+    assert points["Seattle"]["count"] == 2
+    assert (points["Seattle"]["temp_min"], points["Seattle"]["temp_max"], points["Seattle"]["temp_avg"]) == (60, 70, 65)
+    assert points["Miami"]["temp_avg"] == 90
+    assert [(point["target"], point["count"]) for point in paused["series"]] == [("Twitter", 1)]
+
+
+def test_rebuild_reproduces_incremental_rollups():
+    add_logs([weather("Boston", 50), ("error", {"error": "timeout", "upstream": "sports"}, "None")])
+    since = datetime.now() - timedelta(days=1)
+    incremental = get_analytics(since=since, group_by=["source", "city", "upstream"])
+
+    result = rebuild_rollups(batch_size=1)
+
+    assert result["logs_scanned"] == 2
+    assert get_analytics(since=since, until=incremental["until"], group_by=["source", "city", "upstream"]) == incremental
+
+
+def test_rebuild_writes_between_batches_with_a_rollback_journal(tmp_path, monkeypatch):
+    import app.database as db_module
+
+    # A file database without WAL, where an open read cursor blocks writes from other connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollback.db'}", connect_args={"timeout": 0.1})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(db_module, "engine", engine)
+    monkeypatch.setattr(db_module, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    add_logs([weather("Boston", 50 + index) for index in range(5)])
+
+    result = rebuild_rollups(batch_size=2)
+
+    assert result["logs_scanned"] == 5
+    assert get_analytics(group_by=["city"])["series"][0]["count"] == 5
+    engine.dispose()
@@ -1,4 +1,10 @@
-from unittest.mock import patch
+import csv
+import gzip
+import io
+import json
+from unittest.mock import AsyncMock, patch
+
+from app.database import add_logs, log_writer
 
 
 def test_get_state_returns_default_targets(test_client):
@@ -29,13 +35,14 @@ def test_update_state_returns_422_for_invalid_target(test_client):
     assert response.status_code == 422
 
 
-@patch("app.routes.api.perform_automation")
+@patch("app.routes.api.request_automation", new_callable=AsyncMock)
 def test_run_automation_forwards_city_and_returns_service_response(mock_perform, test_client):
     mock_response = {
         "timestamp": "2025-03-10T12:00:00",
         "weather": {"main": {"temp": 22.0, "temp_c": 22.0, "temp_f": 71.6}},
         "sports": {"events": []},
         "actions": ["Activated Twitter ads"],
+        "transitions": {},
         "states": [],
     }
     mock_perform.return_value = mock_response
@@ -43,11 +50,157 @@ def test_run_automation_forwards_city_and_returns_service_response(mock_perform,
     response = test_client.post("/api/run", json={"city": "Seattle"})
 
     assert response.status_code == 200
-    assert response.json() == mock_response
-    mock_perform.assert_called_once_with("Seattle", source="manual")
+    assert response.json() == {**mock_response, "city_warning": None, "data_age": None, "trace": None}
+    mock_perform.assert_awaited_once_with("Seattle", source="manual")
 
 
 def test_delete_logs_returns_success(test_client):
     response = test_client.delete("/api/logs")
 
     assert response.status_code == 200
+
+
+def test_dashboard_returns_full_snapshot_with_latest_per_source(test_client):
+    add_logs([("weather", {"name": "Seattle"}, "None")] + [("manual", {}, "None")] * 60)
+    log_writer.flush()
+
+    response = test_client.get("/api/dashboard")
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["full"] is True
+    assert len(body["states"]) == 3
+    assert body["settings"]["city"]
+    assert body["latest"]["weather"]["data"] == {"name": "Seattle"}
+    assert "weather" not in {log["source"] for log in body["logs"]}
+
+
+def test_dashboard_with_cursor_returns_only_changes(test_client):
+    cursor = test_client.get("/api/dashboard").json()["cursor"]
+
+    unchanged = test_client.get("/api/dashboard", params={"cursor": cursor}).json()
+    test_client.put("/api/state/Twitter", json={"status": "paused"})
+    log_writer.flush()
+    changed = test_client.get("/api/dashboard", params={"cursor": unchanged["cursor"]}).json()
+
+    assert unchanged["full"] is False
+    assert unchanged["states"] is None and unchanged["settings"] is None
+    assert unchanged["logs"] == [] and unchanged["latest"] == {}
+    assert {state["target"]: state["status"] for state in changed["states"]}["Twitter"] == "paused"
+    assert [log["source"] for log in changed["logs"]] == ["manual"]
+    assert changed["settings"] is None
+
+
+def test_dashboard_returns_full_snapshot_when_more_logs_were_added_than_fit(test_client):
+    cursor = test_client.get("/api/dashboard", params={"limit": 5}).json()["cursor"]
+    add_logs([("manual", {"n": index}, "None") for index in range(6)])
+    log_writer.flush()
+
+    body = test_client.get("/api/dashboard", params={"cursor": cursor, "limit": 5}).json()
+
+    assert body["full"] is True
+    assert [log["data"]["n"] for log in body["logs"]] == [5, 4, 3, 2, 1]
+
+
+def test_dashboard_returns_full_snapshot_after_logs_are_cleared(test_client):
+    cursor = test_client.get("/api/dashboard").json()["cursor"]
+    test_client.delete("/api/logs")
+
+    assert test_client.get("/api/dashboard", params={"cursor": cursor}).json()["full"] is True
+
+
+def test_get_state_returns_304_for_matching_etag(test_client):
+    etag = test_client.get("/api/state").headers["ETag"]
+
+    unchanged = test_client.get("/api/state", headers={"If-None-Match": etag})
+    test_client.put("/api/state/Twitter", json={"status": "paused"})
+    changed = test_client.get("/api/state", headers={"If-None-Match": etag})
+
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_get_logs_etag_changes_with_new_logs_and_filters(test_client):
+    etag = test_client.get("/api/logs").headers["ETag"]
+
+    assert test_client.get("/api/logs", headers={"If-None-Match": etag}).status_code == 304
+    assert test_client.get("/api/logs?source=weather", headers={"If-None-Match": etag}).status_code == 200
+
+    add_logs([("weather", {}, "None")])
+    # Checking the ETag does not flush, the version moves once the log writer has written the row
+    assert test_client.get("/api/logs", headers={"If-None-Match": etag}).status_code == 304
+    log_writer.flush()
+    response = test_client.get("/api/logs", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()[0]["source"] == "weather"
+
+
+def test_get_settings_etag_changes_when_cadence_changes(test_client):
+    etag = test_client.get("/api/settings").headers["ETag"]
+
+    assert test_client.get("/api/settings", headers={"If-None-Match": etag}).status_code == 304
+    test_client.put("/api/cadence?minutes=45")
+
+    assert test_client.get("/api/settings", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_export_logs_streams_ndjson_oldest_first_with_filters(test_client):
+    add_logs([("weather", {"temp": 70}, "None"), ("manual", {}, "None"), ("weather", {"temp": 71}, "None")])
+
+    response = test_client.get("/api/logs/export?source=weather")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["data"]["temp"] for row in rows] == [70, 71]
+
+
+def test_export_logs_streams_gzipped_csv(test_client):
+    add_logs([("sports", {"events": []}, "None")])
+
+    response = test_client.get("/api/logs/export?format=csv&gzip=true")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert rows[0] == ["id", "timestamp", "source", "action_taken", "data"]
+    assert rows[1][2] == "sports"
+    assert json.loads(rows[1][4]) == {"events": []}
+
+
+def test_get_logs_projects_requested_fields(test_client):
+    add_logs([("weather", {"temp": 70}, "None")])
+    log_writer.flush()
+
+    projected = test_client.get("/api/logs?fields=id,source")
+    unknown = test_client.get("/api/logs?fields=id,secret")
+
+    assert projected.status_code == 200
+    assert list(projected.json()[0]) == ["id", "source"]
+    assert projected.json()[0]["source"] == "weather"
+    assert unknown.status_code == 422
+
+
+def test_get_logs_treats_a_blank_projection_as_every_field(test_client):
+    add_logs([("weather", {"temp": 70}, "None")])
+    log_writer.flush()
+
+    for fields in (",", " ", ""):
+        response = test_client.get("/api/logs", params={"fields": fields})
+
+        assert response.status_code == 200
+        assert set(response.json()[0]) == {"id", "timestamp", "source", "data", "action_taken"}
+
+
+def test_get_logs_embeds_stored_payloads(test_client):
+    add_logs([("sports", {"events": [{"strEvent": "Lakers vs Celtics"}]}, "None")])
+    log_writer.flush()
+
+    response = test_client.get("/api/logs")
+
+    assert response.status_code == 200
+    assert response.json()[0]["data"] == {"events": [{"strEvent": "Lakers vs Celtics"}]}
+    assert set(response.json()[0]) == {"id", "timestamp", "source", "data", "action_taken"}
@@ -0,0 +1,179 @@
+import asyncio
+from unittest.mock import patch
+
+from app.database import get_logs
+from app.services.automation_service import (
+    perform_automation,
+    perform_automation_async,
+    perform_fanout_automation,
+    request_automation,
+)
+
+WEATHER_PAYLOAD = {"main": {"temp": 22.0, "temp_c": 22.0, "temp_f": 71.6}, "name": "Seattle"}
+SPORTS_PAYLOAD = {"events": [{"intHomeScore": "100", "intAwayScore": "90"}]}
+
+
+def test_perform_automation_fetches_upstreams_concurrently():
+    weather_started = asyncio.Event()
+    sports_started = asyncio.Event()
+
+    # Each fake waits for the other one to start, which only succeeds when both run at the same time
+    async def fake_weather(city):
+        weather_started.set()
+        await asyncio.wait_for(sports_started.wait(), timeout=2)
+        return WEATHER_PAYLOAD
+
+    async def fake_sports():
+        sports_started.set()
+        await asyncio.wait_for(weather_started.wait(), timeout=2)
+        return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        result = perform_automation("Seattle")
+
+    assert result["weather"] == WEATHER_PAYLOAD
+    assert result["sports"] == SPORTS_PAYLOAD
+    assert "Activated Facebook ads - home team won (100-90)" in result["actions"]
+
+
+def test_perform_fanout_automation_fetches_sports_once_and_bounds_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+    sports_calls = 0
+
+    async def fake_weather(city):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"main": {"temp_f": 90 if city == "Miami" else 60}, "name": city}
+
+    async def fake_sports():
+        nonlocal sports_calls
+        sports_calls += 1
+        return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        result = perform_fanout_automation(["Miami", "Seattle", "Boston", "Atlantis"], max_concurrency=2)
+
+    assert sports_calls == 1
+    assert max_in_flight == 2
+    assert [city["city"] for city in result["cities"]] == ["Miami", "Seattle", "Boston"]
+    assert result["primary_city"] == "Seattle"
+    assert "Paused Twitter ads due to high temperature (90°F)" in result["cities"][0]["actions"]
+    states = {state["target"]: state["status"] for state in result["states"]}
+    assert states["Twitter"] == "active"
+    assert len(get_logs(source="weather")) == 3
+
+
+def test_perform_fanout_automation_evaluates_and_logs_a_repeated_city_once():
+    async def fake_weather(city):
+        return {"main": {"temp_f": 60}, "name": city}
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        result = perform_fanout_automation(["Boston", "Boston"])
+
+    assert [city["city"] for city in result["cities"]] == ["Boston"]
+    assert len(get_logs(source="weather")) == 1
+
+
+def test_perform_automation_only_writes_and_logs_real_transitions():
+    async def fake_weather(city):
+        return {"main": {"temp_f": 95}, "name": city}
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        first = perform_automation("Seattle")
+        second = perform_automation("Seattle")
+
+    assert first["transitions"]["Twitter"] == {"from": "active", "to": "paused"}
+    assert "Facebook" not in first["transitions"]
+    assert second["transitions"] == {}
+    assert len(second["actions"]) == len(first["actions"])
+    action_logs = get_logs(source="automation")
+    assert [log["data"]["target"] for log in action_logs] == list(first["transitions"])[::-1]
+
+
+def test_perform_automation_async_keeps_the_caller_loop_responsive():
+    async def slow_weather(city):
+        await asyncio.sleep(0.2)
+        return WEATHER_PAYLOAD
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    async def run_with_ticker():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        result = await perform_automation_async("Seattle", source="manual")
+        ticker_task.cancel()
+        return result, ticks
+
+    with patch("app.services.automation_service.fetch_weather_data_async", slow_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        result, ticks = asyncio.run(run_with_ticker())
+
+    # The caller's loop kept running while the upstream fetch was in flight
+    assert ticks >= 5
+    assert result["weather"] == WEATHER_PAYLOAD
+    assert get_logs(source="weather")
+
+
+def test_scheduled_run_does_not_join_a_manual_run_in_flight():
+    async def slow_weather(city):
+        await asyncio.sleep(0.1)
+        return WEATHER_PAYLOAD
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    async def run_both():
+        manual = asyncio.create_task(request_automation("Seattle", source="manual"))
+        await asyncio.sleep(0.02)
+        return await asyncio.gather(manual, request_automation("Seattle"))
+
+    with patch("app.services.automation_service.fetch_weather_data_async", slow_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        manual, scheduled = asyncio.run(run_both())
+
+    assert manual is not scheduled
+    assert manual["trace"]["attributes"]["source"] == "manual"
+    assert scheduled["trace"]["attributes"]["source"] == "automation"
+
+
+def test_manual_run_joins_a_scheduled_run_in_flight():
+    async def slow_weather(city):
+        await asyncio.sleep(0.1)
+        return WEATHER_PAYLOAD
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    async def run_both():
+        scheduled = asyncio.create_task(request_automation("Seattle"))
+        await asyncio.sleep(0.02)
+        return await asyncio.gather(scheduled, request_automation("Seattle", source="manual"))
+
+    with patch("app.services.automation_service.fetch_weather_data_async", slow_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        scheduled, manual = asyncio.run(run_both())
+
+    assert manual is scheduled
+    assert scheduled["trace"]["attributes"]["source"] == "automation"
@@ -0,0 +1,31 @@
+from benchmarks.harness import compare, percentile, result
+
+
+def test_compare_flags_changes_beyond_tolerance_in_the_worse_direction():
+    baseline = {
+        "throughput": result(1000, "rows/s", True),
+        "latency": result(10, "ms", False),
+        "removed": result(1, "ms", False),
+    }
+    current = {
+        "throughput": result(700, "rows/s", True),
+        "latency": result(8, "ms", False),
+        "added": result(1, "ms", False),
+    }
+
+    rows = {row["name"]: row for row in compare(current, baseline, tolerance=0.2)}
+
+    assert set(rows) == {"throughput", "latency"}
+    assert rows["throughput"]["regressed"] is True
+    assert rows["latency"]["regressed"] is False
+
+
+def test_percentile_uses_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+
+    assert percentile(samples, 0.5) == 50.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile(samples, 0.07) == 7.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 0.5) == 2.0
+    assert percentile([5.0], 0.99) == 5.0
+    assert percentile([], 0.5) == 0.0
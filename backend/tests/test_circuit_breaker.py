@@ -0,0 +1,116 @@
+import httpx
+import pytest
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpen
+from app.services.http_client import UpstreamClient
+
+URL = "http://upstream.test/forecast"
+
+
+@pytest.fixture
+def make_client():
+    """UpstreamClient on its own loop, answering with handler through a mock transport"""
+    clients = []
+
+    def make(handler, **breaker_options):
+        client = UpstreamClient(
+            breakers=CircuitBreakers(**{"failure_threshold": 2, "reset_timeout": 60, **breaker_options}),
+            retries=1,
+            retry_backoff=0,
+        )
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_breaker_opens_then_lets_a_single_probe_through():
+    breaker = CircuitBreaker("noaa", failure_threshold=2, reset_timeout=0)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.before_request()  # reset timeout elapsed, this is the probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+
+    breaker.record_success(0.05)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_failures_of_requests_in_flight_do_not_reopen_an_open_breaker():
+    breaker = CircuitBreaker("noaa", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    retry_at = breaker.retry_at
+
+    # Requests sent before the breaker opened fail afterwards
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert breaker.retry_at == retry_at
+    assert breaker.stats()["failures"] == 4
+
+
+def test_timeout_adapts_to_observed_latency():
+    breaker = CircuitBreaker("noaa", min_timeout=0.1, max_timeout=10, timeout_multiplier=3)
+    assert breaker.timeout == 10  # not enough samples yet
+
+    for _ in range(20):
+        breaker.record_success(0.2)
+
+    assert breaker.timeout == pytest.approx(0.6)
+
+
+def test_failing_upstream_opens_the_breaker_and_serves_the_last_good_body(make_client):
+    responses = iter([
+        httpx.Response(200, json={"n": 1}, headers={"ETag": '"v1"', "Cache-Control": "max-age=0"}),
+        httpx.Response(503),
+        httpx.Response(503),
+    ])
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        return next(responses)
+
+    client = make_client(handler)
+    assert client.run(client.get_json(URL, name="noaa_forecast")) == {"n": 1}
+
+    # Both attempts fail, which trips the breaker, but the stale body is still served
+    assert client.run(client.get_json(URL, name="noaa_forecast")) == {"n": 1}
+    assert client.breakers.get("noaa_forecast").state == OPEN
+
+    # Open breaker: no request is sent at all
+    assert client.run(client.get_json(URL, name="noaa_points")) == {"n": 1}
+    assert len(sent) == 3
+    with pytest.raises(CircuitOpen):
+        client.run(client.get("http://upstream.test/other", name="noaa_points"))
+
+
+def test_retries_after_a_429_honoring_retry_after(make_client):
+    responses = iter([httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={"ok": True})])
+    client = make_client(lambda request: next(responses))
+
+    response = client.run(client.get(URL, name="sportsdb"))
+
+    assert response.status_code == 200
+    assert client.breakers.get("sportsdb").stats()["failures"] == 1
+    assert client.breakers.get("sportsdb").state == CLOSED
+
+
+def test_upstreams_endpoint_reports_breakers(test_client):
+    response = test_client.get("/api/upstreams")
+
+    assert response.status_code == 200
+    assert [breaker["name"] for breaker in response.json()] == ["noaa", "sportsdb"]
+    assert all(breaker["state"] == "closed" for breaker in response.json())
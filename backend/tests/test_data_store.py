@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import patch
+
+from app.database import get_logs
+from app.services.automation_service import perform_automation
+from app.services.data_store import UpstreamDataStore, mark_mock_fallback
+
+SPORTS_PAYLOAD = {"events": [{"intHomeScore": "100", "intAwayScore": "90"}]}
+
+
+def test_serves_stale_data_while_refreshing_in_the_background():
+    store = UpstreamDataStore(max_stale=60)
+    temperatures = iter([60, 70])
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return {"temp_f": next(temperatures)}
+
+    async def scenario():
+        first = await store.get("weather:Seattle", fetch, fresh_for=0)
+        stale = await store.get("weather:Seattle", fetch, fresh_for=0)
+        refreshing = list(store.stats()["refreshing"])
+        await asyncio.sleep(0.05)
+        fresh = await store.get("weather:Seattle", fetch, fresh_for=60)
+        return first, stale, refreshing, fresh
+
+    first, stale, refreshing, fresh = asyncio.run(scenario())
+
+    assert first.data == stale.data == {"temp_f": 60}
+    assert refreshing == ["weather:Seattle"]
+    assert fresh.data == {"temp_f": 70}
+
+
+def test_mock_data_never_replaces_the_last_known_good_entry():
+    store = UpstreamDataStore()
+    responses = iter([({"temp_f": 60}, False), ({"temp_f": 99}, True)])
+
+    async def fetch():
+        data, mock = next(responses)
+        if mock:
+            mark_mock_fallback()
+        return data
+
+    async def scenario():
+        good = await store.get("weather:Seattle", fetch, fresh_for=60)
+        revalidated = await store.get("weather:Seattle", fetch, fresh_for=60, revalidate=True)
+        return good, revalidated
+
+    good, revalidated = asyncio.run(scenario())
+
+    assert revalidated is good
+    assert revalidated.data == {"temp_f": 60}
+
+
+def test_data_past_max_stale_is_not_served_when_the_refresh_fails():
+    store = UpstreamDataStore(max_stale=0.05)
+    responses = iter([({"temp_f": 60}, False), ({"temp_f": 99}, True)])
+
+    async def fetch():
+        data, mock = next(responses)
+        if mock:
+            mark_mock_fallback()
+        return data
+
+    async def scenario():
+        await store.get("weather:Seattle", fetch, fresh_for=60)
+        await asyncio.sleep(0.1)
+        return await store.get("weather:Seattle", fetch, fresh_for=60, revalidate=True)
+
+    expired = asyncio.run(scenario())
+
+    assert expired.data == {"temp_f": 99}
+    assert expired.age is None  # mock data, not stored
+    assert store.stats()["entries"] == {}
+
+
+def test_manual_runs_reuse_fresh_data_and_scheduled_runs_fetch():
+    weather_calls = 0
+
+    async def fake_weather(city):
+        nonlocal weather_calls
+        weather_calls += 1
+        return {"main": {"temp_f": 70}, "name": city}
+
+    async def fake_sports():
+        return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        scheduled = perform_automation("Seattle", source="automation")
+        manual = perform_automation("Seattle", source="manual")
+        perform_automation("Seattle", source="automation")
+
+    assert weather_calls == 2
+    assert manual["weather"] == scheduled["weather"]
+    assert 0 <= manual["data_age"]["weather"] < 5
+    assert manual["data_age"]["sports"] is not None
+    # The manual run was served the stored weather, only the two fetches are logged
+    assert len(get_logs(source="weather")) == 2
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.database import add_logs, create_db_engine, get_db_context, get_logs
+from app.models.log import LogModel
+
+
+def add_numbered_logs(count, source="weather"):
+    add_logs([(source, {"n": index}, "None") for index in range(count)])
+
+
+def test_get_logs_pages_backwards_with_before_id():
+    add_numbered_logs(5)
+
+    first_page = get_logs(limit=2)
+    second_page = get_logs(limit=2, before_id=first_page[-1]["id"])
+    last_page = get_logs(limit=2, before_id=second_page[-1]["id"])
+
+    assert [log["data"]["n"] for log in first_page + second_page + last_page] == [4, 3, 2, 1, 0]
+
+
+def test_get_logs_after_id_returns_only_newer_rows_newest_first():
+    add_numbered_logs(3)
+    cursor = get_logs(limit=1)[0]["id"]
+    add_numbered_logs(3, source="sports")
+
+    logs = get_logs(after_id=cursor, limit=2)
+
+    assert [log["data"]["n"] for log in logs] == [1, 0]
+    assert all(log["id"] > cursor for log in logs)
+
+
+def test_get_logs_filters_by_action_and_time_range():
+    add_logs([("manual", {}, "Paused Twitter"), ("manual", {}, "None")])
+    with get_db_context() as db:
+        db.add(LogModel(source="manual", data="{}", action_taken="Paused Twitter",
+                        timestamp=datetime.now() - timedelta(days=2)))
+        db.commit()
+
+    logs = get_logs(action_taken="Paused Twitter", since=datetime.now() - timedelta(days=1))
+
+    assert len(logs) == 1
+
+
+def test_source_pages_use_the_composite_index():
+    with get_db_context() as db:
+        plan = db.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM logs WHERE source = 'weather' AND id < 10 ORDER BY id DESC LIMIT 50"
+        )).fetchall()
+
+    assert "ix_logs_source_id" in " ".join(str(row) for row in plan)
+
+
+def test_file_engine_applies_sqlite_performance_profile(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+
+    with db_engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        busy_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar()
+    db_engine.dispose()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+    assert db_engine.pool.size() == 5
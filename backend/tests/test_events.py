@@ -0,0 +1,96 @@
+import asyncio
+
+from app.events import EventBus, RemoteChanges
+
+
+def test_subscribers_receive_published_events_in_order():
+    async def scenario():
+        bus = EventBus()
+        subscription = bus.subscribe()
+        bus.publish("state", {"n": 1})
+        bus.publish("logs", {"n": 2})
+        return [await subscription.get(timeout=1), await subscription.get(timeout=1)]
+
+    first, second = asyncio.run(scenario())
+
+    assert (first.id, first.type) == (1, "state")
+    assert (second.id, second.type) == (2, "logs")
+    assert second.to_sse() == 'id: 2\nevent: logs\ndata: {"n": 2}\n\n'
+
+
+def test_subscribe_with_last_event_id_replays_missed_events():
+    async def scenario():
+        bus = EventBus()
+        for index in range(5):
+            bus.publish("logs", {"n": index})
+        subscription = bus.subscribe(last_event_id=3)
+        return [(await subscription.get(timeout=1)).id for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [4, 5]
+
+
+def test_subscribe_sends_reset_when_missed_events_left_the_history():
+    async def scenario():
+        bus = EventBus(history_size=2)
+        for index in range(5):
+            bus.publish("logs", {"n": index})
+        subscription = bus.subscribe(last_event_id=1)
+        return await subscription.get(timeout=1)
+
+    event = asyncio.run(scenario())
+
+    assert (event.type, event.id) == ("reset", 5)
+
+
+def test_subscribe_sends_reset_when_last_event_id_is_ahead_of_the_bus():
+    async def scenario():
+        bus = EventBus()
+        bus.publish("logs", {"n": 0})
+        # The client's id came from before a restart, or from another worker
+        subscription = bus.subscribe(last_event_id=40)
+        return await subscription.get(timeout=1)
+
+    event = asyncio.run(scenario())
+
+    assert (event.type, event.id) == ("reset", 1)
+
+
+def test_slow_subscriber_is_marked_overflowed_instead_of_growing_unbounded():
+    async def scenario():
+        bus = EventBus(buffer_size=2)
+        subscription = bus.subscribe()
+        for index in range(3):
+            bus.publish("logs", {"n": index})
+        await asyncio.sleep(0)
+        return subscription
+
+    subscription = asyncio.run(scenario())
+
+    assert subscription.overflowed
+    assert subscription.queue.qsize() == 2
+
+
+def test_values_are_recorded_as_own_only_when_their_commit_succeeds():
+    changes = RemoteChanges()
+    changes.advance("state", 1)
+
+    with changes.committing("state", 2):
+        pass
+    try:
+        with changes.committing("state", 3):
+            raise RuntimeError("commit failed")
+    except RuntimeError:
+        pass
+
+    assert not changes.changed_elsewhere("state", 2)
+    assert changes.changed_elsewhere("state", 3)
+
+
+def test_websocket_pushes_state_transitions(test_client):
+    with test_client.websocket_connect("/api/ws") as websocket:
+        test_client.put("/api/state/Twitter", json={"status": "paused"})
+        message = websocket.receive_json()
+
+    state = message["data"]["states"][0]
+    assert message["type"] == "state"
+    assert (state["target"], state["status"]) == ("Twitter", "paused")
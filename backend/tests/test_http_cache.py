@@ -0,0 +1,66 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.services.http_cache import HTTPResponseCache, freshness_lifetime
+from app.services.http_client import upstream
+
+URL = "https://api.weather.gov/gridpoints/SEW/124,67/forecast"
+
+
+def make_response(status_code=200, payload=None, headers=None):
+    return httpx.Response(status_code, json=payload, headers=headers, request=httpx.Request("GET", URL))
+
+
+def test_freshness_lifetime_prefers_max_age_then_expires_then_default():
+    assert freshness_lifetime(httpx.Headers({"Cache-Control": "public, max-age=600", "Age": "100"})) == 500
+    assert freshness_lifetime(httpx.Headers({
+        "Date": "Mon, 10 Mar 2025 12:00:00 GMT",
+        "Expires": "Mon, 10 Mar 2025 12:05:00 GMT",
+    })) == 300
+    assert freshness_lifetime(httpx.Headers({}), default_ttl=30) == 30
+    assert freshness_lifetime(httpx.Headers({"Cache-Control": "no-store"}), default_ttl=30) is None
+
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = HTTPResponseCache(max_entries=2)
+    headers = httpx.Headers({"Cache-Control": "max-age=60"})
+    cache.store("a", 1, headers)
+    cache.store("b", 2, headers)
+    cache.lookup("a")
+    cache.store("c", 3, headers)
+
+    assert cache.lookup("b") is None
+    assert cache.lookup("a").data == 1
+    assert cache.stats()["evictions"] == 1
+
+
+@patch("app.services.http_client.upstream.get", new_callable=AsyncMock)
+def test_get_json_serves_fresh_entries_without_a_request(mock_get):
+    mock_get.return_value = make_response(payload={"n": 1}, headers={"Cache-Control": "max-age=60"})
+    hits_before = upstream.cache.stats()["hits"]
+
+    first = upstream.run(upstream.get_json(URL))
+    second = upstream.run(upstream.get_json(URL))
+
+    assert first == second == {"n": 1}
+    mock_get.assert_called_once()
+    assert upstream.cache.stats()["hits"] == hits_before + 1
+
+
+@patch("app.services.http_client.upstream.get", new_callable=AsyncMock)
+def test_get_json_revalidates_stale_entries_and_reuses_body_on_304(mock_get):
+    mock_get.side_effect = [
+        make_response(payload={"n": 1}, headers={"Cache-Control": "max-age=0", "ETag": '"v1"'}),
+        make_response(status_code=304, headers={"Cache-Control": "max-age=60"}),
+    ]
+    before = upstream.cache.stats()
+
+    upstream.run(upstream.get_json(URL))
+    result = upstream.run(upstream.get_json(URL))
+
+    assert result == {"n": 1}
+    assert mock_get.call_args_list[1].kwargs["headers"]["If-None-Match"] == '"v1"'
+    stats = upstream.cache.stats()
+    assert stats["revalidations"] == before["revalidations"] + 1
+    assert stats["not_modified"] == before["not_modified"] + 1
@@ -0,0 +1,178 @@
+import time
+from datetime import datetime, timedelta
+
+from app import revisions
+from app.config import settings
+from app.database import (
+    apply_states,
+    event_bus,
+    get_states,
+    increment_revision,
+    refresh_state_cache,
+    save_runtime_setting,
+    state_cache,
+    update_state,
+)
+from app.leadership import Lease
+from app.models.log import LogModel
+from app.models.state import StateModel
+from app.retention import prune_logs
+from app.services.dashboard_service import publish_remote_changes
+from app.scheduler import scheduler, scheduler_lease, stop_leader_jobs, sync_job
+
+
+def test_only_one_worker_holds_the_lease_until_it_expires():
+    leader = Lease("scheduler", ttl=0.05, holder="worker-a")
+    follower = Lease("scheduler", ttl=0.05, holder="worker-b")
+
+    assert leader.renew()
+    assert not follower.renew()
+
+    time.sleep(0.1)  # the leader stopped renewing
+    assert not leader.is_held
+    assert follower.renew()
+    assert not leader.renew()
+
+    follower.release()
+    assert leader.renew()
+
+
+def test_sync_job_applies_settings_from_other_workers_and_follows_the_lease(monkeypatch):
+    monkeypatch.setattr(settings, "AUTOMATION_CADENCE", settings.AUTOMATION_CADENCE)
+    other_worker = Lease("scheduler", ttl=30, holder="other-worker")
+    other_worker.renew()
+    # Another worker changed the cadence
+    save_runtime_setting("AUTOMATION_CADENCE", 42)
+
+    try:
+        sync_job()
+        assert settings.AUTOMATION_CADENCE == 42
+        assert revisions.current("settings") == 1
+        assert scheduler.get_job("automation_job") is None
+
+        other_worker.release()
+        sync_job()
+        assert scheduler_lease.is_held
+        assert scheduler.get_job("automation_job").trigger.interval.total_seconds() == 42 * 60
+    finally:
+        stop_leader_jobs()
+        scheduler_lease.release()
+
+
+def test_state_cache_reloads_states_changed_by_another_worker():
+    import app.database as db_module
+
+    get_states()
+    assert not refresh_state_cache()
+
+    # Another worker's write, which bypasses this worker's cache
+    with db_module.get_db_context() as db:
+        state = db.query(StateModel).filter(StateModel.target == "Twitter").one()
+        state.status = "paused"
+        increment_revision(db, "state")
+        db.commit()
+
+    assert refresh_state_cache()
+    assert {state["target"]: state["status"] for state in get_states()}["Twitter"] == "paused"
+    assert state_cache.version == 1
+
+
+def test_state_etag_and_cursor_follow_writes_made_by_other_workers(test_client, monkeypatch):
+    import app.database as db_module
+
+    monkeypatch.setattr(settings, "STATE_REVISION_CHECK_SECONDS", 0)
+
+    etag = test_client.get("/api/state").headers["ETag"]
+    cursor = test_client.get("/api/dashboard").json()["cursor"]
+
+    with db_module.get_db_context() as db:
+        db.query(StateModel).filter(StateModel.target == "Facebook").update({"status": "paused"})
+        increment_revision(db, "state")
+        db.commit()
+
+    response = test_client.get("/api/state", headers={"If-None-Match": etag})
+    dashboard = test_client.get("/api/dashboard", params={"cursor": cursor}).json()
+
+    assert response.status_code == 200
+    assert {state["target"]: state["status"] for state in response.json()}["Facebook"] == "paused"
+    assert {state["target"]: state["status"] for state in dashboard["states"]}["Facebook"] == "paused"
+
+
+def test_logs_etag_follows_writes_and_deletions_made_by_other_workers(test_client):
+    import app.database as db_module
+
+    etag = test_client.get("/api/logs").headers["ETag"]
+
+    # Another worker's insert, which bypasses this worker's log writer
+    with db_module.get_db_context() as db:
+        db.add(LogModel(source="weather", data="{}", timestamp=datetime.now() - timedelta(days=30)))
+        db.commit()
+    # The ETag is kept in memory, the sync job brings it up to date
+    assert test_client.get("/api/logs", headers={"If-None-Match": etag}).status_code == 304
+    publish_remote_changes()
+    inserted = test_client.get("/api/logs", headers={"If-None-Match": etag})
+    assert inserted.status_code == 200
+
+    prune_logs({"weather": 7})
+    assert test_client.get("/api/logs", headers={"If-None-Match": inserted.headers["ETag"]}).status_code == 200
+
+
+def test_apply_states_compares_against_the_stored_rows():
+    import app.database as db_module
+
+    get_states()
+    # Another worker paused Twitter, this worker's cache still says active
+    with db_module.get_db_context() as db:
+        db.query(StateModel).filter(StateModel.target == "Twitter").update({"status": "paused"})
+        increment_revision(db, "state")
+        db.commit()
+
+    transitions = apply_states({"Twitter": "active", "Facebook": "active"})
+
+    assert transitions == {"Twitter": {"from": "paused", "to": "active"}}
+    assert {state["target"]: state["status"] for state in get_states()}["Twitter"] == "active"
+
+
+def test_sync_publishes_changes_made_by_other_workers_only(monkeypatch):
+    import app.database as db_module
+
+    published = []
+    monkeypatch.setattr(event_bus, "publish", lambda kind, data: published.append((kind, data)))
+    publish_remote_changes()  # the first sync only records the starting point
+
+    update_state("Instagram", "paused")  # this worker's change, published when made
+    # Another worker's run: a state change and its weather and sports logs
+    with db_module.get_db_context() as db:
+        db.query(StateModel).filter(StateModel.target == "Twitter").update({"status": "paused"})
+        increment_revision(db, "state")
+        db.add_all([
+            LogModel(source="weather", data='{"main": {"temp_f": 70}}', timestamp=datetime.now()),
+            LogModel(source="sports", data='{"events": []}', timestamp=datetime.now()),
+        ])
+        db.commit()
+    published.clear()
+
+    publish_remote_changes()
+    publish_remote_changes()  # nothing new the second time
+
+    kinds = [kind for kind, _ in published]
+    assert kinds == ["state", "logs", "run"]
+    assert {state["target"]: state["status"] for state in published[0][1]["states"]}["Twitter"] == "paused"
+    assert [log["source"] for log in published[1][1]["logs"]] == ["sports", "weather"]
+    assert published[2][1]["weather"] == {"main": {"temp_f": 70}}
+
+
+def test_sync_pages_through_every_log_written_by_other_workers(monkeypatch):
+    import app.database as db_module
+
+    published = []
+    monkeypatch.setattr(event_bus, "publish", lambda kind, data: published.append((kind, data)))
+    publish_remote_changes()
+
+    with db_module.get_db_context() as db:
+        db.add_all([LogModel(source="manual", data=f'{{"n": {index}}}', timestamp=datetime.now()) for index in range(5)])
+        db.commit()
+    publish_remote_changes(limit=2)
+
+    pages = [[log["data"]["n"] for log in data["logs"]] for kind, data in published if kind == "logs"]
+    assert pages == [[1, 0], [3, 2], [4]]
@@ -0,0 +1,124 @@
+import time
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+
+from app.database import add_log, get_logs, log_writer
+from app.log_writer import LogWriter
+
+
+def test_add_log_writes_through_when_flusher_is_not_running():
+    add_log("weather", {"main": {"temp_f": 70}})
+
+    assert log_writer.stats()["queue_depth"] == 0
+    assert get_logs(source="weather")[0]["data"] == {"main": {"temp_f": 70}}
+
+
+def test_log_writer_batches_rows_until_flushed():
+    batches = []
+    writer = LogWriter(batches.append, batch_size=10, flush_interval=60)
+    writer.start()
+    try:
+        for index in range(3):
+            writer.enqueue("manual", f'{{"n": {index}}}')
+
+        assert batches == []
+        assert writer.stats()["queue_depth"] == 3
+
+        assert writer.flush() == 3
+    finally:
+        writer.stop()
+
+    assert len(batches) == 1
+    assert [row["data"] for row in batches[0]] == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+    stats = writer.stats()
+    assert stats["flushes"] == 1
+    assert stats["written"] == 3
+    assert stats["queue_depth"] == 0
+
+
+def test_log_writer_flushes_in_background_when_batch_is_full():
+    batches = []
+    writer = LogWriter(batches.append, batch_size=2, flush_interval=60)
+    writer.start()
+    try:
+        writer.enqueue("manual", "{}")
+        writer.enqueue("manual", "{}")
+
+        deadline = time.monotonic() + 2
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        writer.stop()
+
+    assert [len(batch) for batch in batches] == [2]
+
+
+def test_get_logs_reads_committed_rows_without_flushing_the_running_writer():
+    log_writer.start()
+    try:
+        add_log("sports", {"events": []})
+
+        queued = get_logs(source="sports")
+        depth = log_writer.stats()["queue_depth"]
+    finally:
+        log_writer.stop()
+
+    assert queued == []
+    assert depth == 1
+    assert len(get_logs(source="sports")) == 1
+
+
+def test_failed_flushes_back_off_instead_of_retrying_in_a_busy_loop():
+    attempts = []
+
+    def locked_database(rows):
+        attempts.append(len(rows))
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    writer = LogWriter(locked_database, batch_size=1, flush_interval=0.05)
+    writer.start()
+    try:
+        writer.enqueue_many([("manual", "{}", "None")] * 3)
+        time.sleep(0.3)
+        background_attempts = len(attempts)
+    finally:
+        writer.stop()
+
+    # 0.05 + 0.1 + 0.2 seconds of backoff fit in 0.3 seconds: a handful of attempts, not thousands
+    assert 2 <= background_attempts <= 5
+    assert writer.stats()["queue_depth"] == 3
+
+
+def test_flusher_survives_unexpected_errors_without_losing_rows():
+    batches = []
+    failures = iter([ValueError("unexpected")])
+
+    def flaky(rows):
+        error = next(failures, None)
+        if error:
+            raise error
+        batches.append(rows)
+
+    writer = LogWriter(flaky, batch_size=1, flush_interval=0.01)
+    writer.start()
+    try:
+        writer.enqueue("manual", "{}")
+        deadline = time.monotonic() + 2
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.running
+    finally:
+        writer.stop()
+
+    assert [len(batch) for batch in batches] == [1]
+    assert writer.stats()["failed_flushes"] == 1
+
+
+def test_publish_errors_after_the_commit_do_not_write_the_rows_again():
+    with patch("app.database.event_bus.publish", side_effect=RuntimeError("subscriber gone")):
+        add_log("manual", {"n": 1})
+    log_writer.flush()
+
+    assert len(get_logs(source="manual")) == 1
+    assert log_writer.stats()["queue_depth"] == 0
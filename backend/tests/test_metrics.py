@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, JobSubmissionEvent
+
+from app.metrics import JOB_MISSED, MetricsRegistry
+from app.scheduler import record_missed_job
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/a"} 2' in text
+
+
+def test_metrics_endpoint_reports_route_latency_and_db_operations(test_client):
+    test_client.put("/api/state/Twitter", json={"status": "paused"})
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="PUT",route="/api/state/{target}",status="200"}' in response.text
+    assert 'db_operation_duration_seconds_count{operation="update_state"}' in response.text
+    assert "log_writer_queue_depth" in response.text
+
+
+def test_runs_skipped_at_max_instances_count_as_missed():
+    before = JOB_MISSED.value(job="automation_job", reason="max_instances")
+
+    record_missed_job(JobSubmissionEvent(EVENT_JOB_MAX_INSTANCES, "automation_job", "default", [datetime.now()]))
+
+    assert JOB_MISSED.value(job="automation_job", reason="max_instances") == before + 1
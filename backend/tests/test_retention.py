@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.database import get_db_context, get_logs
+from app.models.log import LogModel
+from app.retention import prune_logs, vacuum_free_pages
+
+
+def add_aged_logs(source, days_old, count):
+    with get_db_context() as db:
+        db.add_all([
+            LogModel(source=source, data="{}", timestamp=datetime.now() - timedelta(days=days_old))
+            for _ in range(count)
+        ])
+        db.commit()
+
+
+def test_prune_logs_applies_per_source_ttl_in_batches():
+    add_aged_logs("weather", days_old=10, count=5)
+    add_aged_logs("weather", days_old=1, count=1)
+    add_aged_logs("error", days_old=10, count=2)
+    add_aged_logs("manual", days_old=400, count=1)
+
+    result = prune_logs({"weather": 7, "error": 30}, batch_size=2)
+
+    assert result["deleted"] == {"weather": 5, "error": 0}
+    assert result["rows_deleted"] == 5
+    assert len(get_logs(source="weather")) == 1
+    assert len(get_logs(source="error")) == 2
+    assert len(get_logs(source="manual")) == 1
+
+
+def test_vacuum_returns_free_pages_in_bounded_chunks():
+    free_pages = iter([5, 3, 1, 0])
+    chunks = []
+
+    with patch("app.retention.get_freelist_count", lambda: next(free_pages)), \
+            patch("app.retention.incremental_vacuum", chunks.append):
+        assert vacuum_free_pages(pages_per_chunk=2) == 3
+
+    assert chunks == [2, 2, 2]
+
+
+def test_run_retention_endpoint_reports_reclaimed_rows(test_client):
+    add_aged_logs("sports", days_old=30, count=3)
+
+    response = test_client.post("/api/admin/retention")
+
+    assert response.status_code == 200
+    assert response.json()["deleted"]["sports"] == 3
+    assert response.json()["bytes_reclaimed"] >= 0
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services.run_coordinator import RunCoordinator, RunQueueFull
+
+
+def test_concurrent_runs_for_the_same_key_share_one_execution():
+    coordinator = RunCoordinator()
+    executions = 0
+
+    async def work():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.05)
+        return {"run": executions}
+
+    async def burst():
+        return await asyncio.gather(*(coordinator.run("city:Seattle", work) for _ in range(5)))
+
+    results = asyncio.run(burst())
+
+    assert executions == 1
+    assert results == [{"run": 1}] * 5
+    assert coordinator.stats()["coalesced"] == 4
+    assert not coordinator.busy
+
+
+def test_distinct_keys_are_bounded_and_overflow_is_rejected():
+    coordinator = RunCoordinator(max_concurrency=1, max_pending=2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def work():
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return "done"
+
+    async def burst():
+        first = asyncio.create_task(coordinator.run("city:Seattle", work))
+        second = asyncio.create_task(coordinator.run("city:Boston", work))
+        await asyncio.sleep(0.01)
+        with pytest.raises(RunQueueFull):
+            await coordinator.run("city:Miami", work)
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(burst()) == ["done", "done"]
+    assert max_in_flight == 1
+    assert coordinator.stats()["rejected"] == 1
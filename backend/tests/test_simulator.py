@@ -0,0 +1,84 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.services.http_client import upstream
+from app.services.sports_service import fetch_sports_data
+from app.services.weather_service import fetch_weather_data
+from simulator import SimulatorConfig, UpstreamBehavior, create_app
+
+
+@pytest.fixture
+def simulator_app():
+    return create_app(SimulatorConfig(seed=1))
+
+
+@pytest.fixture
+def simulated_upstreams(simulator_app, monkeypatch):
+    """Route the shared upstream client to the simulator app in process"""
+    monkeypatch.setattr(settings, "NOAA_BASE_URL", "http://simulator/noaa")
+    monkeypatch.setattr(settings, "SPORTSDB_BASE_URL", "http://simulator/sportsdb")
+    monkeypatch.setattr(settings, "SPORTS_API_KEY", "3")
+
+    original = upstream._client
+    upstream._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=simulator_app))
+    yield simulator_app.state.simulator
+    upstream._client = original
+
+
+def test_points_link_to_a_forecast_served_with_etags(simulator_app):
+    client = TestClient(simulator_app)
+
+    points = client.get("/noaa/points/47.6062,-122.3321")
+    forecast_url = points.json()["properties"]["forecast"]
+    forecast = client.get(forecast_url)
+    period = forecast.json()["properties"]["periods"][0]
+
+    assert forecast.status_code == 200
+    assert isinstance(period["temperature"], int)
+
+    revalidated = client.get(forecast_url, headers={"If-None-Match": forecast.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert client.get("/_sim/stats").json()["noaa"] == {"200": 2, "304": 1}
+
+
+def test_injects_errors_and_throttling_per_upstream(simulator_app):
+    client = TestClient(simulator_app)
+
+    client.put("/_sim/config/noaa", json={"error_rate": 1, "error_status": 502})
+    client.put("/_sim/config/sportsdb", json={"throttle_rate": 1, "retry_after": 7})
+
+    assert client.get("/noaa/points/47.6,-122.3").status_code == 502
+    throttled = client.get("/sportsdb/3/eventslast.php")
+    assert throttled.status_code == 429
+    assert throttled.headers["retry-after"] == "7"
+
+
+def test_rate_limit_answers_429_once_the_bucket_is_empty():
+    client = TestClient(create_app(SimulatorConfig(sportsdb=UpstreamBehavior(rate_limit=2))))
+
+    statuses = [client.get("/sportsdb/3/eventslast.php").status_code for _ in range(4)]
+
+    assert statuses[:2] == [200, 200]
+    assert 429 in statuses[2:]
+
+
+def test_services_fetch_through_base_urls(simulated_upstreams):
+    weather = fetch_weather_data("Seattle")
+    sports = fetch_sports_data()
+
+    assert weather["weather"][0]["description"].endswith(f"a high near {weather['main']['temp_f']}.")
+    assert " vs " in sports["events"][0]["strEvent"]
+    assert "strStatus" not in sports["events"][0]
+    assert simulated_upstreams.stats()["noaa"]["200"] == 2
+    assert simulated_upstreams.stats()["sportsdb"]["200"] == 1
+
+
+def test_services_fall_back_to_mock_data_on_injected_errors(simulated_upstreams):
+    simulated_upstreams.config.sportsdb = UpstreamBehavior(error_rate=1)
+
+    sports = fetch_sports_data()
+
+    assert sports["events"][0]["strStatus"] == "Finished"  # only mock events carry a status
+    assert simulated_upstreams.stats()["sportsdb"] == {"503": 2}  # retried once
@@ -1,7 +1,9 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
-from requests import RequestException
+import httpx
 
+from app.database import get_logs
+from app.services.circuit_breaker import CircuitOpen
 from app.services.sports_service import (
     build_mock_sports_data,
     fetch_sports_data,
@@ -23,7 +25,7 @@ MOCK_API_RESPONSE = {
 
 
 @patch("app.services.sports_service.settings")
-@patch("app.services.sports_service.requests.get")
+@patch("app.services.sports_service.upstream.get", new_callable=AsyncMock)
 def test_fetch_sports_data_uses_mock_payload_for_demo_key(mock_get, mock_settings):
     mock_settings.SPORTS_API_KEY = "demo_key"
 
@@ -35,13 +37,12 @@ def test_fetch_sports_data_uses_mock_payload_for_demo_key(mock_get, mock_setting
 
 
 @patch("app.services.sports_service.settings")
-@patch("app.services.sports_service.requests.get")
+@patch("app.services.sports_service.upstream.get", new_callable=AsyncMock)
 def test_fetch_sports_data_returns_api_payload_when_request_succeeds(mock_get, mock_settings):
     mock_settings.SPORTS_API_KEY = "real_api_key"
-    mock_response = MagicMock()
-    mock_response.json.return_value = MOCK_API_RESPONSE
-    mock_response.raise_for_status = MagicMock()
-    mock_get.return_value = mock_response
+    mock_get.return_value = httpx.Response(
+        200, json=MOCK_API_RESPONSE, request=httpx.Request("GET", "https://www.thesportsdb.com")
+    )
 
     result = fetch_sports_data()
 
@@ -50,7 +51,7 @@ def test_fetch_sports_data_returns_api_payload_when_request_succeeds(mock_get, m
 
 
 @patch("app.services.sports_service.settings")
-@patch("app.services.sports_service.requests.get")
+@patch("app.services.sports_service.upstream.get", new_callable=AsyncMock)
 @patch("app.services.sports_service.build_mock_sports_data")
 def test_fetch_sports_data_falls_back_to_mock_on_request_failure(
     mock_build_mock_sports_data, mock_get, mock_settings
@@ -58,9 +59,34 @@ def test_fetch_sports_data_falls_back_to_mock_on_request_failure(
     mock_settings.SPORTS_API_KEY = "real_api_key"
     fallback_payload = build_mock_sports_data()
     mock_build_mock_sports_data.return_value = fallback_payload
-    mock_get.side_effect = RequestException("API timeout")
+    mock_get.side_effect = httpx.ReadTimeout("API timeout")
 
     result = fetch_sports_data()
 
     assert result == fallback_payload
     mock_build_mock_sports_data.assert_called_once()
+
+
+@patch("app.services.sports_service.settings")
+@patch("app.services.sports_service.upstream.get", new_callable=AsyncMock)
+def test_fetch_sports_data_falls_back_to_mock_on_malformed_body(mock_get, mock_settings):
+    mock_settings.SPORTS_API_KEY = "real_api_key"
+    mock_get.return_value = httpx.Response(
+        200, text="<html>maintenance</html>", request=httpx.Request("GET", "https://www.thesportsdb.com")
+    )
+
+    result = fetch_sports_data()
+
+    assert result["events"][0]["strStatus"] == "Finished"  # only mock events carry a status
+
+
+@patch("app.services.sports_service.settings")
+@patch("app.services.sports_service.upstream.get", new_callable=AsyncMock)
+def test_short_circuited_requests_fall_back_without_error_logs(mock_get, mock_settings):
+    mock_settings.SPORTS_API_KEY = "real_api_key"
+    mock_get.side_effect = CircuitOpen("Circuit breaker for sportsdb is open")
+
+    result = fetch_sports_data()
+
+    assert result["events"][0]["strStatus"] == "Finished"
+    assert get_logs(source="error") == []
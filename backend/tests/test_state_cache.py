@@ -0,0 +1,50 @@
+import json
+from unittest.mock import patch
+
+from app.config import settings
+from app.database import get_db_context, get_states, get_versioned_state_body, state_cache, update_state
+from app.models.state import StateModel
+
+
+def test_get_states_is_served_from_cache_after_first_read():
+    get_states()
+    with get_db_context() as db:
+        db.query(StateModel).filter(StateModel.target == "Twitter").update({"status": "paused"})
+        db.commit()
+
+    states = {state["target"]: state["status"] for state in get_states()}
+
+    assert states["Twitter"] == "active"
+
+
+def test_update_state_writes_through_and_bumps_version():
+    get_states()
+    version = state_cache.version
+
+    update_state("Facebook", "paused")
+
+    assert state_cache.version > version
+    body = json.loads(state_cache.body())
+    assert [state["target"] for state in body] == ["Facebook", "Instagram", "Twitter"]
+    assert body[0]["status"] == "paused"
+
+
+def test_read_state_returns_cached_body_with_version_header(test_client):
+    test_client.put("/api/state/Instagram", json={"status": "paused"})
+
+    response = test_client.get("/api/state")
+
+    assert response.status_code == 200
+    assert response.headers["X-State-Version"] == str(state_cache.version)
+    assert {state["target"]: state["status"] for state in response.json()}["Instagram"] == "paused"
+
+
+def test_state_reads_check_the_stored_revision_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setattr(settings, "STATE_REVISION_CHECK_SECONDS", 60)
+    monkeypatch.setattr("app.database._state_checked_at", float("-inf"))
+
+    with patch("app.database.get_revisions", return_value={}) as get_revisions:
+        for _ in range(5):
+            get_versioned_state_body()
+
+    assert get_revisions.call_count == 1
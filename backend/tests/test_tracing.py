@@ -0,0 +1,52 @@
+import asyncio
+from unittest.mock import patch
+
+from app.services.automation_service import perform_automation
+from app.tracing import span, trace
+
+WEATHER_PAYLOAD = {"main": {"temp": 22.0, "temp_c": 22.0, "temp_f": 71.6}, "name": "Seattle"}
+SPORTS_PAYLOAD = {"events": [{"intHomeScore": "100", "intAwayScore": "90"}]}
+
+
+def test_spans_nest_across_tasks_and_are_noops_outside_a_trace():
+    async def stage(name):
+        with span(name):
+            await asyncio.sleep(0.01)
+
+    async def traced():
+        with trace("root") as root:
+            await asyncio.gather(stage("a"), stage("b"))
+        return root
+
+    with span("untraced") as untraced:
+        assert untraced is None
+
+    tree = asyncio.run(traced()).to_dict()
+    assert tree["name"] == "root"
+    assert sorted(child["name"] for child in tree["children"]) == ["a", "b"]
+    assert all(child["duration_ms"] >= 10 for child in tree["children"])
+
+
+def test_automation_run_is_traced_and_listed_among_slowest(test_client):
+    async def fake_weather(city):
+        with span("weather", city=city):
+            await asyncio.sleep(0.01)
+        return WEATHER_PAYLOAD
+
+    async def fake_sports():
+        with span("sports"):
+            return SPORTS_PAYLOAD
+
+    with patch("app.services.automation_service.fetch_weather_data_async", fake_weather), \
+            patch("app.services.automation_service.fetch_sports_data_async", fake_sports):
+        result = perform_automation("Seattle")
+
+    stages = [child["name"] for child in result["trace"]["children"]]
+    fetch = result["trace"]["children"][0]
+    assert stages == ["fetch", "apply_states", "write_logs", "get_states"]
+    # Spans opened on the upstream loop thread are attached to the caller's trace
+    assert sorted(child["name"] for child in fetch["children"]) == ["sports", "weather"]
+
+    slowest = test_client.get("/api/runs/slowest").json()
+    assert slowest[0]["city"] == "Seattle"
+    assert slowest[0]["trace"]["name"] == "automation"
@@ -1,7 +1,10 @@
-from unittest.mock import MagicMock, patch
+import threading
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
 
-from requests import RequestException
+import httpx
 
+from app.database import delete_gridpoint, get_gridpoint, save_gridpoint
 from app.services.weather_service import (
     build_mock_weather_data,
     convert_to_celsius,
@@ -9,9 +12,11 @@ from app.services.weather_service import (
 )
 
 
+MOCK_FORECAST_URL = "https://api.weather.gov/gridpoints/SEW/124,67/forecast"
+
 MOCK_POINTS_RESPONSE = {
     "properties": {
-        "forecast": "https://api.weather.gov/gridpoints/SEW/124,67/forecast"
+        "forecast": MOCK_FORECAST_URL
     }
 }
 
@@ -28,17 +33,13 @@ MOCK_FORECAST_RESPONSE = {
 }
 
 
-@patch("app.services.weather_service.requests.get")
-def test_fetch_weather_data_returns_normalized_payload_on_success(mock_get):
-    points_response = MagicMock()
-    points_response.json.return_value = MOCK_POINTS_RESPONSE
-    points_response.raise_for_status = MagicMock()
+def make_response(payload, status_code=200):
+    return httpx.Response(status_code, json=payload, request=httpx.Request("GET", "https://api.weather.gov"))
 
-    forecast_response = MagicMock()
-    forecast_response.json.return_value = MOCK_FORECAST_RESPONSE
-    forecast_response.raise_for_status = MagicMock()
 
-    mock_get.side_effect = [points_response, forecast_response]
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_fetch_weather_data_returns_normalized_payload_on_success(mock_get):
+    mock_get.side_effect = [make_response(MOCK_POINTS_RESPONSE), make_response(MOCK_FORECAST_RESPONSE)]
 
     result = fetch_weather_data("Seattle")
 
@@ -49,16 +50,107 @@ def test_fetch_weather_data_returns_normalized_payload_on_success(mock_get):
     assert result["weather"][0]["main"] == "Partly Cloudy"
 
 
-@patch("app.services.weather_service.requests.get")
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
 @patch("app.services.weather_service.build_mock_weather_data")
 def test_fetch_weather_data_falls_back_to_mock_on_request_failure(
     mock_build_mock_weather_data, mock_get
 ):
     fallback_payload = build_mock_weather_data()
     mock_build_mock_weather_data.return_value = fallback_payload
-    mock_get.side_effect = RequestException("Connection error")
+    mock_get.side_effect = httpx.ConnectError("Connection error")
 
     result = fetch_weather_data("Seattle")
 
     assert result == fallback_payload
     mock_build_mock_weather_data.assert_called_once()
+
+
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_fetch_weather_data_falls_back_to_mock_on_malformed_body(mock_get):
+    malformed = httpx.Response(
+        200, text="<html>maintenance</html>", request=httpx.Request("GET", "https://api.weather.gov")
+    )
+    mock_get.side_effect = [make_response(MOCK_POINTS_RESPONSE), malformed]
+
+    result = fetch_weather_data("Seattle")
+
+    assert result["name"] == "Seattle"
+    assert result["weather"][0]["description"] == "Generated mock weather data"
+
+
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_fetch_weather_data_reuses_cached_gridpoint(mock_get):
+    mock_get.side_effect = [
+        make_response(MOCK_POINTS_RESPONSE),
+        make_response(MOCK_FORECAST_RESPONSE),
+        make_response(MOCK_FORECAST_RESPONSE),
+    ]
+
+    fetch_weather_data("Seattle")
+    result = fetch_weather_data("Seattle")
+
+    assert result["main"]["temp_f"] == 72
+    requested_urls = [call.args[0] for call in mock_get.call_args_list]
+    assert requested_urls == [
+        "https://api.weather.gov/points/47.6062,-122.3321",
+        MOCK_FORECAST_URL,
+        MOCK_FORECAST_URL,
+    ]
+
+
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_fetch_weather_data_re_resolves_gridpoint_when_forecast_moves(mock_get):
+    save_gridpoint("47.6062,-122.3321", "https://api.weather.gov/gridpoints/OLD/1,1/forecast")
+    mock_get.side_effect = [
+        make_response({}, status_code=404),
+        make_response(MOCK_POINTS_RESPONSE),
+        make_response(MOCK_FORECAST_RESPONSE),
+    ]
+
+    result = fetch_weather_data("Seattle")
+
+    assert result["main"]["temp_f"] == 72
+    assert get_gridpoint("47.6062,-122.3321", timedelta(days=1)) == MOCK_FORECAST_URL
+
+
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_re_resolve_bypasses_a_fresh_cached_points_response(mock_get):
+    old_url = "https://api.weather.gov/gridpoints/OLD/1,1/forecast"
+    cacheable = {"Cache-Control": "max-age=3600"}
+    request = httpx.Request("GET", "https://api.weather.gov")
+    mock_get.side_effect = [
+        httpx.Response(200, json={"properties": {"forecast": old_url}}, headers=cacheable, request=request),
+        make_response(MOCK_FORECAST_RESPONSE),
+        make_response({}, status_code=404),
+        httpx.Response(200, json=MOCK_POINTS_RESPONSE, headers=cacheable, request=request),
+        make_response(MOCK_FORECAST_RESPONSE),
+    ]
+
+    fetch_weather_data("Seattle")
+    # The gridpoint moved while the points response is still fresh in the HTTP cache
+    delete_gridpoint("47.6062,-122.3321")
+    save_gridpoint("47.6062,-122.3321", old_url)
+    result = fetch_weather_data("Seattle")
+
+    assert result["main"]["temp_f"] == 72
+    assert [call.args[0] for call in mock_get.call_args_list][2:] == [
+        old_url,
+        "https://api.weather.gov/points/47.6062,-122.3321",
+        MOCK_FORECAST_URL,
+    ]
+    assert get_gridpoint("47.6062,-122.3321", timedelta(days=1)) == MOCK_FORECAST_URL
+
+
+@patch("app.services.weather_service.upstream.get", new_callable=AsyncMock)
+def test_gridpoint_cache_is_read_off_the_upstream_loop(mock_get):
+    mock_get.side_effect = [make_response(MOCK_POINTS_RESPONSE), make_response(MOCK_FORECAST_RESPONSE)]
+    threads = []
+
+    def recording_get_gridpoint(*args):
+        threads.append(threading.current_thread().name)
+        return get_gridpoint(*args)
+
+    with patch("app.services.weather_service.get_gridpoint", recording_get_gridpoint):
+        fetch_weather_data("Seattle")
+
+    assert threads and threads[0].startswith("db")
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useCallback, useRef } from "react";
 import axios from "axios";
 
 // Get API base URL from environment variable or use default
@@ -20,6 +20,19 @@ const normalizeLogData = (logEntry) => {
   return logEntry.data;
 };
 
+// Replace the targets present in a state event, keep the others as they are
+const mergeStates = (targets, updates) => {
+  const updated = new Map(updates.map((state) => [state.target, state]));
+  return targets.map((target) => updated.get(target.target) || target);
+};
+
+// Prepend new logs, skipping ids already shown (they can arrive both streamed and fetched)
+const mergeLogs = (prevLogs, newLogs) => {
+  const seen = new Set(prevLogs.map((log) => log.id));
+  const fresh = newLogs.filter((log) => !seen.has(log.id));
+  return [...fresh, ...prevLogs].sort((a, b) => b.id - a.id).slice(0, 50);
+};
+
 const Dashboard = () => {
   // States
   const [isLoading, setIsLoading] = useState(false);
@@ -32,31 +45,35 @@ const Dashboard = () => {
   const [logs, setLogs] = useState([]);
   const [targets, setTargets] = useState([]);
 
-  // Fetch all required data
+  // Cursor of the last dashboard snapshot, so refreshes only transfer changes
+  const cursorRef = useRef(null);
+
+  // Fetch all required data in one request
   const fetchData = useCallback(async () => {
     try {
-      // Fetch logs
-      const logsResponse = await axios.get(`${API_URL}/logs`);
-      setLogs(logsResponse.data);
-
-      // Fetch social targets state
-      const stateResponse = await axios.get(`${API_URL}/state`);
-      setTargets(stateResponse.data);
-
-      // Fetch settings including available cities
-      const settingsResponse = await axios.get(`${API_URL}/settings`);
-      if (settingsResponse.data.available_cities) {
-        setAvailableCities(settingsResponse.data.available_cities);
-        setSelectedCity(settingsResponse.data.city);
+      const params = cursorRef.current ? { cursor: cursorRef.current } : {};
+      const { data } = await axios.get(`${API_URL}/dashboard`, { params });
+      cursorRef.current = data.cursor;
+
+      // States and settings are only included when they changed
+      if (data.states) {
+        setTargets(data.states);
       }
 
-      // Find latest weather and sports data
-      const weatherLog = logsResponse.data.find(
-        (log) => log.source === "weather"
-      );
-      const sportsLog = logsResponse.data.find(
-        (log) => log.source === "sports"
-      );
+      if (data.settings && data.settings.available_cities) {
+        setAvailableCities(data.settings.available_cities);
+        setSelectedCity(data.settings.city);
+      }
+
+      if (data.full) {
+        setLogs(data.logs);
+      } else if (data.logs.length > 0) {
+        setLogs((prevLogs) => mergeLogs(prevLogs, data.logs));
+      }
+
+      // Latest weather and sports records, looked up by the server
+      const weatherLog = data.latest.weather;
+      const sportsLog = data.latest.sports;
 
       if (weatherLog) {
         setWeatherData(normalizeLogData(weatherLog));
@@ -71,14 +88,61 @@ const Dashboard = () => {
     }
   }, []);
 
-  // Fetch data on component mount
+  // Drop the cursor and load a complete snapshot
+  const reloadData = useCallback(() => {
+    cursorRef.current = null;
+    return fetchData();
+  }, [fetchData]);
+
+  // Fetch data on component mount, then follow the server's event stream
   useEffect(() => {
     fetchData();
 
-    // Refresh data every minute
-    const intervalId = setInterval(fetchData, 60000);
-    return () => clearInterval(intervalId);
-  }, [fetchData]);
+    // Refresh data every minute, but only while the event stream is unavailable
+    let intervalId = null;
+    const startPolling = () => {
+      if (!intervalId) {
+        intervalId = setInterval(fetchData, 60000);
+      }
+    };
+    const stopPolling = () => {
+      clearInterval(intervalId);
+      intervalId = null;
+    };
+
+    if (!window.EventSource) {
+      startPolling();
+      return stopPolling;
+    }
+
+    // EventSource reconnects by itself and resumes with the last event id it saw
+    const events = new EventSource(`${API_URL}/events`);
+    events.onopen = stopPolling;
+    events.onerror = startPolling;
+
+    events.addEventListener("state", (event) => {
+      const { states } = JSON.parse(event.data);
+      setTargets((prevTargets) => mergeStates(prevTargets, states));
+    });
+    events.addEventListener("logs", (event) => {
+      const { logs: newLogs } = JSON.parse(event.data);
+      setLogs((prevLogs) => mergeLogs(prevLogs, newLogs));
+    });
+    events.addEventListener("run", (event) => {
+      const run = JSON.parse(event.data);
+      setWeatherData(run.weather);
+      setSportsData(run.sports);
+      setLastRunTime(new Date(run.timestamp).toLocaleString());
+    });
+    events.addEventListener("logs_cleared", () => setLogs([]));
+    // Sent when the events missed while disconnected are gone, reload everything
+    events.addEventListener("reset", reloadData);
+
+    return () => {
+      events.close();
+      stopPolling();
+    };
+  }, [fetchData, reloadData]);
 
   // Run automation manually
   const handleRunNow = async () => {
@@ -92,9 +156,8 @@ const Dashboard = () => {
       setTargets(response.data.states);
       setLastRunTime(new Date().toLocaleString());
 
-      // Refresh logs
-      const logsResponse = await axios.get(`${API_URL}/logs`);
-      setLogs(logsResponse.data);
+      // Pick up the new logs
+      fetchData();
     } catch (error) {
       console.error("Error running automation:", error);
       alert("Failed to run automation");
@@ -143,8 +206,7 @@ const Dashboard = () => {
         )
       );
 
-      const logsResponse = await axios.get(`${API_URL}/logs`);
-      setLogs(logsResponse.data);
+      fetchData();
     } catch (error) {
       console.error(`Error toggling state for ${target}:`, error);
       alert(`Failed to update ${target} state`);